@@ -13,4 +13,19 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'appli_nana.settings')
 
-application = get_asgi_application()
+# Initialiser Django avant d'importer les consumers (modèles)
+django_asgi_app = get_asgi_application()
+
+from channels.routing import ProtocolTypeRouter, URLRouter  # noqa: E402
+
+from simulations.middleware import TokenAuthMiddleware  # noqa: E402
+from simulations.evenements import avertir_sans_redis  # noqa: E402
+from simulations.routing import websocket_urlpatterns  # noqa: E402
+
+avertir_sans_redis()
+
+application = ProtocolTypeRouter({
+    'http': django_asgi_app,
+    # Suivi des simulations en temps réel (ws/simulations/<id>/?token=...)
+    'websocket': TokenAuthMiddleware(URLRouter(websocket_urlpatterns)),
+})
@@ -1,5 +1,11 @@
 from django.contrib import admin
-from .models import Simulation
+from .models import Dataset, Simulation
+
+@admin.register(Dataset)
+class DatasetAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'content_hash', 'created_at']
+    search_fields = ['user__username', 'content_hash']
+    readonly_fields = ['content_hash', 'created_at']
 
 @admin.register(Simulation)
 class SimulationAdmin(admin.ModelAdmin):
@@ -10,8 +16,8 @@ class SimulationAdmin(admin.ModelAdmin):
     list_filter = ['method', 'status', 'created_at']
     search_fields = ['user__username', 'user__email']
     readonly_fields = [
-        'created_at', 'completed_at', 'real_provision', 
-        'simulated_provisions', 'percentiles', 'confidence_interval'
+        'created_at', 'completed_at', 'real_provision', 'samples_run',
+        'achieved_precision', 'simulated_provisions', 'percentiles', 'confidence_interval'
     ]
     
     fieldsets = (
@@ -19,14 +25,14 @@ class SimulationAdmin(admin.ModelAdmin):
             'fields': ('user',)
         }),
         ('Paramètres de simulation', {
-            'fields': ('method', 'num_samples', 'alpha')
+            'fields': ('method', 'num_samples', 'alpha', 'seed', 'target_precision')
         }),
         ('Fichiers', {
-            'fields': ('lending_file', 'recovery_file')
+            'fields': ('dataset', 'lending_file', 'recovery_file')
         }),
         ('Résultats', {
             'fields': ('status', 'real_provision', 'simulated_provisions', 
-                      'percentiles', 'confidence_interval'),
+                      'percentiles', 'confidence_interval', 'samples_run', 'achieved_precision'),
             'classes': ('collapse',)
         }),
         ('Timestamps', {
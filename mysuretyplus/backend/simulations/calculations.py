@@ -1,3 +1,6 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import numpy as np
 from scipy.stats import poisson
@@ -6,6 +9,29 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from matplotlib.patches import Rectangle
 
+from .moteur import (
+    COLONNES_NON_MONETAIRES,
+    PERFORMANCE_CONFIG_DEFAUT,
+    REPLICATIONS_PAR_FLUX,
+    charger_config_performance,
+    decouper_flux,
+    generateurs_flux,
+    montants_dataframe,
+    montants_par_ligne,
+    nouvelle_graine,
+    preparer_tableau,
+    provision_vectorisee,
+    provisions_bloc,
+    simuler_bloc,
+    simuler_flux,
+    simuler_provisions_par_blocs,
+    taille_bloc,
+    trajectoire_cumulee,
+    vecteur_poids
+)
+from .parallel import iterer_provisions
+from .quantiles import CroquisQuantiles
+
 def calculer_somme(df):
     """
     Calcule la somme totale par transaction: (denomination * quantity)
@@ -17,35 +43,7 @@ def calculer_somme(df):
         list: Liste des sommes calculées pour chaque ligne
     """
     try:
-        """
-        Calcule la somme pondérée des transactions en multipliant chaque cellule par l'en-tête de sa colonne
-        """
-        sommes = []
-        colonnes_a_exclure = ['ref_date', 'interval', 'SDATE', 'INTERVAL', 'SUM_CENTS_PRINCIPAL']
-        colonnes_numeriques = []
-        
-        for col in df.columns:
-            if col not in colonnes_a_exclure:
-                try:
-                    float(col)
-                    colonnes_numeriques.append(col)
-                except ValueError:
-                    continue
-        
-        df_a_calculer = df[colonnes_numeriques]
-        
-        for index, ligne in df_a_calculer.iterrows(): 
-            somme_ligne_actuelle = 0
-            for nom_colonne, valeur_cellule in ligne.items():            
-                try:
-                    valeur_entete = float(nom_colonne)
-                    valeur_numerique_cellule = float(valeur_cellule)
-                    somme_ligne_actuelle += valeur_entete * valeur_numerique_cellule
-                except (ValueError, TypeError):
-                    continue
-            sommes.append(somme_ligne_actuelle)
-        
-        return sommes
+        return montants_dataframe(df).tolist()
         
     except Exception as e:
         print(f"Erreur dans calculer_somme: {e}")
@@ -56,47 +54,33 @@ def provision(df_lending, df_recovery):
     Calcule la provision en utilisant la logique exacte fournie
     """
     try:
-        sommes_lending = calculer_somme(df_lending)
-        sommes_recovery = calculer_somme(df_recovery)
+        montants_lending = montants_dataframe(df_lending)
+        montants_recovery = montants_dataframe(df_recovery)
         
-        if not sommes_lending or not sommes_recovery:
+        if len(montants_lending) == 0 or len(montants_recovery) == 0:
             return 0
         
-        # S'assurer que les deux listes ont la même longueur
-        min_length = min(len(sommes_lending), len(sommes_recovery))
-        sommes_lending = sommes_lending[:min_length]
-        sommes_recovery = sommes_recovery[:min_length]
-        
-        resultats_finaux = []
-        resultat_precedent = 0
-        
-        for i in range(len(sommes_lending)):
-            difference_ligne_actuelle = sommes_lending[i] - sommes_recovery[i]
-            resultat_cumulatif = resultat_precedent + difference_ligne_actuelle
-            resultats_finaux.append(resultat_cumulatif)
-            resultat_precedent = resultat_cumulatif
-        
-        if not resultats_finaux:
-            return 0
-        
-        prov = max(resultats_finaux)
-        return prov
+        return float(provision_vectorisee(montants_lending, montants_recovery))
     
     except Exception as e:
         print(f"Erreur dans provision: {e}")
         return 0
 
-def montecarlo_ameliore(df: pd.DataFrame) -> pd.DataFrame:
+def montecarlo_ameliore(df: pd.DataFrame, rng=None) -> pd.DataFrame:
     """
     Rééchantillonnage Monte Carlo avec distribution de Poisson
     
     Args:
         df: DataFrame d'entrée
+        rng: numpy.random.Generator (défaut: état global np.random)
         
     Returns:
         pd.DataFrame: DataFrame rééchantillonné
     """
     try:
+        if rng is None:
+            rng = np.random
+        
         # Copie de la structure du DataFrame original
         data_final = df.copy()
         
@@ -122,7 +106,7 @@ def montecarlo_ameliore(df: pd.DataFrame) -> pd.DataFrame:
                 
                 if lambda_hat > 0:
                     # Simuler en préservant la variabilité relative entre les intervalles
-                    valeurs_simulees = np.random.poisson(lam=lambda_hat, size=len(valeurs_originales))
+                    valeurs_simulees = rng.poisson(lam=lambda_hat, size=len(valeurs_originales))
                 else:
                     valeurs_simulees = np.zeros_like(valeurs_originales)
                 
@@ -135,17 +119,21 @@ def montecarlo_ameliore(df: pd.DataFrame) -> pd.DataFrame:
         print(f"Erreur dans montecarlo: {e}")
         return df  # Retourner le DataFrame original en cas d'erreur
 
-def bootstrap_ameliore(df: pd.DataFrame) -> pd.DataFrame:
+def bootstrap_ameliore(df: pd.DataFrame, rng=None) -> pd.DataFrame:
     """
     Rééchantillonnage Bootstrap avec remplacement
     
     Args:
         df: DataFrame d'entrée
+        rng: numpy.random.Generator (défaut: état global np.random)
         
     Returns:
         pd.DataFrame: DataFrame rééchantillonné
     """
     try:
+        if rng is None:
+            rng = np.random
+        
         # Copie de la structure du DataFrame original
         data_final = df.copy()
         
@@ -161,7 +149,7 @@ def bootstrap_ameliore(df: pd.DataFrame) -> pd.DataFrame:
         
         for date in dates_uniques:
             # Rééchantillonner une date aléatoire (avec remise)
-            date_echantillon = np.random.choice(dates_disponibles)
+            date_echantillon = rng.choice(dates_disponibles)
             
             # Filtrer les données originales pour la date échantillonnée
             mask_original = df[date_col] == date_echantillon
@@ -179,7 +167,334 @@ def bootstrap_ameliore(df: pd.DataFrame) -> pd.DataFrame:
         print(f"Erreur dans bootstrap: {e}")
         return df  # Retourner le DataFrame original en cas d'erreur
 
-def estimation(lending_df, recovery_df, alpha=0.95, N=10000, method="Montecarlo"):
+def _vers_dataframe(df, tableau, lignes):
+    """Replace un tirage (lignes × dénominations) dans la structure du DataFrame d'origine"""
+    data_final = df.copy()
+    data_final[tableau['colonnes']] = lignes
+    return data_final
+
+def reproduire_replications(lending_df, recovery_df, method, seed=None, n=10):
+    """
+    Reconstitue les DataFrames des n premières réplications d'un job
+
+    Avec la même graine, ce sont exactement les tirages utilisés par
+    estimation() (moteur numpy): une trajectoire peut donc être recalculée à
+    la demande au lieu d'être stockée. Si les tables ne peuvent pas être
+    préparées, les moteurs pandas sont alimentés par un Generator initialisé
+    avec la graine.
+
+    Returns:
+        tuple: (liste des DataFrames lending, liste des DataFrames recovery)
+    """
+    method = method.lower()
+    if method not in ("montecarlo", "bootstrap"):
+        raise ValueError("Méthode doit être 'montecarlo' ou 'bootstrap'")
+    if seed is None:
+        seed = nouvelle_graine()
+
+    tableau_lending = preparer_tableau(lending_df)
+    tableau_recovery = preparer_tableau(recovery_df)
+    if tableau_lending is None or tableau_recovery is None:
+        rng = np.random.default_rng(seed)
+        reechantillonner = montecarlo_ameliore if method == "montecarlo" else bootstrap_ameliore
+        simulated_lending_list = [reechantillonner(lending_df, rng) for _ in range(n)]
+        simulated_recovery_list = [reechantillonner(recovery_df, rng) for _ in range(n)]
+        return simulated_lending_list, simulated_recovery_list
+
+    simulated_lending_list = []
+    simulated_recovery_list = []
+    for indice_flux, debut, fin in decouper_flux(0, n):
+        rng_lending, rng_recovery = generateurs_flux(seed, indice_flux)
+        bloc_lending = simuler_bloc(tableau_lending, fin - debut, rng_lending, method)
+        bloc_recovery = simuler_bloc(tableau_recovery, fin - debut, rng_recovery, method)
+        simulated_lending_list.extend(_vers_dataframe(lending_df, tableau_lending, lignes) for lignes in bloc_lending)
+        simulated_recovery_list.extend(_vers_dataframe(recovery_df, tableau_recovery, lignes) for lignes in bloc_recovery)
+    return simulated_lending_list, simulated_recovery_list
+
+def quantile_cible(alpha):
+    """Niveau du quantile suivi pour la convergence: borne haute de l'intervalle de confiance"""
+    return 1 - (1 - alpha) / 2
+
+def fusionner_triees(triees, bloc):
+    """
+    Insère un bloc de provisions dans un tableau déjà trié
+
+    Seul le bloc est trié, puis inséré à ses positions (np.searchsorted) en une
+    copie linéaire: le suivi de convergence ne retrie pas toutes les provisions
+    à chaque bloc. Le résultat est celui de np.sort sur l'ensemble.
+    """
+    bloc = np.sort(np.asarray(bloc, dtype=float))
+    return np.insert(triees, np.searchsorted(triees, bloc), bloc)
+
+def _valeur_de_rang(valeurs, rang):
+    """Valeur de rang (fractionnaire) d'un tableau trié, interpolée comme np.interp"""
+    bas = int(np.floor(rang))
+    haut = min(bas + 1, len(valeurs) - 1)
+    return float(valeurs[bas] + (valeurs[haut] - valeurs[bas]) * (rang - bas))
+
+def precision_quantile(provisions, alpha=0.95, z=1.96, triees=False):
+    """
+    Erreur standard Monte Carlo du quantile cible et précision relative
+
+    L'erreur standard est déduite de l'intervalle de confiance non paramétrique
+    du quantile (statistiques d'ordre de rangs n*p ± z*sqrt(n*p*(1-p))).
+
+    Args:
+        provisions: Provisions simulées (liste, tableau ou CroquisQuantiles)
+        alpha: Niveau de confiance (même sens que calculate_risk_metrics)
+        triees: Vrai si provisions est déjà un tableau trié (pas de nouveau tri)
+
+    Returns:
+        dict: {'quantile', 'standard_error', 'relative_precision'}
+    """
+    if isinstance(provisions, CroquisQuantiles):
+        n = provisions.n
+        valeur_de_rang = lambda rang: float(provisions.quantile(rang / max(n - 1, 1)))
+    else:
+        valeurs = np.asarray(provisions, dtype=float)
+        if not triees:
+            valeurs = np.sort(valeurs)
+        n = len(valeurs)
+        valeur_de_rang = lambda rang: _valeur_de_rang(valeurs, rang)
+    if n < 2:
+        return {'quantile': None, 'standard_error': None, 'relative_precision': None}
+
+    p = quantile_cible(alpha)
+    quantile = valeur_de_rang(p * (n - 1))
+    demi_largeur = z * np.sqrt(n * p * (1 - p))
+    rang_bas = int(max(0, np.floor(n * p - demi_largeur)))
+    rang_haut = int(min(n - 1, np.ceil(n * p + demi_largeur)))
+    erreur_standard = (valeur_de_rang(rang_haut) - valeur_de_rang(rang_bas)) / (2 * z)
+    precision = erreur_standard / abs(quantile) if quantile != 0 else float('inf')
+    return {'quantile': quantile, 'standard_error': erreur_standard, 'relative_precision': precision}
+
+def convergence_atteinte(provisions, alpha, target_precision, triees=False):
+    """
+    Indique si la précision relative demandée est atteinte sur le quantile cible
+
+    Aucun arrêt avant d'avoir assez de réplications dans la queue de distribution.
+    triees: voir precision_quantile.
+    """
+    p = quantile_cible(alpha)
+    minimum = max(500, int(np.ceil(20 / (1 - p))))
+    if len(provisions) < minimum:
+        return False
+    precision = precision_quantile(provisions, alpha, triees=triees)['relative_precision']
+    return precision is not None and precision <= target_precision
+
+def _reechantillonneur(lending_df, recovery_df, method, rng=None):
+    """
+    Retourne une fonction qui produit un couple (lending, recovery) rééchantillonné
+    avec les moteurs pandas historiques
+    """
+    reechantillonner = montecarlo_ameliore if method == "montecarlo" else bootstrap_ameliore
+    return lambda: (reechantillonner(lending_df, rng), reechantillonner(recovery_df, rng))
+
+def simuler_provisions(lending_df, recovery_df, method, seed, debut, fin, max_workers=None,
+                       progress_callback=None, stop_check=None, checkpoint_callback=None, tableaux=None):
+    """
+    Provisions des réplications [debut, fin) d'un job, sans la provision réelle
+
+    Avec le moteur numpy, ce sont exactement les réplications qu'aurait
+    produites estimation() avec la même graine et N >= fin: on peut donc
+    prolonger un job terminé en ne calculant que le delta. Si les tables ne
+    peuvent pas être préparées, les moteurs pandas sont alimentés par un
+    Generator dérivé de (seed, debut), reproductible mais distinct du job initial.
+
+    progress_callback(faites, total, quantile) est appelé après chaque bloc,
+    avec faites compté depuis la réplication 0 et quantile=None.
+    stop_check() est consulté entre les blocs (voir _raison_arret): le calcul
+    s'arrête et renvoie les provisions déjà calculées.
+    checkpoint_callback(provisions) reçoit après chaque bloc les provisions
+    calculées depuis debut: un job interrompu reprend en rappelant cette
+    fonction avec debut + len(provisions).
+    tableaux: couple (lending, recovery) déjà préparé par preparer_tableau, pour
+    ne pas refaire la préparation (voir comparer_methodes).
+
+    Returns:
+        list: Provisions simulées (fin - debut valeurs, moins en cas d'arrêt)
+    """
+    method = method.lower()
+    if method not in ("montecarlo", "bootstrap"):
+        raise ValueError("Méthode doit être 'montecarlo' ou 'bootstrap'")
+    if fin <= debut:
+        return []
+
+    if tableaux is None:
+        tableaux = (preparer_tableau(lending_df), preparer_tableau(recovery_df))
+    tableau_lending, tableau_recovery = tableaux
+    if tableau_lending is None or tableau_recovery is None:
+        reechantillonner = _reechantillonneur(lending_df, recovery_df, method, np.random.default_rng([seed, debut]))
+        provisions = []
+        for i in range(fin - debut):
+            provisions.append(provision(*reechantillonner()))
+            if (i + 1) % REPLICATIONS_PAR_FLUX == 0:
+                _signaler_progression(progress_callback, debut + len(provisions), fin)
+                _enregistrer_reprise(checkpoint_callback, provisions)
+                if _raison_arret(stop_check):
+                    break
+        return provisions
+
+    provisions = []
+    for _, provisions_du_bloc in iterer_provisions(tableau_lending, tableau_recovery, method, seed,
+                                                   debut, fin, max_workers):
+        provisions.extend(provisions_du_bloc.tolist())
+        _signaler_progression(progress_callback, debut + len(provisions), fin)
+        _enregistrer_reprise(checkpoint_callback, provisions)
+        if _raison_arret(stop_check):
+            break
+    return provisions
+
+# Méthodes exécutées par un job de comparaison
+METHODES_COMPAREES = ("montecarlo", "bootstrap")
+
+def comparer_methodes(lending_df, recovery_df, N=10000, seed=None, max_workers=None, progress_callback=None,
+                      stop_check=None, checkpoint_callback=None, resume_provisions=None):
+    """
+    Provisions Monte Carlo et Bootstrap d'un même jeu de données, en un seul calcul
+
+    La provision réelle et les tableaux préparés (vecteurs de poids, jours)
+    sont calculés une fois et partagés par les deux méthodes. Si au moins deux
+    cœurs sont disponibles, les deux méthodes tournent en même temps et se
+    partagent les processus de PERFORMANCE_CONFIG['MAX_WORKERS']. Chaque
+    méthode produit exactement les réplications de simuler_provisions (et donc
+    d'estimation) avec la même graine.
+
+    Les callbacks sont toujours appelés depuis le thread appelant:
+    progress_callback(faites, total, None) avec faites et total cumulés sur les
+    deux méthodes, checkpoint_callback(method, provisions) avec les provisions
+    de cette méthode depuis la reprise, et stop_check() entre deux blocs.
+
+    Args:
+        resume_provisions: dict {méthode: provisions déjà calculées} d'un job interrompu
+
+    Returns:
+        dict: {'real_provision', 'seed', 'provisions': {méthode: liste}, 'stopped'}
+    """
+    from .parallel import nombre_workers
+
+    if seed is None:
+        seed = nouvelle_graine()
+    real_provision = provision(lending_df, recovery_df)
+    tableaux = (preparer_tableau(lending_df), preparer_tableau(recovery_df))
+    print(f"✅ Provision réelle et tableaux préparés une fois pour {len(METHODES_COMPAREES)} méthodes")
+
+    reprises = resume_provisions or {}
+    debuts = {m: min(len(reprises.get(m, [])), N) for m in METHODES_COMPAREES}
+    faites = dict(debuts)
+    if max_workers is None:
+        max_workers = charger_config_performance()["MAX_WORKERS"]
+    simultanees = nombre_workers(max_workers, len(METHODES_COMPAREES)) >= 2
+    workers_par_methode = max(1, int(max_workers) // len(METHODES_COMPAREES)) if simultanees else max_workers
+
+    # Les threads de calcul ne font que signaler leurs blocs: les callbacks restent dans ce thread
+    evenements = queue.Queue()
+    arret = threading.Event()
+    raison_arret = None
+
+    def simuler(method):
+        try:
+            if arret.is_set():
+                return []
+            return simuler_provisions(
+                lending_df, recovery_df, method, seed, debuts[method], N, workers_par_methode,
+                stop_check=lambda: raison_arret if arret.is_set() else None,
+                checkpoint_callback=lambda simulees: evenements.put((method, simulees)),
+                tableaux=tableaux
+            )
+        finally:
+            evenements.put((method, None))
+
+    print(f"🚀 Comparaison sur {N} réplications par méthode (graine {seed}, "
+          f"méthodes {'simultanées' if simultanees else 'successives'})")
+    with ThreadPoolExecutor(max_workers=len(METHODES_COMPAREES) if simultanees else 1) as executor:
+        futures = {m: executor.submit(simuler, m) for m in METHODES_COMPAREES}
+        en_cours = set(METHODES_COMPAREES)
+        while en_cours:
+            method, simulees = evenements.get()
+            if simulees is None:
+                en_cours.discard(method)
+                continue
+            faites[method] = debuts[method] + len(simulees)
+            _signaler_progression(progress_callback, sum(faites.values()), N * len(METHODES_COMPAREES))
+            if checkpoint_callback is not None:
+                _enregistrer_reprise(lambda provisions: checkpoint_callback(method, provisions), simulees)
+            if raison_arret is None:
+                raison_arret = _raison_arret(stop_check)
+                if raison_arret:
+                    arret.set()
+        nouvelles = {m: futures[m].result() for m in METHODES_COMPAREES}
+
+    provisions = {
+        m: np.asarray(reprises.get(m, [])[:debuts[m]], dtype=float).tolist() + nouvelles[m]
+        for m in METHODES_COMPAREES
+    }
+    return {
+        'real_provision': real_provision,
+        'seed': seed,
+        'provisions': provisions,
+        'stopped': raison_arret
+    }
+
+def _enregistrer_reprise(checkpoint_callback, simulees):
+    """
+    Transmet les provisions déjà simulées au point de reprise du job
+
+    Une erreur d'écriture n'interrompt jamais le calcul.
+    """
+    if checkpoint_callback is None:
+        return
+    try:
+        checkpoint_callback(simulees)
+    except Exception as e:
+        print(f"⚠️ Erreur lors de l'enregistrement du point de reprise: {e}")
+
+def _raison_arret(stop_check):
+    """
+    Consulte stop_check entre deux blocs de réplications
+
+    Returns:
+        str ou None: Raison de l'arrêt ('cancelled', 'timeout'...), None pour continuer.
+        Une erreur de la vérification n'interrompt jamais le calcul.
+    """
+    if stop_check is None:
+        return None
+    try:
+        raison = stop_check()
+    except Exception as e:
+        print(f"⚠️ Erreur lors de la vérification d'arrêt: {e}")
+        return None
+    if raison:
+        print(f"⏹️ Arrêt demandé entre deux blocs: {raison}")
+    return raison or None
+
+def _signaler_progression(progress_callback, faites, total, simulees=None, alpha=0.95, triees=False):
+    """
+    Transmet l'avancement d'un job: (faites, total, estimation du quantile cible)
+
+    triees: Vrai si simulees est un tableau déjà trié (lecture directe du rang)
+
+    Une erreur du suivi n'interrompt jamais le calcul.
+    """
+    if progress_callback is None:
+        return
+    try:
+        quantile = None
+        if simulees is not None and len(simulees):
+            p = quantile_cible(alpha)
+            if isinstance(simulees, CroquisQuantiles):
+                quantile = float(simulees.quantile(p))
+            elif triees:
+                quantile = _valeur_de_rang(simulees, p * (len(simulees) - 1))
+            else:
+                quantile = float(np.percentile(simulees, p * 100))
+        progress_callback(faites, total, quantile)
+    except Exception as e:
+        print(f"⚠️ Erreur du suivi de progression: {e}")
+
+def estimation(lending_df, recovery_df, alpha=0.95, N=10000, method="Montecarlo", engine="numpy",
+               seed=None, max_workers=None, target_precision=None, sketch=False, progress_callback=None,
+               stop_check=None, checkpoint_callback=None, resume_provisions=None):
     """
     Fonction principale d'estimation avec génération de fichiers CSV
     
@@ -189,6 +504,27 @@ def estimation(lending_df, recovery_df, alpha=0.95, N=10000, method="Montecarlo"
         alpha: Niveau de confiance (défaut: 0.95)
         N: Nombre d'échantillons (défaut: 10000)
         method: Méthode de rééchantillonnage ("Montecarlo" ou "Bootstrap")
+        engine: Moteur de rééchantillonnage ("numpy" vectorisé ou "pandas" historique)
+        seed: Graine du job (tirée au hasard si absente)
+        max_workers: Processus parallèles (défaut: PERFORMANCE_CONFIG['MAX_WORKERS'])
+        target_precision: Précision relative visée sur le quantile alpha; arrêt
+                          anticipé dès qu'elle est atteinte (N devient un budget max)
+        sketch: Si vrai, les provisions simulées ne sont pas conservées mais résumées
+                dans un CroquisQuantiles (mémoire bornée, pour N très grand).
+                Option du moteur seul (appels directs, notebooks): result['provisions']
+                ne contient alors que la provision réelle et result['sketch'] le
+                croquis. Les jobs n'utilisent pas ce mode: ils enregistrent
+                toutes les provisions simulées (fichier .npy).
+        progress_callback: Appelé après chaque bloc avec (faites, N, estimation
+                           courante du quantile cible)
+        stop_check: Consulté entre les blocs; s'il renvoie une raison ('cancelled',
+                    'timeout'), le calcul s'arrête avec les réplications déjà faites
+                    et result['stopped'] contient cette raison
+        checkpoint_callback: Reçoit après chaque bloc les provisions simulées depuis la
+                             réplication 0 (hors mode sketch), pour un point de reprise
+        resume_provisions: Provisions des premières réplications d'un job interrompu
+                           (même graine): le calcul reprend à la réplication suivante
+                           et le résultat est identique à celui d'un job sans interruption
         
     Returns:
         list: Liste des provisions (réelle + simulées)
@@ -196,6 +532,8 @@ def estimation(lending_df, recovery_df, alpha=0.95, N=10000, method="Montecarlo"
     try:
         print(f"🔍 estimation - Début avec méthode: {method}, N: {N}")
         list_provision = []
+        if seed is None:
+            seed = nouvelle_graine()
         
         # Calculer la provision réelle
         provisions = provision(lending_df, recovery_df)
@@ -204,55 +542,121 @@ def estimation(lending_df, recovery_df, alpha=0.95, N=10000, method="Montecarlo"
         
         # Normaliser la méthode
         method_lower = method.lower()
-        if method_lower == "montecarlo":
-            print(f"🚀 Lancement de {N} simulations Monte Carlo...")
-            for i in tqdm(range(N), desc="Monte Carlo"):
-                temp_lending = montecarlo_ameliore(lending_df)
-                temp_recovery = montecarlo_ameliore(recovery_df)
-                provisions = provision(temp_lending, temp_recovery)
-                list_provision.append(provisions)
-            
-            # Générer le fichier CSV pour Monte Carlo (format simple pour votre code)
-            df_provisions = pd.DataFrame(list_provision)
-            df_provisions.to_csv('provisions_montecarlo.csv', index=False, header=False)
-            print(f"✅ {len(list_provision)} provisions Monte Carlo calculées")
-            
-        elif method_lower == "bootstrap":
-            print(f"🚀 Lancement de {N} simulations Bootstrap...")
-            for i in tqdm(range(N), desc="Bootstrap"):
-                temp_lending = bootstrap_ameliore(lending_df)
-                temp_recovery = bootstrap_ameliore(recovery_df)
-                provisions = provision(temp_lending, temp_recovery)
-                list_provision.append(provisions)
-            
-            # Générer le fichier CSV pour Bootstrap (format simple pour votre code)
-            df_provisions = pd.DataFrame(list_provision)
-            df_provisions.to_csv('provisions_bootstrap.csv', index=False, header=False)
-            print(f"✅ {len(list_provision)} provisions Bootstrap calculées")
-        else:
+        if method_lower not in ("montecarlo", "bootstrap"):
             print(f"❌ Méthode inconnue: {method}")
             return list_provision
+        libelle = "Monte Carlo" if method_lower == "montecarlo" else "Bootstrap"
+        
+        # Préparer les tableaux NumPy une seule fois pour tout le job
+        tableaux = None
+        if engine == "numpy":
+            tableaux = (preparer_tableau(lending_df), preparer_tableau(recovery_df))
+            if tableaux[0] is None or tableaux[1] is None:
+                tableaux = None
+        
+        # Provisions simulées: liste complète, ou croquis de quantiles en mode sketch
+        croquis = CroquisQuantiles(seed=seed) if sketch else None
+        # Copie triée des provisions simulées, complétée bloc après bloc pour le suivi
+        # du quantile cible et le test de convergence (hors mode sketch)
+        triees = np.zeros(0)
+        raison_arret = None
+        
+        # Reprise d'un job interrompu: les flux de la graine reprennent à la réplication suivante
+        debut = 0
+        if resume_provisions is not None and len(resume_provisions):
+            debut = min(len(resume_provisions), N)
+            if sketch:
+                croquis.ajouter(resume_provisions[:debut])
+            else:
+                list_provision.extend(np.asarray(resume_provisions[:debut], dtype=float).tolist())
+            print(f"♻️ Reprise du job à la réplication {debut}/{N}")
+        
+        if tableaux is not None:
+            print(f"🚀 Lancement de {N} simulations {libelle} (moteur numpy, graine {seed})...")
+            croquis_k = croquis.k if sketch else None
+            with tqdm(total=N, initial=debut, desc=libelle) as barre:
+                for _, resultat_du_bloc in iterer_provisions(*tableaux, method_lower, seed, debut, N, max_workers,
+                                                             croquis_k):
+                    if sketch:
+                        croquis.fusionner(resultat_du_bloc)
+                    else:
+                        list_provision.extend(resultat_du_bloc.tolist())
+                    barre.update(len(resultat_du_bloc))
+                    if sketch:
+                        deja_simulees = croquis
+                    else:
+                        triees = fusionner_triees(triees, list_provision[1 + len(triees):])
+                        deja_simulees = triees
+                        _enregistrer_reprise(checkpoint_callback, list_provision[1:])
+                    _signaler_progression(progress_callback, len(deja_simulees), N, deja_simulees, alpha,
+                                          triees=not sketch)
+                    if target_precision and convergence_atteinte(deja_simulees, alpha, target_precision,
+                                                                 triees=not sketch):
+                        print(f"🎯 Précision {target_precision} atteinte après {len(deja_simulees)} réplications")
+                        # Arrêt anticipé: le job est terminé avec moins de N réplications
+                        _signaler_progression(progress_callback, len(deja_simulees), len(deja_simulees),
+                                              deja_simulees, alpha, triees=not sketch)
+                        break
+                    raison_arret = _raison_arret(stop_check)
+                    if raison_arret:
+                        break
+        else:
+            print(f"🚀 Lancement de {N} simulations {libelle} (moteur pandas)...")
+            # Comme simuler_provisions: une reprise tire un Generator dérivé de (seed, debut)
+            rng = np.random.default_rng(seed if debut == 0 else [seed, debut])
+            reechantillonner = _reechantillonneur(lending_df, recovery_df, method_lower, rng)
+            for i in tqdm(range(debut, N), initial=debut, total=N, desc=libelle):
+                temp_lending, temp_recovery = reechantillonner()
+                provisions = provision(temp_lending, temp_recovery)
+                if sketch:
+                    croquis.ajouter(provisions)
+                else:
+                    list_provision.append(provisions)
+                if (i + 1) % REPLICATIONS_PAR_FLUX != 0:
+                    continue
+                if sketch:
+                    deja_simulees = croquis
+                else:
+                    triees = fusionner_triees(triees, list_provision[1 + len(triees):])
+                    deja_simulees = triees
+                    _enregistrer_reprise(checkpoint_callback, list_provision[1:])
+                _signaler_progression(progress_callback, i + 1, N, deja_simulees, alpha, triees=not sketch)
+                if target_precision and convergence_atteinte(deja_simulees, alpha, target_precision,
+                                                             triees=not sketch):
+                    print(f"🎯 Précision {target_precision} atteinte après {i + 1} réplications")
+                    _signaler_progression(progress_callback, i + 1, i + 1, deja_simulees, alpha, triees=not sketch)
+                    break
+                raison_arret = _raison_arret(stop_check)
+                if raison_arret:
+                    break
+        
+        if sketch:
+            samples_run = croquis.n
+            precision = precision_quantile(croquis, alpha)
+            # Les graphiques utilisent des quantiles représentatifs à la place des provisions
+            provisions_graphiques = list_provision + croquis.valeurs_representatives().tolist()
+        else:
+            samples_run = len(list_provision) - 1
+            triees = fusionner_triees(triees, list_provision[1 + len(triees):])
+            precision = precision_quantile(triees, alpha, triees=True)
+            provisions_graphiques = list_provision
+        
+        # Générer le fichier CSV des provisions (format simple pour votre code)
+        df_provisions = pd.DataFrame(provisions_graphiques)
+        df_provisions.to_csv(f'provisions_{method_lower}.csv', index=False, header=False)
+        print(f"✅ {samples_run + 1} provisions {libelle} calculées")
         
         # Calculer la courbe de densité
-        density_curve = calculate_density_curve(list_provision, method_lower)
+        density_curve = calculate_density_curve(provisions_graphiques, method_lower)
         
         # Générer les patterns temporels
         print(f"🔄 Génération des patterns temporels...")
-        simulated_lending_list = []
-        simulated_recovery_list = []
-        
-        # Générer les simulations pour les patterns (maximum 20 pour la performance)
-        max_patterns_simulations = min(20, N)
-        for i in range(max_patterns_simulations):
-            if method_lower == "montecarlo":
-                temp_lending = montecarlo_ameliore(lending_df)
-                temp_recovery = montecarlo_ameliore(recovery_df)
-            else:  # bootstrap
-                temp_lending = bootstrap_ameliore(lending_df)
-                temp_recovery = bootstrap_ameliore(recovery_df)
-            
-            simulated_lending_list.append(temp_lending)
-            simulated_recovery_list.append(temp_recovery)
+        # Générer les simulations pour les patterns (maximum 20 pour la performance):
+        # ce sont les premières réplications du job, retrouvées grâce à la graine
+        max_patterns_simulations = min(20, samples_run)
+        simulated_lending_list, simulated_recovery_list = reproduire_replications(
+            lending_df, recovery_df, method_lower, seed, max_patterns_simulations
+        )
         
         # Générer le graphique des patterns temporels
         patterns_plot = generate_temporal_patterns_plot(
@@ -261,14 +665,20 @@ def estimation(lending_df, recovery_df, alpha=0.95, N=10000, method="Montecarlo"
             method_lower, max_patterns_simulations
         )
         
-        print(f"🎉 Estimation terminée - {len(list_provision)} provisions au total")
+        print(f"🎉 Estimation terminée - {samples_run + 1} provisions au total")
         
         # Retourner un dictionnaire avec les provisions selon la méthode
         result = {
             'provisions': list_provision,
             'density_curve': density_curve,
-            'patterns_plot': patterns_plot
+            'patterns_plot': patterns_plot,
+            'seed': seed,
+            'samples_run': samples_run,
+            'achieved_precision': precision['relative_precision'],
+            'stopped': raison_arret
         }
+        if sketch:
+            result['sketch'] = croquis
         
         if method_lower == "montecarlo":
             result['provisions_montecarlo'] = list_provision
@@ -302,11 +712,70 @@ def clean(data):
         print(f"Erreur dans clean: {e}")
         return data
 
+# Percentiles publiés dans les métriques de risque
+NIVEAUX_PERCENTILES = [1, 2.5, 5, 25, 50, 75, 95, 97.5, 99]
+
+def _metriques_croquis(croquis, alpha):
+    """Métriques de risque calculées depuis un croquis de quantiles (clean() compris)"""
+    rogne = croquis.tronque(1, 99)
+    if rogne.n == 0:
+        return {'percentiles': {}, 'confidence_interval': {}, 'mean': 0, 'std': 0}
+    
+    valeurs = rogne.percentile(NIVEAUX_PERCENTILES)
+    alpha_lower = (1 - alpha) / 2
+    borne_basse, borne_haute = rogne.quantile([alpha_lower, 1 - alpha_lower])
+    return {
+        'percentiles': {f"{p:g}%": float(v) for p, v in zip(NIVEAUX_PERCENTILES, valeurs)},
+        'confidence_interval': {
+            'lower': float(borne_basse),
+            'upper': float(borne_haute),
+            'alpha': alpha
+        },
+        'mean': rogne.moyenne(),
+        'std': rogne.ecart_type()
+    }
+
+def comparer_metriques(metriques):
+    """
+    Tableau côte à côte des métriques de risque de plusieurs méthodes
+
+    Args:
+        metriques: dict {méthode: résultat de calculate_risk_metrics}
+
+    Returns:
+        dict: Percentiles, bornes de l'intervalle de confiance, moyenne et écart-type,
+              chacun sous la forme {méthode: valeur, 'ecart': bootstrap - montecarlo}
+    """
+    def cote_a_cote(valeurs):
+        ligne = dict(valeurs)
+        if valeurs.get('montecarlo') is not None and valeurs.get('bootstrap') is not None:
+            ligne['ecart'] = valeurs['bootstrap'] - valeurs['montecarlo']
+        return ligne
+
+    return {
+        'percentiles': {
+            niveau: cote_a_cote({m: r['percentiles'].get(niveau) for m, r in metriques.items()})
+            for niveau in (f"{p:g}%" for p in NIVEAUX_PERCENTILES)
+        },
+        'confidence_interval': {
+            borne: cote_a_cote({m: r['confidence_interval'].get(borne) for m, r in metriques.items()})
+            for borne in ('lower', 'upper')
+        },
+        'mean': cote_a_cote({m: r['mean'] for m, r in metriques.items()}),
+        'std': cote_a_cote({m: r['std'] for m, r in metriques.items()})
+    }
+
 def calculate_risk_metrics(provisions_list, alpha=0.95):
     """
     Calcule les métriques de risque basées sur les provisions simulées
+
+    provisions_list peut aussi être un CroquisQuantiles (estimation en mode sketch):
+    le croquis ne contient que des provisions simulées et est rogné comme clean().
     """
     try:
+        if isinstance(provisions_list, CroquisQuantiles):
+            return _metriques_croquis(provisions_list, alpha)
+        
         if not provisions_list or len(provisions_list) < 2:
             return {
                 'percentiles': {},
@@ -370,6 +839,10 @@ def get_provision_for_risk_level(provisions_list, risk_level):
     Calcule la provision pour un niveau de risque donné
     """
     try:
+        if isinstance(provisions_list, CroquisQuantiles):
+            rogne = provisions_list.tronque(1, 99)
+            return float(rogne.percentile(100 - risk_level)) if rogne.n else 0
+        
         if not provisions_list or len(provisions_list) < 2:
             return 0
         
@@ -389,6 +862,14 @@ def get_risk_level_for_provision(provisions_list, target_provision):
     Calcule le niveau de risque pour une provision donnée
     """
     try:
+        if isinstance(provisions_list, CroquisQuantiles):
+            rogne = provisions_list.tronque(1, 99)
+            if rogne.n == 0:
+                return 0
+            # Même granularité que le calcul sur liste: percentile entier entre 1 et 99
+            percentile = int(np.clip(np.round(rogne.rang(target_provision) * 100), 1, 99))
+            return float(100 - percentile)
+        
         if not provisions_list or len(provisions_list) < 2:
             return 0
         
@@ -407,37 +888,128 @@ def get_risk_level_for_provision(provisions_list, target_provision):
         print(f"Erreur dans get_risk_level_for_provision: {e}")
         return 0
 
+def construire_index_provisions(provisions_list):
+    """
+    Index des provisions pour les calculs de risque: provisions nettoyées et triées
+
+    Mêmes provisions que calculate_risk_metrics (provisions_list[1:] puis clean).
+    Le tableau trié suffit à décrire la fonction de répartition empirique: la
+    valeur de rang i correspond à l'ordre i / (n - 1), comme pour np.percentile.
+
+    Returns:
+        np.ndarray: Provisions triées (float64), vide si pas assez de données
+    """
+    if provisions_list is None or len(provisions_list) < 2:
+        return np.zeros(0)
+    return np.sort(np.asarray(clean(provisions_list[1:]), dtype=float))
+
+def provision_pour_risque(index, risk_level):
+    """
+    Provision(s) pour un ou plusieurs niveaux de risque, depuis l'index trié
+
+    Identique à get_provision_for_risk_level (interpolation linéaire de
+    np.percentile), en O(1) par niveau.
+    """
+    n = len(index)
+    risk_level = np.asarray(risk_level, dtype=float)
+    if n == 0:
+        return np.zeros_like(risk_level)
+    rangs = np.clip((100 - risk_level) / 100, 0, 1) * (n - 1)
+    bas = np.floor(rangs).astype(int)
+    haut = np.minimum(bas + 1, n - 1)
+    return index[bas] + (rangs - bas) * (index[haut] - index[bas])
+
+def risque_pour_provision(index, target_provision):
+    """
+    Niveau(x) de risque pour une ou plusieurs provisions, depuis l'index trié
+
+    Inverse exact de provision_pour_risque par recherche dichotomique
+    (O(log n)): le rang est interpolé entre les deux provisions qui encadrent
+    la cible. Pour une valeur présente plusieurs fois, on prend le milieu de
+    ses rangs.
+    """
+    n = len(index)
+    cible = np.asarray(target_provision, dtype=float)
+    if n == 0:
+        return np.zeros_like(cible)
+    if n == 1:
+        return np.where(cible >= index[0], 0.0, 100.0)
+
+    gauche = np.searchsorted(index, cible, side='left')
+    droite = np.searchsorted(index, cible, side='right')
+    # Cible strictement entre index[suivant - 1] et index[suivant]
+    suivant = np.clip(gauche, 1, n - 1)
+    ecart = index[suivant] - index[suivant - 1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fraction = np.where(ecart > 0, (cible - index[suivant - 1]) / ecart, 0.0)
+    rangs = suivant - 1 + np.clip(fraction, 0, 1)
+    # Cible présente dans l'index: milieu des rangs des valeurs égales
+    rangs = np.where(droite > gauche, (gauche + droite - 1) / 2, rangs)
+    return 100 * (1 - rangs / (n - 1))
+
+def intervalle_confiance_index(index, alpha):
+    """
+    Intervalle(s) de confiance pour un ou plusieurs alpha, depuis l'index trié
+
+    Mêmes bornes que calculate_risk_metrics(...)['confidence_interval']: les
+    provisions ne dépendent pas d'alpha, seul ce calcul en dépend. Changer
+    d'alpha ne demande donc aucune nouvelle réplication.
+
+    Returns:
+        tuple: (bornes basses, bornes hautes), de la forme de alpha
+    """
+    alpha = np.asarray(alpha, dtype=float)
+    if len(index) == 0:
+        return np.zeros_like(alpha), np.zeros_like(alpha)
+    alpha_lower = (1 - alpha) / 2
+    alpha_upper = 1 - alpha_lower
+    return np.percentile(index, alpha_lower * 100), np.percentile(index, alpha_upper * 100)
+
+def metriques_alpha(index, alpha, intervalle=None):
+    """
+    Sorties dépendant d'alpha: intervalle de confiance et percentiles de ses bornes
+
+    Args:
+        index: Index trié des provisions (voir construire_index_provisions)
+        alpha: Niveau de confiance
+        intervalle: Intervalle déjà calculé pour cet alpha (dict lower / upper):
+                    l'index n'est alors pas lu
+
+    Returns:
+        dict: {'confidence_interval': {'lower', 'upper', 'alpha'}, 'highlighted_percentiles': {niveau: valeur}}
+    """
+    if intervalle:
+        borne_basse, borne_haute = intervalle['lower'], intervalle['upper']
+    else:
+        borne_basse, borne_haute = intervalle_confiance_index(index, alpha)
+    alpha_lower = (1 - alpha) / 2
+    return {
+        'confidence_interval': {
+            'lower': float(borne_basse),
+            'upper': float(borne_haute),
+            'alpha': alpha
+        },
+        'highlighted_percentiles': {
+            f"{100 * alpha_lower:g}%": float(borne_basse),
+            f"{100 * (1 - alpha_lower):g}%": float(borne_haute)
+        }
+    }
+
 def calculate_real_cumulative(lending_df, recovery_df):
     """
     Calcule la trajectoire cumulative réelle pour l'affichage
     """
     try:
-        sommes_lending = calculer_somme(lending_df)
-        sommes_recovery = calculer_somme(recovery_df)
-        
-        if not sommes_lending or not sommes_recovery:
-            return []
-        
-        min_length = min(len(sommes_lending), len(sommes_recovery))
-        sommes_lending = sommes_lending[:min_length]
-        sommes_recovery = sommes_recovery[:min_length]
-        
-        resultats_finaux = []
-        resultat_precedent = 0
+        montants_lending = montants_dataframe(lending_df)
+        montants_recovery = montants_dataframe(recovery_df)
         
-        for i in range(len(sommes_lending)):
-            difference_ligne_actuelle = sommes_lending[i] - sommes_recovery[i]
-            resultat_cumulatif = resultat_precedent + difference_ligne_actuelle
-            resultats_finaux.append(resultat_cumulatif)
-            resultat_precedent = resultat_cumulatif
-        
-        return resultats_finaux
+        return trajectoire_cumulee(montants_lending, montants_recovery).tolist()
     
     except Exception as e:
         print(f"Erreur dans calculate_real_cumulative: {e}")
         return []
 
-def calculate_simulated_cumulative_trajectories(lending_df, recovery_df, method="montecarlo", num_trajectories=10):
+def calculate_simulated_cumulative_trajectories(lending_df, recovery_df, method="montecarlo", num_trajectories=10, seed=None):
     """
     Calcule les vraies trajectoires simulées en utilisant la même structure que les données originales
     avec des trajectoires plus étendues et moins serrées au début
@@ -448,6 +1020,8 @@ def calculate_simulated_cumulative_trajectories(lending_df, recovery_df, method=
         recovery_df: DataFrame des remboursements originaux
         method: Méthode de simulation ("montecarlo" ou "bootstrap")
         num_trajectories: Nombre de trajectoires à générer
+        seed: Graine de la simulation (les trajectoires sont alors celles des
+              premières réplications du job)
         
     Returns:
         dict: Dictionnaire contenant les trajectoires et les valeurs de l'axe X
@@ -466,41 +1040,27 @@ def calculate_simulated_cumulative_trajectories(lending_df, recovery_df, method=
         
         trajectories = []
         
+        if method.lower() not in ("montecarlo", "bootstrap"):
+            print(f"❌ Méthode inconnue: {method}")
+            return {'trajectories': [], 'x_axis': x_axis_values}
+        
+        # Générer des données simulées avec la même structure
+        simulated_lending_list, simulated_recovery_list = reproduire_replications(
+            lending_df, recovery_df, method, seed, num_trajectories
+        )
+        
         for i in range(num_trajectories):
             print(f"   Génération trajectoire {i+1}/{num_trajectories}")
-            
-            # Générer des données simulées avec la même structure
-            if method.lower() == "montecarlo":
-                simulated_lending = montecarlo_ameliore(lending_df)
-                simulated_recovery = montecarlo_ameliore(recovery_df)
-            elif method.lower() == "bootstrap":
-                simulated_lending = bootstrap_ameliore(lending_df)
-                simulated_recovery = bootstrap_ameliore(recovery_df)
-            else:
-                print(f"❌ Méthode inconnue: {method}")
-                continue
+            simulated_lending = simulated_lending_list[i]
+            simulated_recovery = simulated_recovery_list[i]
             
             # Calculer la trajectoire cumulative pour cette simulation
-            sommes_lending = calculer_somme(simulated_lending)
-            sommes_recovery = calculer_somme(simulated_recovery)
+            trajectory = calculate_real_cumulative(simulated_lending, simulated_recovery)
             
-            if not sommes_lending or not sommes_recovery:
+            if not trajectory:
                 print(f"⚠️ Trajectoire {i+1} vide, ignorée")
                 continue
             
-            min_length = min(len(sommes_lending), len(sommes_recovery))
-            sommes_lending = sommes_lending[:min_length]
-            sommes_recovery = sommes_recovery[:min_length]
-            
-            # Calculer la trajectoire cumulative pour cette simulation
-            trajectory = []
-            cumulative = 0
-            
-            for j in range(len(sommes_lending)):
-                difference = sommes_lending[j] - sommes_recovery[j]
-                cumulative += difference
-                trajectory.append(cumulative)
-            
             # Optimiser la trajectoire pour qu'elle soit plus étendue et moins serrée au début
             trajectory = optimize_trajectory_spread(trajectory, real_cumulative, i, num_trajectories)
             
@@ -638,29 +1198,13 @@ def calculate_cash_flow(lending_df, recovery_df):
     
     return merged_df
 
-def generate_simulations_avance(original_lending, original_recovery, n_simulations=50, method='montecarlo'):
+def generate_simulations_avance(original_lending, original_recovery, n_simulations=50, method='montecarlo', seed=None):
     """
     Génère des simulations avancées qui préservent la structure temporelle
-    """
-    simulated_lending_list = []
-    simulated_recovery_list = []
     
-    for i in range(n_simulations):
-        if method == 'montecarlo':
-            # Utiliser la version améliorée qui préserve la structure temporelle
-            sim_lending = montecarlo_ameliore(original_lending)
-            sim_recovery = montecarlo_ameliore(original_recovery)
-        elif method == 'bootstrap':
-            # Utiliser la version améliorée qui préserve la structure temporelle
-            sim_lending = bootstrap_ameliore(original_lending)
-            sim_recovery = bootstrap_ameliore(original_recovery)
-        else:
-            raise ValueError("Méthode doit être 'montecarlo' ou 'bootstrap'")
-        
-        simulated_lending_list.append(sim_lending)
-        simulated_recovery_list.append(sim_recovery)
-    
-    return simulated_lending_list, simulated_recovery_list
+    Avec une graine, ce sont les premières réplications de la simulation.
+    """
+    return reproduire_replications(original_lending, original_recovery, method, seed, n_simulations)
 
 def plot_transaction_trajectories(original_lending, original_recovery, 
                                  simulated_lending_list, simulated_recovery_list,
@@ -703,7 +1247,7 @@ def plot_transaction_trajectories(original_lending, original_recovery,
     
     return original_flow, simulated_flows
 
-def generate_trajectory_plot(lending_df, recovery_df, method="montecarlo", num_trajectories=20):
+def generate_trajectory_plot(lending_df, recovery_df, method="montecarlo", num_trajectories=20, seed=None):
     """
     Génère le graphique des trajectoires des montants cumulés et le retourne en base64
     """
@@ -720,7 +1264,7 @@ def generate_trajectory_plot(lending_df, recovery_df, method="montecarlo", num_t
         
         # Générer les simulations
         simulated_lending_list, simulated_recovery_list = generate_simulations_avance(
-            lending_processed, recovery_processed, num_trajectories, method
+            lending_processed, recovery_processed, num_trajectories, method, seed
         )
         
         # Calculer la trajectoire originale
@@ -1019,7 +1563,7 @@ def calculate_density_curve(provisions_list, method="montecarlo"):
         return None
 
 
-def generate_temporal_patterns_plot(lending_df, recovery_df, simulated_lending_list=None, simulated_recovery_list=None, method='montecarlo', num_samples=20):
+def generate_temporal_patterns_plot(lending_df, recovery_df, simulated_lending_list=None, simulated_recovery_list=None, method='montecarlo', num_samples=20, seed=None):
     """
     Génère les graphiques des patterns temporels pour lending et recovery
     
@@ -1030,6 +1574,7 @@ def generate_temporal_patterns_plot(lending_df, recovery_df, simulated_lending_l
         simulated_recovery_list: Liste des DataFrames de recovery simulés (optionnel)
         method: Méthode de simulation ('montecarlo' ou 'bootstrap')
         num_samples: Nombre d'échantillons de simulation
+        seed: Graine de la simulation (optionnel)
         
     Returns:
         dict: Dictionnaire contenant les images base64 des patterns
@@ -1043,19 +1588,9 @@ def generate_temporal_patterns_plot(lending_df, recovery_df, simulated_lending_l
         # Générer les simulations si elles ne sont pas fournies
         if not simulated_lending_list or not simulated_recovery_list:
             print(f"🔄 Génération des simulations pour les patterns...")
-            simulated_lending_list = []
-            simulated_recovery_list = []
-            
-            for i in range(num_samples):
-                if method.lower() == 'montecarlo':
-                    sim_lending = montecarlo_ameliore(lending_df)
-                    sim_recovery = montecarlo_ameliore(recovery_df)
-                else:  # bootstrap
-                    sim_lending = bootstrap_ameliore(lending_df)
-                    sim_recovery = bootstrap_ameliore(recovery_df)
-                
-                simulated_lending_list.append(sim_lending)
-                simulated_recovery_list.append(sim_recovery)
+            simulated_lending_list, simulated_recovery_list = reproduire_replications(
+                lending_df, recovery_df, method, seed, num_samples
+            )
         
         # Configuration de matplotlib
         plt.style.use('default')
@@ -0,0 +1,85 @@
+"""
+Consumer WebSocket de suivi d'une simulation: ws/simulations/<id>/
+
+À la connexion, le client reçoit l'état courant (même format que
+/api/simulations/<id>/status/), puis chaque avancement et changement de
+statut publié par les workers (voir evenements.publier_etat).
+"""
+import asyncio
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from channels.layers import InMemoryChannelLayer
+
+from .evenements import etat_simulation, groupe_simulation
+
+# Relecture de secours de la base quand la couche ne traverse pas les processus (secondes):
+# les événements publiés dans ce processus arrivent toujours par le groupe, ceux des workers
+# sont rattrapés avec au plus ce retard. La lecture ne porte que sur COLONNES_STATUT d'une
+# ligne, et les workers n'écrivent la progression que toutes les 0.5 s au plus.
+INTERVALLE_SURVEILLANCE = 2.0
+
+# Codes de fermeture applicatifs
+CODE_NON_AUTHENTIFIE = 4401
+CODE_NON_TROUVEE = 4404
+
+class SimulationConsumer(AsyncJsonWebsocketConsumer):
+    """Pousse le statut et la progression d'une simulation de l'utilisateur"""
+
+    async def connect(self):
+        self.groupe = None
+        self.surveillance = None
+        self.dernier_evenement = asyncio.get_running_loop().time()
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated:
+            await self.close(code=CODE_NON_AUTHENTIFIE)
+            return
+
+        self.simulation_id = self.scope['url_route']['kwargs']['pk']
+        etat = await self.lire_etat()
+        if etat is None:
+            await self.close(code=CODE_NON_TROUVEE)
+            return
+
+        self.groupe = groupe_simulation(self.simulation_id)
+        await self.channel_layer.group_add(self.groupe, self.channel_name)
+        await self.accept()
+        self.dernier_etat = etat
+        await self.send_json(etat)
+
+        # Couche en mémoire: les événements des workers (autres processus) n'arrivent pas ici
+        if isinstance(self.channel_layer, InMemoryChannelLayer):
+            self.surveillance = asyncio.create_task(self.surveiller())
+
+    async def disconnect(self, code):
+        if self.surveillance is not None:
+            self.surveillance.cancel()
+        if self.groupe is not None:
+            await self.channel_layer.group_discard(self.groupe, self.channel_name)
+
+    async def simulation_update(self, event):
+        """Relaye un événement publié par un worker"""
+        self.dernier_evenement = asyncio.get_running_loop().time()
+        await self.envoyer_si_change(event['data'])
+
+    async def envoyer_si_change(self, etat):
+        if etat is None or etat == self.dernier_etat:
+            return
+        self.dernier_etat = etat
+        await self.send_json(etat)
+
+    async def surveiller(self):
+        """Relit l'état en base après INTERVALLE_SURVEILLANCE secondes sans événement"""
+        boucle = asyncio.get_running_loop()
+        while True:
+            attente = self.dernier_evenement + INTERVALLE_SURVEILLANCE - boucle.time()
+            if attente > 0:
+                await asyncio.sleep(attente)
+                continue
+            self.dernier_evenement = boucle.time()
+            await self.envoyer_si_change(await self.lire_etat())
+
+    @database_sync_to_async
+    def lire_etat(self):
+        etat = etat_simulation(self.simulation_id, self.scope['user'])
+        return dict(etat) if etat is not None else None
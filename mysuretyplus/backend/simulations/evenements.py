@@ -0,0 +1,69 @@
+"""
+Publication des changements d'état des simulations sur la couche channels
+
+Les workers publient chaque avancement et chaque changement de statut dans le
+groupe de la simulation; le consumer WebSocket (consumers.SimulationConsumer)
+les relaie aux clients abonnés, qui n'ont plus à interroger l'API en boucle.
+
+Avec Redis (REDIS_URL), les événements traversent les processus. La couche
+en mémoire ne relie pas les processus workers au serveur web: seuls les
+événements du serveur lui-même arrivent, ceux des workers sont rattrapés par
+une relecture de la base toutes les 2 secondes (voir consumers.INTERVALLE_SURVEILLANCE).
+"""
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+from .models import Simulation
+from .serializers import SimulationStatusSerializer
+
+# Colonnes lues pour construire un événement (mêmes que SimulationStatusView)
+COLONNES_STATUT = ('id', 'user', 'status', 'is_partial', 'num_samples', 'samples_run', 'cancel_requested',
+                   'created_at', 'completed_at', 'progress')
+
+def avertir_sans_redis():
+    """Signale au démarrage que l'avancement des workers ne sera pas poussé en temps réel"""
+    if not getattr(settings, 'REDIS_URL', None):
+        print("⚠️ REDIS_URL non défini: couche channels en mémoire. L'avancement calculé par "
+              "run_simulation_workers n'atteint les WebSockets que par relecture de la base "
+              "(toutes les 2 s par client). Définir REDIS_URL en production.")
+
+def groupe_simulation(simulation_id):
+    """Nom du groupe channels d'une simulation"""
+    return f"simulation_{simulation_id}"
+
+def etat_simulation(simulation_id, user=None):
+    """
+    État courant d'une simulation, au format de l'endpoint /status/
+
+    Returns:
+        dict ou None si la simulation n'existe pas (ou n'appartient pas à user)
+    """
+    simulations = Simulation.objects.filter(id=simulation_id)
+    if user is not None:
+        simulations = simulations.filter(user=user)
+    simulation = simulations.only(*COLONNES_STATUT).first()
+    if simulation is None:
+        return None
+    return SimulationStatusSerializer(simulation).data
+
+def publier_etat(simulation_id):
+    """
+    Publie l'état courant d'une simulation aux clients abonnés
+
+    Une erreur de publication n'interrompt jamais le job: les clients
+    retombent sur l'interrogation de /status/.
+    """
+    try:
+        couche = get_channel_layer()
+        if couche is None:
+            return
+        etat = etat_simulation(simulation_id)
+        if etat is None:
+            return
+        async_to_sync(couche.group_send)(groupe_simulation(simulation_id), {
+            'type': 'simulation.update',
+            'data': dict(etat),
+        })
+    except Exception as e:
+        print(f"⚠️ Publication de l'état de la simulation {simulation_id} impossible: {e}")
@@ -0,0 +1,1119 @@
+"""
+File d'attente des simulations, stockée en base de données
+
+Les vues ne lancent plus de calcul: elles mettent la simulation en attente
+(status='pending'). Des processus workers (manage.py run_simulation_workers)
+réservent les jobs un par un avec un bail (lease_expires) qu'ils renouvellent
+tant que le calcul tourne. Un job dont le bail a expiré (worker arrêté ou
+tué) est remis en attente, jusqu'à MAX_TENTATIVES fois.
+
+Un job en cours s'arrête entre deux blocs de réplications si l'utilisateur
+l'annule (cancel_requested) ou si son budget de temps
+(PERFORMANCE_CONFIG['JOB_TIME_BUDGET_SECONDS']) est épuisé: dans ce dernier cas les
+réplications déjà faites sont conservées et marquées partielles (is_partial).
+
+Les provisions déjà calculées sont enregistrées sur disque à intervalles
+réguliers (PERFORMANCE_CONFIG['CHECKPOINT_SECONDS']). Les flux aléatoires ne
+dépendant que de la graine, un job repris continue à la réplication suivante
+et produit exactement le même résultat que sans interruption.
+
+Une simulation identique à une autre (même jeu de données, méthode, N,
+précision visée et graine) n'est pas recalculée: elle copie un résultat
+terminé ou se rattache au job en cours (reuse_of), qui lui transmet sa
+progression puis ses résultats. Les provisions ne dépendant pas d'alpha, une
+simulation qui ne diffère que par alpha réutilise les mêmes réplications et
+seul son intervalle de confiance est recalculé.
+
+Un job de comparaison (method='compare') calcule Monte Carlo et Bootstrap sur
+le même jeu de données avec une seule lecture et une seule préparation des
+tables. Chaque méthode est enregistrée comme une simulation complète
+(method_runs) et la simulation parente reçoit le résultat joint: c'est la
+seule que les clients suivent.
+
+La réservation est un compare-and-set (UPDATE ... WHERE status='pending'):
+deux workers ne peuvent pas prendre le même job, y compris avec SQLite.
+"""
+import json
+import os
+import socket
+import threading
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Simulation
+from .evenements import publier_etat
+from .calculations import (
+    estimation,
+    calculate_risk_metrics,
+    construire_index_provisions,
+    calculate_real_cumulative,
+    metriques_alpha,
+    calculate_simulated_cumulative_trajectories,
+    calculate_density_curve,
+    charger_config_performance,
+    comparer_methodes,
+    comparer_metriques,
+    generate_trajectory_plot,
+    generate_temporal_patterns_plot,
+    nouvelle_graine,
+    precision_quantile,
+    simuler_provisions
+)
+
+# Nombre max de réservations d'un job avant de l'abandonner
+MAX_TENTATIVES = 3
+
+# Intervalle minimal entre deux écritures de la progression en base (secondes)
+INTERVALLE_PROGRESSION = 0.5
+
+# Statuts d'un job pas encore terminé
+STATUTS_EN_COURS = ('pending', 'running')
+
+# Jobs réservés par les workers: les simulations d'une comparaison sont
+# calculées par le job parent, sauf leurs extensions
+JOBS_AUTONOMES = Q(comparison__isnull=True) | Q(job_type='extend')
+
+# Colonnes de résultats copiées d'une simulation identique
+COLONNES_RESULTATS = (
+    'seed', 'real_provision', 'real_cumulative', 'percentiles', 'confidence_interval',
+    'results_cache', 'samples_run', 'achieved_precision', 'is_partial', 'progress'
+)
+
+def suivi_progression(simulation_id, deja_faites=0):
+    """
+    Crée le callback de progression d'un job (voir estimation(progress_callback=...))
+
+    L'avancement est écrit par un simple UPDATE de la colonne progress, au plus
+    toutes les INTERVALLE_PROGRESSION secondes: pas de save() complet par bloc.
+    poll_after suggère aux clients le délai avant leur prochaine interrogation.
+
+    Args:
+        simulation_id: Simulation suivie
+        deja_faites: Réplications déjà calculées avant ce job (extension)
+    """
+    debut = time.monotonic()
+    derniere_ecriture = [0.0]
+
+    def signaler(faites, total, quantile=None, forcer=False):
+        maintenant = time.monotonic()
+        if not forcer and faites < total and maintenant - derniere_ecriture[0] < INTERVALLE_PROGRESSION:
+            return
+        derniere_ecriture[0] = maintenant
+        ecoule = maintenant - debut
+        calculees = faites - deja_faites
+        restantes = max(total - faites, 0)
+        eta = ecoule * restantes / calculees if calculees > 0 else None
+        progression = {
+            'done': faites,
+            'total': total,
+            'percent': round(100 * faites / total, 1) if total else 100.0,
+            'elapsed': round(ecoule, 1),
+            'eta': round(eta, 1) if eta is not None else None,
+            'quantile': quantile,
+            'poll_after': round(min(max((eta or 5.0) / 5, 1.0), 10.0), 1),
+        }
+        # Les simulations rattachées à ce job suivent la même progression
+        rattachees = list(Simulation.objects.filter(reuse_of_id=simulation_id, status__in=STATUTS_EN_COURS)
+                          .values_list('id', flat=True))
+        Simulation.objects.filter(Q(id=simulation_id) | Q(id__in=rattachees)).update(
+            progress=json.dumps(progression)
+        )
+        for identifiant in [simulation_id] + rattachees:
+            publier_etat(identifiant)
+
+    return signaler
+
+class ControleArret:
+    """
+    stop_check d'un job (voir estimation(stop_check=...)), consulté entre deux blocs
+
+    Arrête le calcul si le job a été repris par un autre worker après
+    l'expiration du bail ('lease_lost'), si l'annulation a été demandée ou la
+    simulation supprimée ('cancelled'), ou si le budget de temps est épuisé
+    ('timeout').
+    """
+
+    def __init__(self, simulation_id, budget=None, deja_ecoule=0.0, worker_id=None):
+        self.simulation_id = simulation_id
+        # Worker qui détient le bail, None pour un job exécuté hors de la file
+        self.worker_id = worker_id
+        # Budget en secondes, 0 ou None pour le désactiver
+        self.budget = charger_config_performance()["JOB_TIME_BUDGET_SECONDS"] if budget is None else budget
+        # Temps déjà consommé par les tentatives précédentes (reprise)
+        self.deja_ecoule = deja_ecoule
+        self.debut = time.monotonic()
+        self.raison = None
+
+    def ecoule(self):
+        """Temps de calcul du job, tentatives précédentes comprises"""
+        return self.deja_ecoule + time.monotonic() - self.debut
+
+    def __call__(self):
+        ligne = (
+            Simulation.objects.filter(id=self.simulation_id)
+            .values_list('cancel_requested', 'worker_id')
+            .first()
+        )
+        if ligne is not None and self.worker_id and ligne[1] != self.worker_id:
+            self.raison = 'lease_lost'
+        elif ligne is None or ligne[0]:
+            self.raison = 'cancelled'
+        elif self.budget and self.ecoule() >= self.budget:
+            self.raison = 'timeout'
+        return self.raison
+
+# Colonnes de la file de jobs: écrites par UPDATE (réservation, bail, annulation)
+# et jamais depuis l'objet en mémoire du worker, dont les valeurs sont périmées
+COLONNES_FILE = ('worker_id', 'lease_expires', 'attempts', 'cancel_requested', 'progress')
+
+def enregistrer_job(simulation, update_fields=None):
+    """
+    Enregistre une simulation en cours de job si ce worker détient encore son bail
+
+    Après l'expiration du bail, le job a pu être remis en file et réservé par
+    un autre worker: l'écriture (UPDATE ... WHERE worker_id = <ce worker>)
+    n'a alors pas lieu et l'état du nouveau worker n'est pas écrasé. Un job
+    exécuté hors de la file (sans worker_id) est enregistré normalement.
+
+    Args:
+        simulation: Simulation réservée par reserver_job
+        update_fields: Champs à écrire; par défaut tous sauf COLONNES_FILE
+
+    Returns:
+        bool: False si le job appartient désormais à un autre worker
+    """
+    if not simulation.worker_id:
+        simulation.save(update_fields=update_fields)
+        return True
+    champs = [
+        champ for champ in Simulation._meta.concrete_fields
+        if not champ.primary_key and (
+            champ.name in update_fields if update_fields is not None else champ.name not in COLONNES_FILE
+        )
+    ]
+    # Comme Simulation.save(); pre_save applique auto_now et les fichiers
+    if simulation.status == 'completed' and not simulation.completed_at:
+        simulation.completed_at = timezone.now()
+    valeurs = {champ.attname: champ.pre_save(simulation, False) for champ in champs}
+    if Simulation.objects.filter(id=simulation.id, worker_id=simulation.worker_id).update(**valeurs):
+        return True
+    print(f"⚠️ Simulation {simulation.id}: bail perdu par {simulation.worker_id}, résultats non enregistrés")
+    return False
+
+def chemin_point_reprise(simulation_id):
+    """Fichier du point de reprise d'un job"""
+    return os.path.join(settings.MEDIA_ROOT, 'simulations', 'checkpoints', f"{simulation_id}.npz")
+
+def ecrire_point_reprise(simulation, provisions, ecoule=0.0):
+    """
+    Enregistre les provisions simulées d'un job en cours (écriture atomique)
+
+    La graine et le nombre de provisions suffisent à reprendre les flux
+    aléatoires: la prochaine réplication est len(provisions).
+    """
+    chemin = chemin_point_reprise(simulation.id)
+    os.makedirs(os.path.dirname(chemin), exist_ok=True)
+    temporaire = f"{chemin}.{os.getpid()}.tmp"
+    with open(temporaire, 'wb') as fichier:
+        np.savez(
+            fichier,
+            provisions=np.asarray(provisions, dtype=np.float64),
+            seed=np.int64(simulation.seed),
+            job_type=np.array(simulation.job_type),
+            ecoule=np.float64(ecoule),
+        )
+    os.replace(temporaire, chemin)
+
+def lire_point_reprise(simulation):
+    """
+    Point de reprise du job courant d'une simulation
+
+    Returns:
+        dict ou None: {'provisions', 'ecoule'} si un point de reprise du même job
+        (même graine, même type) existe
+    """
+    chemin = chemin_point_reprise(simulation.id)
+    if simulation.seed is None or not os.path.exists(chemin):
+        return None
+    try:
+        with np.load(chemin, allow_pickle=False) as archive:
+            if int(archive['seed']) != simulation.seed or str(archive['job_type']) != simulation.job_type:
+                return None
+            return {'provisions': archive['provisions'], 'ecoule': float(archive['ecoule'])}
+    except Exception as e:
+        print(f"⚠️ Point de reprise de la simulation {simulation.id} illisible: {e}")
+        return None
+
+def supprimer_point_reprise(simulation_id):
+    """Supprime le point de reprise d'un job terminé, annulé ou remplacé"""
+    try:
+        os.remove(chemin_point_reprise(simulation_id))
+    except FileNotFoundError:
+        pass
+
+def sauvegarde_reguliere(simulation, controle, base=None):
+    """
+    Crée le checkpoint_callback d'un job (voir estimation(checkpoint_callback=...))
+
+    Écrit le point de reprise au plus toutes les CHECKPOINT_SECONDS secondes.
+
+    Args:
+        simulation: Simulation en cours
+        controle: ControleArret du job (temps déjà consommé)
+        base: Provisions précédant celles reçues par le callback (extension)
+    """
+    intervalle = charger_config_performance()["CHECKPOINT_SECONDS"]
+    derniere_ecriture = [time.monotonic()]
+
+    def enregistrer(simulees):
+        maintenant = time.monotonic()
+        if maintenant - derniere_ecriture[0] < intervalle:
+            return
+        derniere_ecriture[0] = maintenant
+        provisions = simulees if base is None else np.concatenate([base, simulees])
+        ecrire_point_reprise(simulation, provisions, controle.ecoule())
+
+    return enregistrer
+
+def construire_cache_resultats(simulation, lending_df=None, recovery_df=None,
+                               simulated_provisions=None, density_result=None):
+    """
+    Calcule les résultats dérivés affichés par SimulationResultsView
+
+    Trajectoires simulées et graphiques (trajectoires, densité, patterns) sont
+    calculés une seule fois, à la fin du job, à partir de la graine: ils ne
+    changent donc plus d'un affichage à l'autre.
+
+    Returns:
+        dict: Résultats dérivés, sérialisables en JSON
+    """
+    if lending_df is None:
+        lending_df = simulation.get_lending_dataframe()
+    if recovery_df is None:
+        recovery_df = simulation.get_recovery_dataframe()
+    if simulated_provisions is None:
+        simulated_provisions = simulation.get_simulated_provisions_list()
+    
+    # Générer les vraies trajectoires simulées avec la même structure que les données originales
+    simulated_data = calculate_simulated_cumulative_trajectories(
+        lending_df=lending_df,
+        recovery_df=recovery_df,
+        method=simulation.method,
+        num_trajectories=min(10, len(simulated_provisions)),  # Limiter à 10 pour l'affichage
+        seed=simulation.seed
+    )
+    print(f"🎯 Trajectoires simulées générées: {len(simulated_data.get('trajectories', []))}")
+    
+    # Générer le graphique des trajectoires
+    print(f"🎨 Génération du graphique des trajectoires...")
+    trajectory_result = generate_trajectory_plot(
+        lending_df=lending_df,
+        recovery_df=recovery_df,
+        method=simulation.method,
+        num_trajectories=min(20, len(simulated_provisions)),
+        seed=simulation.seed
+    )
+    
+    # Générer la courbe de densité (déjà calculée par le job si fournie)
+    if density_result is None:
+        print(f"🎨 Génération de la courbe de densité...")
+        density_result = calculate_density_curve(simulated_provisions, simulation.method)
+    
+    # Générer les patterns temporels
+    print(f"🎨 Génération des patterns temporels...")
+    num_patterns = min(20, simulation.num_samples)
+    patterns_result = generate_temporal_patterns_plot(
+        lending_df=lending_df,
+        recovery_df=recovery_df,
+        simulated_lending_list=[],  # Sera généré dans la fonction
+        simulated_recovery_list=[],  # Sera généré dans la fonction
+        method=simulation.method,
+        num_samples=num_patterns,
+        seed=simulation.seed
+    )
+    
+    return {
+        'simulated_cumulative': simulated_data.get('trajectories', []),
+        'x_axis_values': simulated_data.get('x_axis', []),  # Valeurs spécifiques pour l'axe X des graphiques
+        'trajectory_plot': {
+            'image_base64': trajectory_result.get('image_base64', '') if trajectory_result else '',
+            'success': trajectory_result.get('success', False) if trajectory_result else False,
+            'stats': trajectory_result.get('stats', {}) if trajectory_result else {}
+        },
+        'density_curve': {
+            'image_base64': density_result.get('image_base64', '') if density_result else '',
+            'success': density_result.get('success', False) if density_result else False
+        },
+        'patterns_plot': {
+            'image_base64': patterns_result.get('image_base64', '') if patterns_result else '',
+            'success': patterns_result.get('success', False) if patterns_result else False,
+            'method': patterns_result.get('method', simulation.method) if patterns_result else simulation.method,
+            'num_samples': patterns_result.get('num_samples', num_patterns) if patterns_result else num_patterns,
+            'simulations_shown': patterns_result.get('simulations_shown', 0) if patterns_result else 0
+        }
+    }
+
+
+def executer_simulation(simulation):
+    """Exécute une simulation complète et enregistre ses résultats"""
+    try:
+        print(f"🔍 Début de la simulation {simulation.id}")
+        simulation.status = 'running'
+        if simulation.seed is None:
+            simulation.seed = nouvelle_graine()
+        # Une nouvelle exécution invalide les résultats dérivés
+        simulation.set_results_cache_dict(None)
+        if not enregistrer_job(simulation):
+            return
+        publier_etat(simulation.id)
+        propager_aux_rattachees(simulation)
+
+        # Récupérer les DataFrames depuis le modèle
+        lending_df = simulation.get_lending_dataframe()
+        recovery_df = simulation.get_recovery_dataframe()
+
+        print(f"📊 DataFrames récupérés - Lending: {lending_df.shape if lending_df is not None else 'None'}, Recovery: {recovery_df.shape if recovery_df is not None else 'None'}")
+
+        if lending_df is None or recovery_df is None:
+            raise Exception("Impossible de charger les données")
+
+        # Reprendre après la dernière réplication enregistrée si le job a été interrompu
+        reprise = lire_point_reprise(simulation)
+        deja_faites = len(reprise['provisions']) if reprise else 0
+        if reprise:
+            print(f"♻️ Point de reprise trouvé: {deja_faites} réplications déjà calculées")
+
+        # Lancer l'estimation avec la nouvelle logique
+        controle = ControleArret(simulation.id, deja_ecoule=reprise['ecoule'] if reprise else 0.0,
+                                 worker_id=simulation.worker_id)
+        suivi = suivi_progression(simulation.id, deja_faites)
+        print(f"🚀 Lancement de l'estimation - Méthode: {simulation.method}, Échantillons: {simulation.num_samples}")
+        estimation_result = estimation(
+            lending_df=lending_df,
+            recovery_df=recovery_df,
+            alpha=simulation.alpha,
+            N=simulation.num_samples,
+            method=simulation.method,
+            seed=simulation.seed,
+            target_precision=simulation.target_precision,
+            progress_callback=suivi,
+            stop_check=controle,
+            checkpoint_callback=sauvegarde_reguliere(simulation, controle),
+            resume_provisions=reprise['provisions'] if reprise else None
+        )
+
+        if controle.raison == 'lease_lost':
+            print(f"⚠️ Simulation {simulation.id} reprise par un autre worker: calcul abandonné")
+            return
+        if controle.raison == 'cancelled':
+            marquer_annulee(simulation)
+            return
+
+        if not estimation_result or 'provisions' not in estimation_result:
+            raise Exception("Aucun résultat de simulation")
+        if len(estimation_result['provisions']) < 2:
+            raise Exception("Budget de temps épuisé avant la première réplication")
+
+        provisions_list = estimation_result['provisions']
+        print(f"✅ Estimation terminée - {len(provisions_list)} provisions calculées")
+
+        # Calculer la provision réelle (premier élément)
+        real_provision = provisions_list[0]
+        simulated_provisions = provisions_list[1:]  # Exclure la provision réelle
+
+        print(f"💰 Provision réelle: {real_provision}")
+        print(f"📈 Provisions simulées: {len(simulated_provisions)} valeurs")
+
+        # Calculer les métriques de risque
+        risk_metrics = calculate_risk_metrics(simulated_provisions, simulation.alpha)
+        print(f"📊 Métriques de risque calculées")
+
+        # Calculer la trajectoire cumulative réelle
+        real_cumulative = calculate_real_cumulative(lending_df, recovery_df)
+        print(f"📈 Trajectoire réelle calculée - {len(real_cumulative)} points")
+
+        # Générer la courbe de densité selon le code utilisateur
+        density_result = calculate_density_curve(simulated_provisions, simulation.method)
+        print(f"📊 Courbe de densité générée: {density_result['success'] if density_result else 'Erreur'}")
+
+        # Sauvegarder les résultats
+        simulation.real_provision = real_provision
+        simulation.set_simulated_provisions_list(simulated_provisions)
+        simulation.set_percentiles_dict(risk_metrics['percentiles'])
+        simulation.set_confidence_interval_dict(risk_metrics['confidence_interval'])
+        simulation.set_sorted_provisions_array(construire_index_provisions(simulated_provisions))
+        simulation.set_real_cumulative_list(real_cumulative)
+        simulation.samples_run = estimation_result.get('samples_run', len(simulated_provisions))
+        simulation.achieved_precision = estimation_result.get('achieved_precision')
+        # Budget de temps épuisé: résultats calculés sur les réplications déjà faites
+        simulation.is_partial = controle.raison == 'timeout'
+        if simulation.is_partial:
+            suivi(simulation.samples_run, simulation.num_samples, forcer=True)
+        
+        # Résultats dérivés calculés une fois pour toutes (lus par SimulationResultsView)
+        simulation.set_results_cache_dict(construire_cache_resultats(
+            simulation, lending_df, recovery_df, simulated_provisions, density_result
+        ))
+        simulation.status = 'completed'
+        # La progression est écrite à part (UPDATE): ne pas l'écraser
+        simulation.refresh_from_db(fields=['progress'])
+        if not enregistrer_job(simulation):
+            return
+        supprimer_point_reprise(simulation.id)
+        publier_etat(simulation.id)
+        propager_aux_rattachees(simulation)
+
+        print(f"✅ Simulation {simulation.id} terminée avec succès!")
+
+    except Exception as e:
+        print(f"❌ Erreur dans la simulation {simulation.id}: {e}")
+        import traceback
+        traceback.print_exc()
+        simulation.status = 'failed'
+        if not enregistrer_job(simulation):
+            return
+        supprimer_point_reprise(simulation.id)
+        publier_etat(simulation.id)
+        propager_aux_rattachees(simulation)
+
+
+def executer_extension(simulation, num_samples):
+    """
+    Ajoute des réplications à une simulation terminée
+
+    Les nouvelles réplications prolongent les flux aléatoires de la graine
+    stockée: seul le delta est calculé, puis les métriques sont recalculées.
+    """
+    try:
+        print(f"🔍 Extension de la simulation {simulation.id} à {num_samples} réplications")
+        simulation.status = 'running'
+        if not enregistrer_job(simulation):
+            return
+        publier_etat(simulation.id)
+        
+        lending_df = simulation.get_lending_dataframe()
+        recovery_df = simulation.get_recovery_dataframe()
+        if lending_df is None or recovery_df is None:
+            raise Exception("Impossible de charger les données")
+        
+        simulated_provisions = simulation.get_simulated_provisions_list()
+        nombre_initial = len(simulated_provisions)
+        
+        # Reprendre une extension interrompue si son point de reprise prolonge ces provisions
+        reprise = lire_point_reprise(simulation)
+        if reprise and len(reprise['provisions']) > nombre_initial and np.array_equal(
+                reprise['provisions'][:nombre_initial], simulated_provisions):
+            simulated_provisions = reprise['provisions'].tolist()
+            print(f"♻️ Point de reprise trouvé: extension reprise à {len(simulated_provisions)} réplications")
+        else:
+            reprise = None
+        
+        debut = len(simulated_provisions)
+        controle = ControleArret(simulation.id, deja_ecoule=reprise['ecoule'] if reprise else 0.0,
+                                 worker_id=simulation.worker_id)
+        suivi = suivi_progression(simulation.id, debut)
+        nouvelles_provisions = simuler_provisions(
+            lending_df, recovery_df, simulation.method, simulation.seed, debut, num_samples,
+            progress_callback=suivi,
+            stop_check=controle,
+            checkpoint_callback=sauvegarde_reguliere(simulation, controle, base=simulated_provisions)
+        )
+        if controle.raison == 'lease_lost':
+            print(f"⚠️ Extension de la simulation {simulation.id} reprise par un autre worker: calcul abandonné")
+            return
+        if controle.raison == 'cancelled' or debut + len(nouvelles_provisions) == nombre_initial:
+            # Extension abandonnée: la simulation garde ses résultats précédents
+            print(f"⏹️ Extension de la simulation {simulation.id} interrompue ({controle.raison})")
+            simulation.status = 'completed'
+            simulation.cancel_requested = False
+            if enregistrer_job(simulation, update_fields=['status', 'cancel_requested']):
+                supprimer_point_reprise(simulation.id)
+                publier_etat(simulation.id)
+            return
+        simulated_provisions = simulated_provisions + nouvelles_provisions
+        print(f"✅ {len(nouvelles_provisions)} nouvelles provisions calculées")
+        
+        risk_metrics = calculate_risk_metrics(simulated_provisions, simulation.alpha)
+        precision = precision_quantile(simulated_provisions, simulation.alpha)
+        
+        simulation.set_simulated_provisions_list(simulated_provisions)
+        simulation.set_percentiles_dict(risk_metrics['percentiles'])
+        simulation.set_confidence_interval_dict(risk_metrics['confidence_interval'])
+        simulation.set_sorted_provisions_array(construire_index_provisions(simulated_provisions))
+        simulation.num_samples = max(simulation.num_samples, num_samples)
+        simulation.samples_run = len(simulated_provisions)
+        simulation.achieved_precision = precision['relative_precision']
+        simulation.is_partial = controle.raison == 'timeout'
+        if simulation.is_partial:
+            suivi(len(simulated_provisions), num_samples, forcer=True)
+        simulation.set_results_cache_dict(construire_cache_resultats(
+            simulation, lending_df, recovery_df, simulated_provisions
+        ))
+        simulation.completed_at = timezone.now()
+        simulation.status = 'completed'
+        simulation.refresh_from_db(fields=['progress'])
+        if not enregistrer_job(simulation):
+            return
+        supprimer_point_reprise(simulation.id)
+        publier_etat(simulation.id)
+        
+        print(f"✅ Simulation {simulation.id} étendue à {len(simulated_provisions)} réplications")
+        
+    except Exception as e:
+        print(f"❌ Erreur lors de l'extension de la simulation {simulation.id}: {e}")
+        import traceback
+        traceback.print_exc()
+        # Les résultats précédents ne sont pas modifiés: la simulation reste exploitable
+        simulation.status = 'completed'
+        if not enregistrer_job(simulation, update_fields=['status']):
+            return
+        supprimer_point_reprise(simulation.id)
+        publier_etat(simulation.id)
+
+
+def executer_comparaison(simulation):
+    """
+    Exécute un job de comparaison Monte Carlo / Bootstrap
+
+    Les tables sont lues une fois et préparées une fois (voir comparer_methodes);
+    la trajectoire réelle est calculée une fois. Chaque méthode est enregistrée
+    dans sa simulation (method_runs) comme une simulation ordinaire de même
+    graine; la simulation parente reçoit les métriques côte à côte.
+    """
+    try:
+        print(f"🔍 Début de la comparaison {simulation.id}")
+        simulation.status = 'running'
+        if simulation.seed is None:
+            simulation.seed = nouvelle_graine()
+        simulation.set_results_cache_dict(None)
+        if not enregistrer_job(simulation):
+            return
+        publier_etat(simulation.id)
+        
+        enfants = {enfant.method: enfant for enfant in simulation.method_runs.all()}
+        for enfant in enfants.values():
+            enfant.status = 'running'
+            enfant.seed = simulation.seed
+            enfant.set_results_cache_dict(None)
+            enfant.save()
+            publier_etat(enfant.id)
+        
+        lending_df = simulation.get_lending_dataframe()
+        recovery_df = simulation.get_recovery_dataframe()
+        if lending_df is None or recovery_df is None:
+            raise Exception("Impossible de charger les données")
+        
+        # Chaque méthode reprend après son propre point de reprise
+        reprises = {}
+        for method, enfant in enfants.items():
+            reprise = lire_point_reprise(enfant)
+            if reprise:
+                reprises[method] = reprise
+                print(f"♻️ Point de reprise {method}: {len(reprise['provisions'])} réplications déjà calculées")
+        
+        controle = ControleArret(simulation.id, deja_ecoule=max([r['ecoule'] for r in reprises.values()], default=0.0),
+                                 worker_id=simulation.worker_id)
+        suivi = suivi_progression(simulation.id, sum(len(r['provisions']) for r in reprises.values()))
+        # Le callback ne reçoit que les réplications calculées depuis la reprise: le point
+        # de reprise doit contenir aussi celles déjà enregistrées (voir executer_extension)
+        sauvegardes = {
+            method: sauvegarde_reguliere(
+                enfant, controle, base=reprises[method]['provisions'] if method in reprises else None
+            )
+            for method, enfant in enfants.items()
+        }
+        resultat = comparer_methodes(
+            lending_df, recovery_df,
+            N=simulation.num_samples,
+            seed=simulation.seed,
+            progress_callback=suivi,
+            stop_check=controle,
+            checkpoint_callback=lambda method, provisions: sauvegardes[method](provisions),
+            resume_provisions={method: r['provisions'] for method, r in reprises.items()}
+        )
+        
+        if controle.raison == 'lease_lost':
+            print(f"⚠️ Comparaison {simulation.id} reprise par un autre worker: calcul abandonné")
+            return
+        if controle.raison == 'cancelled':
+            for enfant in enfants.values():
+                supprimer_point_reprise(enfant.id)
+            marquer_annulee(simulation)
+            return
+        if min(len(p) for p in resultat['provisions'].values()) < 1:
+            raise Exception("Budget de temps épuisé avant la première réplication")
+        
+        real_provision = resultat['real_provision']
+        real_cumulative = calculate_real_cumulative(lending_df, recovery_df)
+        is_partial = controle.raison == 'timeout'
+        metriques = {}
+        # Les simulations de chaque méthode n'ont pas de bail propre: vérifier celui du parent
+        if controle() == 'lease_lost':
+            print(f"⚠️ Comparaison {simulation.id} reprise par un autre worker: résultats non enregistrés")
+            return
+        
+        for method, enfant in enfants.items():
+            simulated_provisions = resultat['provisions'][method]
+            risk_metrics = calculate_risk_metrics(simulated_provisions, simulation.alpha)
+            metriques[method] = risk_metrics
+            
+            enfant.real_provision = real_provision
+            enfant.set_simulated_provisions_list(simulated_provisions)
+            enfant.set_percentiles_dict(risk_metrics['percentiles'])
+            enfant.set_confidence_interval_dict(risk_metrics['confidence_interval'])
+            enfant.set_sorted_provisions_array(construire_index_provisions(simulated_provisions))
+            enfant.set_real_cumulative_list(real_cumulative)
+            enfant.samples_run = len(simulated_provisions)
+            enfant.achieved_precision = precision_quantile(simulated_provisions, simulation.alpha)['relative_precision']
+            enfant.is_partial = is_partial
+            enfant.set_results_cache_dict(construire_cache_resultats(
+                enfant, lending_df, recovery_df, simulated_provisions
+            ))
+            enfant.status = 'completed'
+            enfant.save()
+            supprimer_point_reprise(enfant.id)
+            publier_etat(enfant.id)
+            propager_aux_rattachees(enfant)
+            print(f"✅ {method}: {len(simulated_provisions)} provisions enregistrées (simulation {enfant.id})")
+        
+        # Résultat joint de la simulation parente
+        simulation.real_provision = real_provision
+        simulation.set_real_cumulative_list(real_cumulative)
+        simulation.samples_run = min(enfant.samples_run for enfant in enfants.values())
+        simulation.is_partial = is_partial
+        simulation.set_results_cache_dict({
+            'comparison': comparer_metriques(metriques),
+            'methods': {
+                method: {
+                    'simulation_id': enfant.id,
+                    'samples_run': enfant.samples_run,
+                    'achieved_precision': enfant.achieved_precision,
+                    'percentiles': metriques[method]['percentiles'],
+                    'confidence_interval': metriques[method]['confidence_interval'],
+                    'mean': metriques[method]['mean'],
+                    'std': metriques[method]['std']
+                }
+                for method, enfant in enfants.items()
+            }
+        })
+        if is_partial:
+            suivi(sum(enfant.samples_run for enfant in enfants.values()), 2 * simulation.num_samples, forcer=True)
+        simulation.status = 'completed'
+        simulation.refresh_from_db(fields=['progress'])
+        if not enregistrer_job(simulation):
+            return
+        publier_etat(simulation.id)
+        
+        print(f"✅ Comparaison {simulation.id} terminée avec succès!")
+        
+    except Exception as e:
+        print(f"❌ Erreur dans la comparaison {simulation.id}: {e}")
+        import traceback
+        traceback.print_exc()
+        simulation.status = 'failed'
+        if not enregistrer_job(simulation):
+            return
+        for enfant_id in simulation.method_runs.values_list('id', flat=True):
+            supprimer_point_reprise(enfant_id)
+        publier_etat(simulation.id)
+        propager_aux_rattachees(simulation)
+
+
+def creer_comparaison(simulation):
+    """
+    Crée les simulations de chaque méthode d'une comparaison et met le job en file
+
+    Args:
+        simulation: Simulation parente (method='compare'), déjà enregistrée
+    """
+    for method in ('montecarlo', 'bootstrap'):
+        Simulation.objects.create(
+            user=simulation.user,
+            comparison=simulation,
+            method=method,
+            num_samples=simulation.num_samples,
+            alpha=simulation.alpha,
+            seed=simulation.seed,
+            dataset=simulation.dataset,
+            lending_file=simulation.lending_file.name,
+            recovery_file=simulation.recovery_file.name,
+        )
+    mettre_en_file(simulation, job_type='compare')
+
+
+def mettre_en_file(simulation, job_type='run', extend_to=None):
+    """
+    Met une simulation en attente d'exécution par un worker
+
+    Args:
+        simulation: Simulation à exécuter
+        job_type: 'run' (simulation complète) ou 'extend' (réplications supplémentaires)
+        extend_to: Nouveau nombre total de réplications (job 'extend')
+    """
+    simulation.status = 'pending'
+    simulation.job_type = job_type
+    simulation.extend_to = extend_to
+    simulation.worker_id = None
+    simulation.lease_expires = None
+    simulation.attempts = 0
+    simulation.progress = None
+    simulation.cancel_requested = False
+    simulation.save(update_fields=['status', 'job_type', 'extend_to', 'worker_id', 'lease_expires', 'attempts',
+                                   'progress', 'cancel_requested'])
+    # Nouveau job: un point de reprise éventuel appartient au job précédent
+    supprimer_point_reprise(simulation.id)
+    publier_etat(simulation.id)
+    print(f"📥 Simulation {simulation.id} mise en file ({job_type})")
+
+def marquer_annulee(simulation):
+    """Termine un job annulé: 'cancelled' pour une simulation, retour à 'completed' pour une extension"""
+    simulation.status = 'completed' if simulation.job_type == 'extend' else 'cancelled'
+    simulation.cancel_requested = False
+    if not enregistrer_job(simulation, update_fields=['status', 'cancel_requested']):
+        return
+    supprimer_point_reprise(simulation.id)
+    publier_etat(simulation.id)
+    propager_aux_rattachees(simulation)
+    print(f"⏹️ Simulation {simulation.id} annulée")
+
+def annuler_simulation(simulation):
+    """
+    Annule un job en attente ou en cours
+
+    Un job en attente est retiré de la file immédiatement; un job en cours
+    s'arrête au prochain bloc de réplications (voir ControleArret).
+
+    Returns:
+        bool: False si la simulation n'a pas de job à annuler
+    """
+    if simulation.comparison_id is not None and simulation.job_type != 'extend':
+        # Simulation d'une comparaison: c'est le job de comparaison qui est annulé
+        return annuler_simulation(Simulation.objects.get(id=simulation.comparison_id))
+    if simulation.reuse_of_id is not None:
+        # Simulation rattachée: seule elle est annulée, le job qu'elle suit continue
+        if not Simulation.objects.filter(id=simulation.id, status__in=STATUTS_EN_COURS).update(
+                status='cancelled', reuse_of=None):
+            return False
+    else:
+        retire = Simulation.objects.filter(id=simulation.id, status='pending').update(
+            status='completed' if simulation.job_type == 'extend' else 'cancelled'
+        )
+        if not retire and not Simulation.objects.filter(id=simulation.id, status='running').update(
+                cancel_requested=True):
+            return False
+    simulation.refresh_from_db(fields=['status', 'cancel_requested', 'reuse_of'])
+    publier_etat(simulation.id)
+    propager_aux_rattachees(simulation)
+    print(f"⏹️ Annulation de la simulation {simulation.id} demandée")
+    return True
+
+def trouver_simulation_identique(simulation):
+    """
+    Simulation déjà terminée, sinon en cours, aux entrées identiques
+
+    Entrées comparées: jeu de données, méthode, N et précision visée, ainsi
+    que la graine si elle est imposée (sans graine, n'importe quel tirage
+    convient). Seules les simulations du même utilisateur sont candidates: un
+    Dataset est propre à un utilisateur et à une empreinte. Alpha n'est comparé
+    qu'avec une précision visée: l'arrêt anticipé dépend alors du quantile
+    alpha, sinon les réplications sont les mêmes pour tout alpha et
+    copier_resultats recalcule les sorties qui en dépendent.
+
+    Returns:
+        Simulation ou None
+    """
+    if simulation.dataset_id is None:
+        return None
+    identiques = Simulation.objects.filter(
+        user_id=simulation.user_id,
+        dataset_id=simulation.dataset_id,
+        method=simulation.method,
+        num_samples=simulation.num_samples,
+        reuse_of__isnull=True,
+    ).exclude(pk=simulation.pk)
+    if simulation.target_precision is None:
+        identiques = identiques.filter(target_precision__isnull=True)
+    else:
+        identiques = identiques.filter(target_precision=simulation.target_precision, alpha=simulation.alpha)
+    if simulation.seed is not None:
+        identiques = identiques.filter(seed=simulation.seed)
+    
+    terminee = identiques.filter(status='completed', is_partial=False).order_by('-completed_at').first()
+    if terminee is not None:
+        return terminee
+    # Les simulations d'une comparaison en cours ne reçoivent pas de progression propre
+    return identiques.filter(status__in=STATUTS_EN_COURS, job_type='run', cancel_requested=False,
+                             comparison__isnull=True).order_by(
+        'created_at'
+    ).first()
+
+def copier_resultats(source, cible):
+    """
+    Copie les résultats d'une simulation terminée dans une simulation identique
+
+    Si les alphas diffèrent, l'intervalle de confiance et la précision sont
+    recalculés pour l'alpha de la cible depuis les réplications copiées. Ce
+    sont les seules sorties qui dépendent d'alpha: les percentiles affichés
+    (niveaux fixes) et les résultats dérivés (trajectoires, graphiques) sont
+    copiés tels quels.
+    """
+    for colonne in COLONNES_RESULTATS:
+        setattr(cible, colonne, getattr(source, colonne))
+    # Fichiers recopiés: chaque simulation possède les siens
+    provisions = source.get_simulated_provisions_array()
+    cible.set_simulated_provisions_array(provisions)
+    index = source.get_sorted_provisions_array()
+    if index is None:
+        index = construire_index_provisions(provisions)
+    cible.set_sorted_provisions_array(index)
+    if cible.alpha != source.alpha:
+        cible.set_confidence_interval_dict(metriques_alpha(index, cible.alpha)['confidence_interval'])
+        cible.achieved_precision = precision_quantile(provisions, cible.alpha)['relative_precision']
+    cible.reuse_of = None
+    cible.status = 'completed'
+    cible.completed_at = timezone.now()
+
+def dedupliquer_ou_mettre_en_file(simulation):
+    """
+    Réutilise le résultat d'une simulation identique, ou met la simulation en file
+
+    Returns:
+        str: 'reused' (résultat copié), 'attached' (rattachée à un job en cours) ou 'queued'
+    """
+    source = trouver_simulation_identique(simulation)
+    if source is None:
+        mettre_en_file(simulation)
+        return 'queued'
+    if source.status == 'completed':
+        copier_resultats(source, simulation)
+        simulation.save()
+        publier_etat(simulation.id)
+        print(f"♻️ Simulation {simulation.id}: résultat de la simulation {source.id} réutilisé")
+        return 'reused'
+    simulation.reuse_of = source
+    simulation.status = source.status
+    simulation.progress = source.progress
+    simulation.save(update_fields=['reuse_of', 'status', 'progress'])
+    publier_etat(simulation.id)
+    print(f"🔗 Simulation {simulation.id} rattachée au job en cours {source.id}")
+    return 'attached'
+
+def propager_aux_rattachees(simulation):
+    """
+    Transmet le statut d'un job aux simulations qui y sont rattachées
+
+    Terminé: résultats copiés; en attente ou en cours: statut suivi; échec: échec.
+    Annulé (ou extension): les simulations rattachées deviennent des jobs autonomes.
+    Job de comparaison: ses simulations par méthode suivent son statut tant
+    qu'elles ne sont pas terminées (leurs résultats sont écrits par le job).
+    """
+    if simulation.job_type == 'compare' and simulation.status != 'completed':
+        methodes = list(Simulation.objects.filter(comparison_id=simulation.id, status__in=STATUTS_EN_COURS)
+                        .values_list('id', flat=True))
+        Simulation.objects.filter(id__in=methodes).update(status=simulation.status)
+        for identifiant in methodes:
+            publier_etat(identifiant)
+    rattachees = list(Simulation.objects.filter(reuse_of_id=simulation.id, status__in=STATUTS_EN_COURS))
+    for rattachee in rattachees:
+        if simulation.status == 'completed' and simulation.job_type == 'run':
+            copier_resultats(simulation, rattachee)
+            rattachee.save()
+        elif simulation.status in STATUTS_EN_COURS:
+            # Job démarré, ou remis en file après l'arrêt de son worker
+            rattachee.status = simulation.status
+            rattachee.save(update_fields=['status'])
+        elif simulation.status == 'failed':
+            rattachee.status = 'failed'
+            rattachee.reuse_of = None
+            rattachee.save(update_fields=['status', 'reuse_of'])
+        else:
+            rattachee.reuse_of = None
+            rattachee.save(update_fields=['reuse_of'])
+            mettre_en_file(rattachee)
+            continue
+        publier_etat(rattachee.id)
+
+def identifiant_worker(numero=0):
+    """Identifiant unique d'un worker: machine, processus et numéro"""
+    return f"{socket.gethostname()}:{os.getpid()}:{numero}"
+
+def reserver_job(worker_id, duree_bail):
+    """
+    Réserve le plus ancien job en attente
+
+    Returns:
+        Simulation ou None si la file est vide
+    """
+    while True:
+        candidat = (
+            Simulation.objects.filter(JOBS_AUTONOMES, status='pending', reuse_of__isnull=True)
+            .order_by('created_at')
+            .values_list('id', flat=True)
+            .first()
+        )
+        if candidat is None:
+            return None
+        maintenant = timezone.now()
+        reserve = Simulation.objects.filter(id=candidat, status='pending').update(
+            status='running',
+            worker_id=worker_id,
+            lease_expires=maintenant + timedelta(seconds=duree_bail),
+            attempts=F('attempts') + 1,
+        )
+        if reserve:
+            return Simulation.objects.get(id=candidat)
+        # Job pris par un autre worker entre-temps: essayer le suivant
+
+def renouveler_bail(simulation_id, worker_id, duree_bail):
+    """Prolonge le bail d'un job en cours; False si le job n'appartient plus au worker"""
+    return bool(Simulation.objects.filter(id=simulation_id, worker_id=worker_id, status='running').update(
+        lease_expires=timezone.now() + timedelta(seconds=duree_bail)
+    ))
+
+def liberer_job(simulation_id, worker_id):
+    """Efface le bail d'un job terminé par ce worker"""
+    Simulation.objects.filter(id=simulation_id, worker_id=worker_id).update(worker_id=None, lease_expires=None)
+
+def remettre_en_file_expires():
+    """
+    Remet en attente les jobs dont le bail a expiré (worker arrêté)
+
+    Après MAX_TENTATIVES, ou si l'annulation avait été demandée, une simulation
+    est marquée en échec (annulée); une extension est abandonnée et la
+    simulation garde ses résultats précédents.
+
+    Returns:
+        int: Nombre de jobs remis en attente
+    """
+    expires = Simulation.objects.filter(status='running', lease_expires__lt=timezone.now())
+    identifiants = list(expires.values_list('id', flat=True))
+    if not identifiants:
+        return 0
+    # Job annulé dont le worker s'est arrêté: ne pas le relancer
+    Simulation.objects.filter(pk__in=expires.filter(cancel_requested=True).exclude(job_type='extend')).update(
+        status='cancelled', cancel_requested=False, worker_id=None, lease_expires=None
+    )
+    Simulation.objects.filter(pk__in=expires.filter(cancel_requested=True, job_type='extend')).update(
+        status='completed', cancel_requested=False, worker_id=None, lease_expires=None
+    )
+    Simulation.objects.filter(pk__in=expires.filter(attempts__gte=MAX_TENTATIVES).exclude(job_type='extend')).update(
+        status='failed', worker_id=None, lease_expires=None
+    )
+    Simulation.objects.filter(pk__in=expires.filter(attempts__gte=MAX_TENTATIVES, job_type='extend')).update(
+        status='completed', worker_id=None, lease_expires=None
+    )
+    nombre = expires.update(status='pending', worker_id=None, lease_expires=None)
+    if nombre:
+        print(f"♻️ {nombre} job(s) au bail expiré remis en file")
+    for simulation in Simulation.objects.filter(id__in=identifiants).only('id', 'status', 'job_type'):
+        publier_etat(simulation.id)
+        propager_aux_rattachees(simulation)
+    return nombre
+
+def processus_actif(pid):
+    """Vrai si un processus de cette machine porte ce pid"""
+    if os.name == 'nt':
+        # os.kill terminerait le processus: s'en remettre à l'expiration du bail
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+def recuperer_orphelins():
+    """
+    Balayage au démarrage des workers: jobs 'running' dont le worker a disparu
+
+    Un job est orphelin s'il n'a pas de bail (lancé avant la file de jobs) ou
+    si son worker tournait sur cette machine et que son processus n'existe
+    plus (redémarrage, OOM). Il est repris immédiatement, depuis son point de
+    reprise, sans attendre l'expiration du bail.
+
+    Returns:
+        int: Nombre de jobs orphelins détectés
+    """
+    machine = socket.gethostname()
+    orphelins = []
+    en_cours = Simulation.objects.filter(JOBS_AUTONOMES, status='running', reuse_of__isnull=True)
+    for simulation_id, worker_id, lease_expires in en_cours.values_list('id', 'worker_id', 'lease_expires'):
+        if not worker_id or lease_expires is None:
+            orphelins.append(simulation_id)
+            continue
+        hote, _, reste = worker_id.partition(':')
+        pid = reste.split(':')[0]
+        if hote == machine and pid.isdigit() and not processus_actif(int(pid)):
+            orphelins.append(simulation_id)
+    if orphelins:
+        print(f"🧹 {len(orphelins)} job(s) orphelin(s) détecté(s): {orphelins}")
+        # Bail expiré: remettre_en_file_expires applique la politique habituelle
+        Simulation.objects.filter(id__in=orphelins, status='running').update(
+            lease_expires=timezone.now() - timedelta(seconds=1)
+        )
+        remettre_en_file_expires()
+    return len(orphelins)
+
+def executer_job(simulation, worker_id, duree_bail):
+    """Exécute un job réservé en renouvelant son bail dans un thread de fond"""
+    arret = threading.Event()
+
+    def battre():
+        while not arret.wait(duree_bail / 3):
+            # Une erreur passagère (base verrouillée, connexion perdue) ne doit pas
+            # arrêter le renouvellement: le bail expirerait pendant le calcul
+            try:
+                renouveler_bail(simulation.id, worker_id, duree_bail)
+            except Exception as e:
+                print(f"⚠️ Renouvellement du bail de la simulation {simulation.id} impossible: {e}")
+            finally:
+                close_old_connections()
+
+    coeur = threading.Thread(target=battre, name=f"Bail-{simulation.id}", daemon=True)
+    coeur.start()
+    try:
+        if simulation.job_type == 'extend':
+            executer_extension(simulation, simulation.extend_to)
+        elif simulation.job_type == 'compare':
+            executer_comparaison(simulation)
+        else:
+            executer_simulation(simulation)
+    finally:
+        arret.set()
+        coeur.join()
+        liberer_job(simulation.id, worker_id)
+
+def boucle_worker(worker_id, duree_bail=None, intervalle=2.0, une_fois=False):
+    """
+    Boucle d'un worker: réserve et exécute les jobs en attente
+
+    Args:
+        worker_id: Identifiant du worker (voir identifiant_worker)
+        duree_bail: Durée du bail en secondes (défaut: PERFORMANCE_CONFIG['JOB_LEASE_SECONDS'])
+        intervalle: Attente entre deux interrogations d'une file vide
+        une_fois: S'arrêter dès que la file est vide (tests, cron)
+    """
+    if duree_bail is None:
+        duree_bail = charger_config_performance()["JOB_LEASE_SECONDS"]
+    print(f"👷 Worker {worker_id} démarré (bail {duree_bail}s)")
+    while True:
+        close_old_connections()
+        remettre_en_file_expires()
+        simulation = reserver_job(worker_id, duree_bail)
+        if simulation is None:
+            if une_fois:
+                print(f"👷 Worker {worker_id}: file vide, arrêt")
+                return
+            time.sleep(intervalle)
+            continue
+        print(f"👷 Worker {worker_id}: job {simulation.id} ({simulation.job_type}, tentative {simulation.attempts})")
+        executer_job(simulation, worker_id, duree_bail)
@@ -0,0 +1,81 @@
+"""
+Commande: python manage.py run_simulation_workers
+
+Lance un nombre borné de processus workers qui exécutent les simulations en
+file d'attente (voir simulations/jobs.py). Aucun broker n'est nécessaire: la
+file est la table des simulations.
+"""
+import multiprocessing
+
+from django.core.management.base import BaseCommand
+
+from simulations.calculations import charger_config_performance
+
+
+def _processus_worker(numero, duree_bail, intervalle, une_fois):
+    """Point d'entrée d'un processus worker (contexte spawn: Django à initialiser)"""
+    import django
+    django.setup()
+    from simulations.jobs import boucle_worker, identifiant_worker
+    boucle_worker(identifiant_worker(numero), duree_bail, intervalle, une_fois)
+
+
+class Command(BaseCommand):
+    help = "Exécute les simulations en file d'attente avec un nombre borné de workers"
+
+    def add_arguments(self, parser):
+        config = charger_config_performance()
+        parser.add_argument(
+            '--concurrency', type=int, default=config["JOB_CONCURRENCY"],
+            help="Nombre de simulations exécutées en parallèle (défaut: PERFORMANCE_CONFIG['JOB_CONCURRENCY'])"
+        )
+        parser.add_argument(
+            '--lease', type=int, default=config["JOB_LEASE_SECONDS"],
+            help="Durée du bail d'un worker sur un job, en secondes"
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=2.0,
+            help="Attente entre deux interrogations d'une file vide, en secondes"
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help="S'arrêter quand la file est vide"
+        )
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options['concurrency'])
+        arguments = (options['lease'], options['poll_interval'], options['once'])
+        self.stdout.write(f"🚀 Démarrage de {concurrency} worker(s) de simulation")
+
+        from simulations.evenements import avertir_sans_redis
+        avertir_sans_redis()
+
+        # Jobs laissés 'running' par des workers arrêtés: repris depuis leur point de reprise
+        from simulations.jobs import recuperer_orphelins
+        recuperer_orphelins()
+
+        if concurrency == 1:
+            from simulations.jobs import boucle_worker, identifiant_worker
+            try:
+                boucle_worker(identifiant_worker(0), *arguments)
+            except KeyboardInterrupt:
+                self.stdout.write("🛑 Arrêt du worker")
+            return
+
+        # Processus non démoniques: chaque job peut lui-même paralléliser ses réplications
+        contexte = multiprocessing.get_context("spawn")
+        processus = [
+            contexte.Process(target=_processus_worker, args=(numero, *arguments), name=f"simulation-worker-{numero}")
+            for numero in range(concurrency)
+        ]
+        for p in processus:
+            p.start()
+        try:
+            for p in processus:
+                p.join()
+        except KeyboardInterrupt:
+            self.stdout.write("🛑 Arrêt des workers (les jobs interrompus seront repris à l'expiration de leur bail)")
+            for p in processus:
+                p.terminate()
+            for p in processus:
+                p.join()
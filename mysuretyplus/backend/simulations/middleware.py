@@ -0,0 +1,30 @@
+"""
+Authentification des WebSockets par token DRF
+
+Les navigateurs ne permettent pas d'ajouter l'en-tête Authorization à une
+connexion WebSocket: le token est passé dans l'URL (?token=...).
+"""
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.contrib.auth.models import AnonymousUser
+
+@database_sync_to_async
+def utilisateur_du_token(cle):
+    """Utilisateur associé à un token DRF, AnonymousUser si invalide"""
+    from rest_framework.authtoken.models import Token
+    try:
+        token = Token.objects.select_related('user').get(key=cle)
+    except Token.DoesNotExist:
+        return AnonymousUser()
+    return token.user if token.user.is_active else AnonymousUser()
+
+class TokenAuthMiddleware(BaseMiddleware):
+    """Renseigne scope['user'] à partir du paramètre token de l'URL"""
+
+    async def __call__(self, scope, receive, send):
+        parametres = parse_qs(scope.get('query_string', b'').decode())
+        cle = parametres.get('token', [None])[0]
+        scope['user'] = await utilisateur_du_token(cle) if cle else AnonymousUser()
+        return await super().__call__(scope, receive, send)
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulations', '0005_simulation_real_cumulative_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='simulation',
+            name='seed',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
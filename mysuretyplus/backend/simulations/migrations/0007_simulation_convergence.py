@@ -0,0 +1,28 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulations', '0006_simulation_seed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='simulation',
+            name='achieved_precision',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='simulation',
+            name='samples_run',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='simulation',
+            name='target_precision',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulations', '0008_simulation_sorted_provisions_file'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='simulation',
+            name='results_cache',
+            field=models.TextField(blank=True, null=True),
+        ),
+    ]
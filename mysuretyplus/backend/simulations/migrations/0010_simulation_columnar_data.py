@@ -0,0 +1,23 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulations', '0009_simulation_results_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='simulation',
+            name='lending_columns',
+            field=models.FileField(blank=True, null=True, upload_to='simulations/lending_columns/'),
+        ),
+        migrations.AddField(
+            model_name='simulation',
+            name='recovery_columns',
+            field=models.FileField(blank=True, null=True, upload_to='simulations/recovery_columns/'),
+        ),
+    ]
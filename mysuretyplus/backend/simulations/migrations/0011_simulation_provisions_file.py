@@ -0,0 +1,18 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulations', '0010_simulation_columnar_data'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='simulation',
+            name='provisions_file',
+            field=models.FileField(blank=True, null=True, upload_to='simulations/provisions/'),
+        ),
+    ]
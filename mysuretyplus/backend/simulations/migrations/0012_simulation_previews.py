@@ -0,0 +1,50 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:22
+
+import json
+
+import pandas as pd
+from django.db import migrations, models
+
+
+def calculer_apercus(apps, schema_editor):
+    """Calcule l'aperçu des tables des simulations existantes"""
+    from simulations.stockage import apercu_dataframe, npz_vers_dataframe
+
+    Simulation = apps.get_model('simulations', 'Simulation')
+    for simulation in Simulation.objects.all().iterator():
+        for libelle in ('lending', 'recovery'):
+            fichier = getattr(simulation, f'{libelle}_columns')
+            donnees = getattr(simulation, f'{libelle}_data')
+            try:
+                if fichier:
+                    with fichier.open('rb') as f:
+                        df = npz_vers_dataframe(f)
+                elif donnees:
+                    df = pd.DataFrame(json.loads(donnees))
+                else:
+                    continue
+                setattr(simulation, f'{libelle}_preview', json.dumps(apercu_dataframe(df)))
+            except Exception as e:
+                print(f"Aperçu {libelle} impossible pour la simulation {simulation.pk}: {e}")
+        simulation.save(update_fields=['lending_preview', 'recovery_preview'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulations', '0011_simulation_provisions_file'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='simulation',
+            name='lending_preview',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='simulation',
+            name='recovery_preview',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.RunPython(calculer_apercus, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulations', '0012_simulation_previews'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='simulation',
+            name='attempts',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='simulation',
+            name='extend_to',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='simulation',
+            name='job_type',
+            field=models.CharField(choices=[('run', 'Simulation'), ('extend', 'Extension')], default='run', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='simulation',
+            name='lease_expires',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='simulation',
+            name='worker_id',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+    ]
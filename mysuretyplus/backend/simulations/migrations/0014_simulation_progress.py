@@ -0,0 +1,18 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulations', '0013_simulation_job_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='simulation',
+            name='progress',
+            field=models.TextField(blank=True, null=True),
+        ),
+    ]
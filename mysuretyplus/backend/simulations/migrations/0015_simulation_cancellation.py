@@ -0,0 +1,28 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulations', '0014_simulation_progress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='simulation',
+            name='cancel_requested',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='simulation',
+            name='is_partial',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='simulation',
+            name='status',
+            field=models.CharField(choices=[('pending', 'En attente'), ('running', 'En cours'), ('completed', 'Terminé'), ('failed', 'Échoué'), ('cancelled', 'Annulé')], default='pending', max_length=20),
+        ),
+    ]
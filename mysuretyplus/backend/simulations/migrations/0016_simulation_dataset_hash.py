@@ -0,0 +1,24 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulations', '0015_simulation_cancellation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='simulation',
+            name='dataset_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='simulation',
+            name='reuse_of',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='attached_simulations', to='simulations.simulation'),
+        ),
+    ]
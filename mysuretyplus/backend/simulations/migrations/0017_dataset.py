@@ -0,0 +1,76 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def creer_datasets(apps, schema_editor):
+    """Un jeu de données par couple (utilisateur, empreinte) des simulations existantes"""
+    Simulation = apps.get_model('simulations', 'Simulation')
+    Dataset = apps.get_model('simulations', 'Dataset')
+    simulations = Simulation.objects.exclude(dataset_hash__isnull=True).exclude(dataset_hash='')
+    for simulation in simulations.order_by('id').iterator():
+        dataset, _ = Dataset.objects.get_or_create(
+            user_id=simulation.user_id,
+            content_hash=simulation.dataset_hash,
+            defaults={
+                'lending_file': simulation.lending_file.name,
+                'recovery_file': simulation.recovery_file.name,
+                'lending_columns': simulation.lending_columns.name if simulation.lending_columns else '',
+                'recovery_columns': simulation.recovery_columns.name if simulation.recovery_columns else '',
+                'lending_preview': simulation.lending_preview,
+                'recovery_preview': simulation.recovery_preview,
+            },
+        )
+        Simulation.objects.filter(pk=simulation.pk).update(dataset=dataset)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulations', '0016_simulation_dataset_hash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='simulation',
+            name='lending_file',
+            field=models.FileField(blank=True, upload_to='simulations/lending/'),
+        ),
+        migrations.AlterField(
+            model_name='simulation',
+            name='recovery_file',
+            field=models.FileField(blank=True, upload_to='simulations/recovery/'),
+        ),
+        migrations.CreateModel(
+            name='Dataset',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(db_index=True, max_length=64)),
+                ('lending_file', models.FileField(upload_to='datasets/')),
+                ('recovery_file', models.FileField(upload_to='datasets/')),
+                ('lending_columns', models.FileField(upload_to='datasets/')),
+                ('recovery_columns', models.FileField(upload_to='datasets/')),
+                ('lending_preview', models.TextField(blank=True, null=True)),
+                ('recovery_preview', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='datasets', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'unique_together': {('user', 'content_hash')},
+            },
+        ),
+        migrations.AddField(
+            model_name='simulation',
+            name='dataset',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='simulations', to='simulations.dataset'),
+        ),
+        migrations.RunPython(creer_datasets, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='simulation',
+            name='dataset_hash',
+        ),
+    ]
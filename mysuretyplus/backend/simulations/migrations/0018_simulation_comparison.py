@@ -0,0 +1,29 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulations', '0017_dataset'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='simulation',
+            name='comparison',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='method_runs', to='simulations.simulation'),
+        ),
+        migrations.AlterField(
+            model_name='simulation',
+            name='job_type',
+            field=models.CharField(choices=[('run', 'Simulation'), ('extend', 'Extension'), ('compare', 'Comparaison')], default='run', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='simulation',
+            name='method',
+            field=models.CharField(choices=[('montecarlo', 'Monte Carlo'), ('bootstrap', 'Bootstrap'), ('compare', 'Monte Carlo + Bootstrap')], default='montecarlo', max_length=20),
+        ),
+    ]
@@ -1,44 +1,196 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
+import io
 import json
+import numpy as np
 import pandas as pd
 import os
 from django.utils import timezone
 
+from .stockage import (
+    OPTIONS_LECTURE_CSV,
+    apercu_dataframe,
+    dataframe_vers_npz,
+    dossier_dataset,
+    empreinte_dataset,
+    npz_vers_dataframe
+)
+
+class Dataset(models.Model):
+    """
+    Jeu de données lending / recovery, analysé une seule fois à l'upload
+
+    Les fichiers bruts et les tables en colonnes (.npz) sont rangés dans le
+    stockage adressé par contenu (datasets/<empreinte>/): plusieurs
+    simulations, et plusieurs utilisateurs, partagent les mêmes fichiers.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='datasets')
+    content_hash = models.CharField(max_length=64, db_index=True)  # Empreinte des CSV et options de lecture
+    lending_file = models.FileField(upload_to='datasets/')
+    recovery_file = models.FileField(upload_to='datasets/')
+    lending_columns = models.FileField(upload_to='datasets/')  # .npz en colonnes
+    recovery_columns = models.FileField(upload_to='datasets/')
+    lending_preview = models.TextField(blank=True, null=True)  # JSON dict: forme, colonnes, 5 premières lignes
+    recovery_preview = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        unique_together = [('user', 'content_hash')]
+    
+    def __str__(self):
+        return f"Dataset {self.id} - {self.content_hash[:12]}"
+    
+    @classmethod
+    def get_or_create_from_files(cls, user, lending_file, recovery_file):
+        """
+        Jeu de données d'un couple de CSV uploadés, créé au premier envoi
+
+        Un contenu déjà reçu (par n'importe quel utilisateur) n'est ni
+        réenregistré ni relu: seules ses tables .npz sont rechargées.
+
+        Returns:
+            tuple: (Dataset, créé)
+        """
+        contenus = {}
+        for libelle, fichier in (('lending', lending_file), ('recovery', recovery_file)):
+            fichier.seek(0)
+            contenus[libelle] = fichier.read()
+        empreinte = empreinte_dataset(contenus['lending'], contenus['recovery'])
+        existant = cls.objects.filter(user=user, content_hash=empreinte).first()
+        if existant is not None:
+            print(f"♻️ Jeu de données {existant.id} déjà présent ({empreinte[:12]})")
+            return existant, False
+        
+        dataset = cls(user=user, content_hash=empreinte)
+        dossier = dossier_dataset(empreinte)
+        for libelle in ('lending', 'recovery'):
+            stockage = getattr(dataset, f"{libelle}_file").storage
+            # Fichier brut: une seule copie par contenu
+            chemin_csv = f"{dossier}/{libelle}.csv"
+            if not stockage.exists(chemin_csv):
+                chemin_csv = stockage.save(chemin_csv, ContentFile(contenus[libelle]))
+            
+            # Table en colonnes: analysée une seule fois par contenu
+            chemin_npz = f"{dossier}/{libelle}.npz"
+            if stockage.exists(chemin_npz):
+                with stockage.open(chemin_npz, 'rb') as table:
+                    df = npz_vers_dataframe(table)
+                print(f"♻️ Table {libelle} déjà analysée ({empreinte[:12]})")
+            else:
+                df = pd.read_csv(io.BytesIO(contenus[libelle]), **OPTIONS_LECTURE_CSV)
+                chemin_npz = stockage.save(chemin_npz, ContentFile(dataframe_vers_npz(df)))
+            
+            getattr(dataset, f"{libelle}_file").name = chemin_csv
+            getattr(dataset, f"{libelle}_columns").name = chemin_npz
+            setattr(dataset, f"{libelle}_preview", json.dumps(apercu_dataframe(df)))
+        
+        try:
+            with transaction.atomic():
+                dataset.save()
+        except IntegrityError:
+            # Même envoi traité en parallèle: garder le jeu déjà enregistré
+            return cls.objects.get(user=user, content_hash=empreinte), False
+        print(f"✅ Jeu de données {dataset.id} créé ({empreinte[:12]})")
+        return dataset, True
+    
+    def _lire_table(self, fichier_colonnes, libelle):
+        try:
+            with fichier_colonnes.open('rb') as fichier:
+                return npz_vers_dataframe(fichier)
+        except Exception as e:
+            print(f"Erreur lors de la récupération des données {libelle} du jeu {self.id}: {e}")
+            return None
+    
+    def get_lending_dataframe(self):
+        """Table lending, relue depuis ses colonnes .npz"""
+        return self._lire_table(self.lending_columns, 'lending')
+    
+    def get_recovery_dataframe(self):
+        """Table recovery, relue depuis ses colonnes .npz"""
+        return self._lire_table(self.recovery_columns, 'recovery')
+    
+    def get_lending_preview_dict(self):
+        """Aperçu de la table lending calculé à l'upload"""
+        return json.loads(self.lending_preview) if self.lending_preview else None
+    
+    def get_recovery_preview_dict(self):
+        """Aperçu de la table recovery calculé à l'upload"""
+        return json.loads(self.recovery_preview) if self.recovery_preview else None
+
 class Simulation(models.Model):
     STATUS_CHOICES = [
         ('pending', 'En attente'),
         ('running', 'En cours'),
         ('completed', 'Terminé'),
         ('failed', 'Échoué'),
+        ('cancelled', 'Annulé'),
+    ]
+    
+    JOB_TYPE_CHOICES = [
+        ('run', 'Simulation'),
+        ('extend', 'Extension'),
+        ('compare', 'Comparaison'),
     ]
     
     METHOD_CHOICES = [
         ('montecarlo', 'Monte Carlo'),
         ('bootstrap', 'Bootstrap'),
+        ('compare', 'Monte Carlo + Bootstrap'),
     ]
     
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     method = models.CharField(max_length=20, choices=METHOD_CHOICES, default='montecarlo')
     num_samples = models.IntegerField(default=1000)
     alpha = models.FloatField(default=0.95)
+    seed = models.BigIntegerField(null=True, blank=True)  # Graine des flux aléatoires (reproductibilité)
+    target_precision = models.FloatField(null=True, blank=True)  # Arrêt anticipé: précision relative visée
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     
+    # File d'attente des jobs (voir jobs.py)
+    job_type = models.CharField(max_length=10, choices=JOB_TYPE_CHOICES, default='run')
+    extend_to = models.IntegerField(null=True, blank=True)  # Nouveau total de réplications (job 'extend')
+    worker_id = models.CharField(max_length=100, null=True, blank=True)  # Worker qui détient le job
+    lease_expires = models.DateTimeField(null=True, blank=True, db_index=True)  # Fin du bail du worker
+    attempts = models.IntegerField(default=0)  # Nombre de réservations du job
+    progress = models.TextField(blank=True, null=True)  # JSON dict: avancement du job en cours
+    # Job identique déjà en cours: cette simulation recevra ses résultats (voir jobs.dedupliquer_ou_mettre_en_file)
+    reuse_of = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True,
+                                 related_name='attached_simulations')
+    # Job de comparaison (method='compare') qui calcule cette simulation avec l'autre méthode
+    comparison = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True,
+                                   related_name='method_runs')
+    cancel_requested = models.BooleanField(default=False)  # Annulation demandée, lue entre deux blocs
+    is_partial = models.BooleanField(default=False)  # Budget de temps épuisé: résultats sur samples_run < num_samples
+    
+    # Jeu de données partagé (les champs de fichiers et de tables ci-dessous servent aux anciennes simulations)
+    dataset = models.ForeignKey(Dataset, on_delete=models.PROTECT, null=True, blank=True, related_name='simulations')
+    
     # Fichiers uploadés
-    lending_file = models.FileField(upload_to='simulations/lending/')
-    recovery_file = models.FileField(upload_to='simulations/recovery/')
+    lending_file = models.FileField(upload_to='simulations/lending/', blank=True)
+    recovery_file = models.FileField(upload_to='simulations/recovery/', blank=True)
     
-    # Données traitées (stockées en JSON)
-    lending_data = models.TextField(blank=True, null=True)
+    # Données traitées (colonnes binaires .npz; JSON pour les anciennes simulations)
+    lending_data = models.TextField(blank=True, null=True)  # Ancien stockage JSON (simulations existantes)
     recovery_data = models.TextField(blank=True, null=True)
+    lending_columns = models.FileField(upload_to='simulations/lending_columns/', blank=True, null=True)  # .npz en colonnes
+    recovery_columns = models.FileField(upload_to='simulations/recovery_columns/', blank=True, null=True)
+    lending_preview = models.TextField(blank=True, null=True)  # JSON dict: forme, colonnes, 5 premières lignes
+    recovery_preview = models.TextField(blank=True, null=True)
     
     # Résultats
     real_provision = models.FloatField(null=True, blank=True)
-    simulated_provisions = models.TextField(blank=True, null=True)  # JSON array
+    simulated_provisions = models.TextField(blank=True, null=True)  # JSON array (anciennes simulations)
+    provisions_file = models.FileField(upload_to='simulations/provisions/', blank=True, null=True)  # .npy float64
     real_cumulative = models.TextField(blank=True, null=True)  # JSON array pour la trajectoire réelle
     percentiles = models.TextField(blank=True, null=True)  # JSON dict
     confidence_interval = models.TextField(blank=True, null=True)  # JSON dict
+    sorted_provisions_file = models.FileField(upload_to='simulations/provisions/', blank=True, null=True)  # .npy float64 triés (provisions nettoyées)
+    results_cache = models.TextField(blank=True, null=True)  # JSON dict: trajectoires et graphiques calculés à la fin du job
+    samples_run = models.IntegerField(null=True, blank=True)  # Réplications effectivement calculées
+    achieved_precision = models.FloatField(null=True, blank=True)  # Précision relative du quantile alpha
     
     # Métadonnées
     created_at = models.DateTimeField(auto_now_add=True)
@@ -50,58 +202,116 @@ class Simulation(models.Model):
     def __str__(self):
         return f"Simulation {self.id} - {self.method} - {self.status}"
     
-    def get_lending_dataframe(self):
-        """Récupère les données lending sous forme de DataFrame"""
-        if not self.lending_data:
-            return None
+    def _lire_dataframe(self, fichier_colonnes, donnees_json, libelle):
+        """Lit une table depuis son fichier .npz, ou depuis l'ancien stockage JSON"""
         try:
-            data = json.loads(self.lending_data)
-            return pd.DataFrame(data)
+            if fichier_colonnes:
+                with fichier_colonnes.open('rb') as fichier:
+                    return npz_vers_dataframe(fichier)
+            if donnees_json:
+                return pd.DataFrame(json.loads(donnees_json))
+            return None
         except Exception as e:
-            print(f"Erreur lors de la récupération des données lending: {e}")
+            print(f"Erreur lors de la récupération des données {libelle}: {e}")
+            return None
+    
+    def _ecrire_dataframe(self, fichier_colonnes, df, libelle):
+        """
+        Enregistre une table en .npz compressé sous MEDIA_ROOT
+
+        Returns:
+            str: Aperçu de la table en JSON (None si pas de table)
+        """
+        if fichier_colonnes and not fichier_colonnes.name.startswith('datasets/'):
+            # Les tables du stockage par contenu sont partagées: ne jamais les supprimer
+            fichier_colonnes.delete(save=False)
+        if df is None:
             return None
+        fichier_colonnes.save(f"{libelle}.npz", ContentFile(dataframe_vers_npz(df)), save=False)
+        return json.dumps(apercu_dataframe(df))
+    
+    def get_lending_dataframe(self):
+        """Récupère les données lending sous forme de DataFrame"""
+        if self.dataset_id is not None:
+            return self.dataset.get_lending_dataframe()
+        return self._lire_dataframe(self.lending_columns, self.lending_data, 'lending')
     
     def set_lending_dataframe(self, df):
-        """Stocke un DataFrame lending en JSON"""
-        if df is not None:
-            self.lending_data = df.to_json(orient='records')
-        else:
-            self.lending_data = None
+        """Stocke un DataFrame lending en colonnes binaires (.npz) et son aperçu"""
+        self.lending_preview = self._ecrire_dataframe(self.lending_columns, df, 'lending')
+        self.lending_data = None
     
     def get_recovery_dataframe(self):
         """Récupère les données recovery sous forme de DataFrame"""
-        if not self.recovery_data:
-            return None
-        try:
-            data = json.loads(self.recovery_data)
-            return pd.DataFrame(data)
-        except Exception as e:
-            print(f"Erreur lors de la récupération des données recovery: {e}")
-            return None
+        if self.dataset_id is not None:
+            return self.dataset.get_recovery_dataframe()
+        return self._lire_dataframe(self.recovery_columns, self.recovery_data, 'recovery')
     
     def set_recovery_dataframe(self, df):
-        """Stocke un DataFrame recovery en JSON"""
-        if df is not None:
-            self.recovery_data = df.to_json(orient='records')
-        else:
-            self.recovery_data = None
+        """Stocke un DataFrame recovery en colonnes binaires (.npz) et son aperçu"""
+        self.recovery_preview = self._ecrire_dataframe(self.recovery_columns, df, 'recovery')
+        self.recovery_data = None
     
-    def get_simulated_provisions_list(self):
-        """Récupère la liste des provisions simulées"""
-        if not self.simulated_provisions:
-            return []
+    def get_lending_preview_dict(self):
+        """Récupère l'aperçu des données lending (None si absent)"""
+        if self.dataset_id is not None:
+            return self.dataset.get_lending_preview_dict()
+        return json.loads(self.lending_preview) if self.lending_preview else None
+    
+    def get_recovery_preview_dict(self):
+        """Récupère l'aperçu des données recovery (None si absent)"""
+        if self.dataset_id is not None:
+            return self.dataset.get_recovery_preview_dict()
+        return json.loads(self.recovery_preview) if self.recovery_preview else None
+    
+    def get_simulated_provisions_array(self):
+        """
+        Récupère les provisions simulées en tableau float64
+
+        Le fichier .npy est mappé en mémoire (lecture seule): seules les
+        valeurs réellement lues sont chargées.
+        """
         try:
-            return json.loads(self.simulated_provisions)
+            if self.provisions_file:
+                return self._lire_npy(self.provisions_file)
+            if self.simulated_provisions:
+                return np.asarray(json.loads(self.simulated_provisions), dtype=np.float64)
         except Exception as e:
             print(f"Erreur lors de la récupération des provisions simulées: {e}")
-            return []
+        return np.zeros(0)
+    
+    def set_simulated_provisions_array(self, provisions):
+        """Stocke les provisions simulées dans un fichier .npy (float64)"""
+        self.simulated_provisions = None
+        self._ecrire_npy(self.provisions_file, "provisions.npy", provisions)
+    
+    @staticmethod
+    def _lire_npy(fichier):
+        """Mappe un fichier .npy en mémoire (lecture seule)"""
+        try:
+            return np.load(fichier.path, mmap_mode='r')
+        except NotImplementedError:
+            # Stockage sans chemin local: lecture complète
+            with fichier.open('rb') as contenu:
+                return np.load(contenu)
+    
+    @staticmethod
+    def _ecrire_npy(fichier, nom, valeurs):
+        """Remplace le contenu d'un champ fichier par un tableau .npy float64"""
+        if fichier:
+            fichier.delete(save=False)
+        if valeurs is not None:
+            tampon = io.BytesIO()
+            np.save(tampon, np.asarray(valeurs, dtype=np.float64))
+            fichier.save(nom, ContentFile(tampon.getvalue()), save=False)
+    
+    def get_simulated_provisions_list(self):
+        """Récupère la liste des provisions simulées"""
+        return self.get_simulated_provisions_array().tolist()
     
     def set_simulated_provisions_list(self, provisions_list):
-        """Stocke la liste des provisions simulées en JSON"""
-        if provisions_list is not None:
-            self.simulated_provisions = json.dumps(provisions_list)
-        else:
-            self.simulated_provisions = None
+        """Stocke la liste des provisions simulées"""
+        self.set_simulated_provisions_array(provisions_list)
     
     def get_real_cumulative_list(self):
         """Récupère la liste des valeurs cumulatives réelles"""
@@ -155,24 +365,58 @@ class Simulation(models.Model):
         else:
             self.confidence_interval = None
     
-    def process_uploaded_files(self):
-        """Traite les fichiers CSV uploadés et les stocke en JSON"""
+    def get_results_cache_dict(self):
+        """Récupère les résultats dérivés (trajectoires, graphiques) calculés à la fin du job"""
+        if not self.results_cache:
+            return None
+        try:
+            return json.loads(self.results_cache)
+        except Exception as e:
+            print(f"Erreur lors de la récupération du cache des résultats: {e}")
+            return None
+    
+    def set_results_cache_dict(self, results_dict):
+        """Stocke les résultats dérivés en JSON (None pour invalider le cache)"""
+        if results_dict is not None:
+            self.results_cache = json.dumps(results_dict)
+        else:
+            self.results_cache = None
+    
+    def get_partial_warning(self):
+        """Avertissement à afficher si le budget de temps a tronqué les résultats (None sinon)"""
+        if not self.is_partial:
+            return None
+        return (f"Temps maximal atteint: résultats calculés sur {self.samples_run or 0} "
+                f"réplications sur {self.num_samples} demandées")
+    
+    def get_progress_dict(self):
+        """Récupère l'avancement du job (None si aucun job n'a démarré)"""
+        if not self.progress:
+            return None
         try:
-            # Lire le fichier lending
-            if self.lending_file:
-                lending_df = pd.read_csv(self.lending_file, delimiter=';')
-                self.set_lending_dataframe(lending_df)
-            
-            # Lire le fichier recovery
-            if self.recovery_file:
-                recovery_df = pd.read_csv(self.recovery_file, delimiter=';')
-                self.set_recovery_dataframe(recovery_df)
-            
-            return True
-            
+            return json.loads(self.progress)
+        except Exception as e:
+            print(f"Erreur lors de la récupération de la progression: {e}")
+            return None
+    
+    def get_sorted_provisions_array(self):
+        """
+        Récupère l'index des provisions nettoyées et triées (None si absent)
+
+        Comme les provisions, l'index est un fichier .npy mappé en mémoire: une
+        recherche dichotomique ne lit que les pages qu'elle touche.
+        """
+        if not self.sorted_provisions_file:
+            return None
+        try:
+            return self._lire_npy(self.sorted_provisions_file)
         except Exception as e:
-            print(f"Erreur lors du traitement des fichiers: {e}")
-            return False
+            print(f"Erreur lors de la récupération des provisions triées: {e}")
+            return None
+    
+    def set_sorted_provisions_array(self, sorted_array):
+        """Stocke l'index des provisions triées dans un fichier .npy (float64)"""
+        self._ecrire_npy(self.sorted_provisions_file, "provisions_triees.npy", sorted_array)
     
     def save(self, *args, **kwargs):
         """Override save pour mettre à jour completed_at si terminé"""
@@ -0,0 +1,325 @@
+"""
+Moteur de rééchantillonnage vectorisé (NumPy), sans dépendance graphique
+
+Préparation des tables, tirage des réplications par blocs, flux aléatoires et
+configuration des performances. Les processus du pool (voir parallel.py)
+n'importent que ce module: ils démarrent sans charger matplotlib, seaborn ni
+scipy. calculations.py réexporte ces noms.
+"""
+import importlib.util
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Valeurs par défaut si config.py (racine du projet) est introuvable
+PERFORMANCE_CONFIG_DEFAUT = {
+    "CHUNK_SIZE": 1000,
+    "TIMEOUT": 300,
+    "MAX_WORKERS": 4,
+    "MEMORY_BUDGET_MB": 256,
+    "JOB_CONCURRENCY": 2,
+    "JOB_LEASE_SECONDS": 60,
+    "CHECKPOINT_SECONDS": 30,
+    "JOB_TIME_BUDGET_SECONDS": 21600,
+}
+
+def charger_config_performance():
+    """
+    Lit PERFORMANCE_CONFIG depuis le config.py à la racine du projet
+
+    Returns:
+        dict: Configuration des performances (valeurs par défaut si absente)
+    """
+    config = dict(PERFORMANCE_CONFIG_DEFAUT)
+    try:
+        chemin = Path(__file__).resolve().parents[2] / "config.py"
+        if chemin.exists():
+            spec = importlib.util.spec_from_file_location("config_projet", chemin)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            config.update(getattr(module, "PERFORMANCE_CONFIG", {}))
+    except Exception as e:
+        print(f"⚠️ Impossible de lire config.py: {e}")
+    return config
+
+COLONNES_NON_MONETAIRES = ['ref_date', 'interval', 'SDATE', 'INTERVAL', 'SUM_CENTS_PRINCIPAL']
+
+def vecteur_poids(colonnes):
+    """
+    Vecteur des dénominations: valeur faciale de chaque colonne
+
+    Calculé une seule fois par jeu de données. Les colonnes non monétaires
+    ou dont l'en-tête n'est pas un nombre ont un poids nul.
+
+    Args:
+        colonnes: Noms des colonnes
+
+    Returns:
+        np.ndarray: Poids (float) alignés sur les colonnes
+    """
+    poids = []
+    for col in colonnes:
+        try:
+            poids.append(0.0 if col in COLONNES_NON_MONETAIRES else float(col))
+        except (ValueError, TypeError):
+            poids.append(0.0)
+    return np.array(poids, dtype=float)
+
+def montants_par_ligne(valeurs, poids):
+    """
+    Produit matrice-vecteur: montant de chaque ligne (quantités × dénominations)
+
+    Args:
+        valeurs: Quantités (lignes × dénominations) ou (K × lignes × dénominations)
+        poids: Vecteur des dénominations
+
+    Returns:
+        np.ndarray: Montants (lignes,) ou (K × lignes)
+    """
+    return np.asarray(valeurs) @ poids
+
+def montants_dataframe(df):
+    """Montants par ligne d'un DataFrame lending/recovery, sous forme de ndarray"""
+    poids = vecteur_poids(df.columns)
+    colonnes = df.columns[poids != 0]
+    valeurs = df[colonnes].apply(pd.to_numeric, errors='coerce').fillna(0).to_numpy(dtype=float)
+    return montants_par_ligne(valeurs, poids[poids != 0])
+
+def trajectoire_cumulee(montants_lending, montants_recovery):
+    """
+    Somme cumulée de (lending - recovery) le long du temps (dernier axe)
+
+    Les deux séries sont tronquées à la même longueur. Accepte un axe de
+    réplications en tête.
+    """
+    n_lignes = min(montants_lending.shape[-1], montants_recovery.shape[-1])
+    difference = montants_lending[..., :n_lignes] - montants_recovery[..., :n_lignes]
+    return np.cumsum(difference, axis=-1)
+
+def provision_vectorisee(montants_lending, montants_recovery):
+    """
+    Provision = maximum de la trajectoire cumulée
+
+    Args:
+        montants_lending: Montants lending (lignes,) ou (K × lignes)
+        montants_recovery: Montants recovery (lignes,) ou (K × lignes)
+
+    Returns:
+        float ou np.ndarray: Provision (une par réplication si axe de lot)
+    """
+    cumul = trajectoire_cumulee(montants_lending, montants_recovery)
+    if cumul.shape[-1] == 0:
+        return np.zeros(cumul.shape[:-1])
+    return cumul.max(axis=-1)
+
+def preparer_tableau(df: pd.DataFrame):
+    """
+    Convertit une table lending/recovery en tableau NumPy (jours × intervalles × dénominations)
+
+    Les colonnes rééchantillonnées sont les mêmes que dans montecarlo_ameliore
+    (tout sauf la colonne de date et 'INTERVAL'). Les lignes sont regroupées par
+    date dans l'ordre d'apparition des dates.
+
+    Args:
+        df: DataFrame d'entrée
+
+    Returns:
+        dict: Tableau préparé, ou None si toutes les dates n'ont pas le même
+              nombre d'intervalles (les moteurs pandas sont alors utilisés)
+    """
+    try:
+        date_col = 'ref_date' if 'ref_date' in df.columns else 'SDATE'
+        colonnes_numeriques = [col for col in df.columns if col not in [date_col, 'INTERVAL']]
+
+        codes, dates = pd.factorize(df[date_col])
+        n_jours = len(dates)
+        if n_jours == 0 or (codes < 0).any():
+            return None
+        lignes_par_jour = np.bincount(codes, minlength=n_jours)
+        if (lignes_par_jour != lignes_par_jour[0]).any():
+            return None
+        n_intervalles = int(lignes_par_jour[0])
+
+        valeurs = df[colonnes_numeriques].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+
+        # Regrouper les lignes par date (tri stable pour conserver l'ordre des intervalles)
+        ordre = np.argsort(codes, kind='stable')
+        if (ordre == np.arange(len(ordre))).all():
+            ordre = None
+        else:
+            valeurs = valeurs[ordre]
+
+        valeurs = valeurs.reshape(n_jours, n_intervalles, len(colonnes_numeriques))
+        if np.isfinite(valeurs).all() and (valeurs == np.round(valeurs)).all():
+            valeurs = valeurs.astype(np.int64)
+
+        # Lambda moyen par date et par colonne, calculé en une seule réduction
+        lambdas = valeurs.mean(axis=1)
+        lambdas = np.where(lambdas > 0, lambdas, 0.0)
+
+        return {
+            'date_col': date_col,
+            'colonnes': colonnes_numeriques,
+            'poids': vecteur_poids(colonnes_numeriques),
+            'ordre': ordre,
+            'valeurs': valeurs,
+            'lambdas': lambdas,
+            'n_jours': n_jours,
+            'n_intervalles': n_intervalles,
+        }
+
+    except Exception as e:
+        print(f"Erreur dans preparer_tableau: {e}")
+        return None
+
+def simuler_bloc(tableau, K, rng=None, method="montecarlo"):
+    """
+    Tire K réplications d'une table en une seule fois
+
+    Args:
+        tableau: Tableau préparé par preparer_tableau
+        K: Nombre de réplications du bloc
+        rng: numpy.random.Generator (optionnel)
+        method: Méthode de rééchantillonnage ("montecarlo" ou "bootstrap")
+
+    Returns:
+        np.ndarray: Tenseur d'entiers (K × lignes × dénominations), lignes dans
+                    l'ordre du DataFrame d'origine
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    n_jours, n_intervalles, n_colonnes = tableau['valeurs'].shape
+
+    if method == "montecarlo":
+        lambdas = tableau['lambdas'][np.newaxis, :, np.newaxis, :]
+        tirages = rng.poisson(lam=lambdas, size=(K, n_jours, n_intervalles, n_colonnes))
+    elif method == "bootstrap":
+        # Un seul tirage d'entiers pour tous les jours des K réplications,
+        # puis copie des blocs journaliers par indexation avancée
+        jours_tires = rng.integers(0, n_jours, size=(K, n_jours))
+        tirages = tableau['valeurs'][jours_tires]
+    else:
+        raise ValueError(f"Méthode inconnue: {method}")
+
+    tirages = tirages.reshape(K, n_jours * n_intervalles, n_colonnes)
+    if tableau['ordre'] is not None:
+        tirages_ordonnes = np.empty_like(tirages)
+        tirages_ordonnes[:, tableau['ordre']] = tirages
+        tirages = tirages_ordonnes
+    return tirages
+
+def provisions_bloc(bloc_lending, bloc_recovery, poids_lending, poids_recovery):
+    """
+    Calcule les provisions d'un bloc de réplications en une seule réduction
+
+    Pondération par dénomination, différence lending - recovery, somme
+    cumulée puis maximum le long du temps.
+
+    Returns:
+        np.ndarray: Provision de chaque réplication (K,)
+    """
+    return provision_vectorisee(
+        montants_par_ligne(bloc_lending, poids_lending),
+        montants_par_ligne(bloc_recovery, poids_recovery),
+    )
+
+def taille_bloc(*tableaux, budget_octets=None):
+    """
+    Nombre de réplications par bloc pour respecter le budget mémoire
+
+    Le budget par défaut est PERFORMANCE_CONFIG['MEMORY_BUDGET_MB']. Chaque
+    réplication coûte le tenseur d'entiers et sa copie pondérée en float.
+    """
+    if budget_octets is None:
+        budget_octets = charger_config_performance()["MEMORY_BUDGET_MB"] * 1024 * 1024
+    octets_par_replication = sum(tableau['valeurs'].size for tableau in tableaux) * 8 * 2
+    return max(1, int(budget_octets // max(octets_par_replication, 1)))
+
+def simuler_provisions_par_blocs(tableau_lending, tableau_recovery, N, method="montecarlo", rng=None, taille=None):
+    """
+    Produit les provisions de N réplications, bloc par bloc
+
+    Args:
+        tableau_lending: Tableau lending préparé par preparer_tableau
+        tableau_recovery: Tableau recovery préparé par preparer_tableau
+        N: Nombre total de réplications
+        method: Méthode de rééchantillonnage
+        rng: numpy.random.Generator commun, ou couple (lending, recovery) (optionnel)
+        taille: Réplications par bloc (défaut: selon le budget mémoire)
+
+    Yields:
+        np.ndarray: Provisions du bloc courant
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    rng_lending, rng_recovery = rng if isinstance(rng, tuple) else (rng, rng)
+    if taille is None:
+        taille = taille_bloc(tableau_lending, tableau_recovery)
+
+    faites = 0
+    while faites < N:
+        k = min(taille, N - faites)
+        bloc_lending = simuler_bloc(tableau_lending, k, rng_lending, method)
+        bloc_recovery = simuler_bloc(tableau_recovery, k, rng_recovery, method)
+        yield provisions_bloc(bloc_lending, bloc_recovery, tableau_lending['poids'], tableau_recovery['poids'])
+        faites += k
+
+# Nombre de réplications par flux aléatoire. La réplication r utilise toujours
+# le flux r // REPLICATIONS_PAR_FLUX: les résultats ne dépendent que de la
+# graine, pas du nombre de workers ni de la taille des blocs. Ne pas modifier
+# sans accepter que les graines existantes donnent d'autres résultats.
+REPLICATIONS_PAR_FLUX = 250
+
+def nouvelle_graine():
+    """Tire une graine aléatoire (entier positif sur 63 bits) pour un nouveau job"""
+    return int(np.random.SeedSequence().generate_state(1, np.uint64)[0] >> np.uint64(1))
+
+def generateurs_flux(seed, indice_flux):
+    """
+    Générateurs indépendants (lending, recovery) d'un flux de réplications
+
+    Équivalent à SeedSequence(seed).spawn(...)[indice_flux].spawn(2), sans
+    dépendre de l'ordre de création des flux.
+    """
+    enfants = np.random.SeedSequence(seed, spawn_key=(indice_flux,)).spawn(2)
+    return tuple(np.random.default_rng(enfant) for enfant in enfants)
+
+def decouper_flux(debut, fin):
+    """
+    Découpe les réplications [debut, fin) en tâches alignées sur les flux
+
+    Returns:
+        list: Tâches (indice_flux, debut, fin)
+    """
+    taches = []
+    while debut < fin:
+        indice_flux = debut // REPLICATIONS_PAR_FLUX
+        borne = min(fin, (indice_flux + 1) * REPLICATIONS_PAR_FLUX)
+        taches.append((indice_flux, debut, borne))
+        debut = borne
+    return taches
+
+def simuler_flux(tableau_lending, tableau_recovery, method, seed, indice_flux, debut, fin, taille=None):
+    """
+    Provisions des réplications [debut, fin) d'un même flux
+
+    Si debut n'est pas le début du flux, les réplications précédentes sont
+    tirées puis ignorées pour retrouver exactement le même état aléatoire.
+
+    Returns:
+        np.ndarray: Provisions (fin - debut,)
+    """
+    rngs = generateurs_flux(seed, indice_flux)
+    if taille is None:
+        taille = taille_bloc(tableau_lending, tableau_recovery)
+
+    a_ignorer = debut - indice_flux * REPLICATIONS_PAR_FLUX
+    while a_ignorer > 0:
+        k = min(taille, a_ignorer)
+        simuler_bloc(tableau_lending, k, rngs[0], method)
+        simuler_bloc(tableau_recovery, k, rngs[1], method)
+        a_ignorer -= k
+
+    blocs = list(simuler_provisions_par_blocs(tableau_lending, tableau_recovery, fin - debut, method, rngs, taille))
+    return np.concatenate(blocs) if blocs else np.zeros(0)
@@ -0,0 +1,242 @@
+"""
+Exécution parallèle des réplications sur plusieurs cœurs
+
+Les réplications sont découpées en tâches alignées sur les flux aléatoires
+(voir moteur.REPLICATIONS_PAR_FLUX): chaque tâche a son propre flux,
+les résultats sont donc identiques pour une graine donnée quel que soit le
+nombre de workers. Les workers ne renvoient que les tableaux de provisions.
+
+Les tableaux préparés sont publiés une seule fois en mémoire partagée: chaque
+worker s'y attache sans copie, la mémoire par worker reste donc constante
+quand on augmente le nombre de processus.
+
+Le pool de processus est créé à la première utilisation puis réutilisé par
+tous les jobs du processus: chaque tâche transmet les descripteurs de ses
+tableaux, et un worker garde attachés les tableaux des derniers jobs vus.
+Les workers n'importent que moteur.py (pas de bibliothèques graphiques).
+"""
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .moteur import charger_config_performance, decouper_flux, simuler_flux
+from .quantiles import CroquisQuantiles
+
+# Marqueur d'un tableau NumPy publié en mémoire partagée dans un descripteur
+_SEGMENT = '__memoire_partagee__'
+
+# Tableaux attachés par un worker, par job (clé: noms des segments), du plus ancien au plus récent
+_contextes_worker = {}
+
+# Jobs dont un worker garde les tableaux attachés (jobs concurrents, comparaisons)
+CONTEXTES_PAR_WORKER = 4
+
+# Pool de processus partagé par les jobs du processus (voir obtenir_pool)
+_pool = None
+_taille_pool = 0
+_verrou_pool = threading.Lock()
+
+def publier_tableau(tableau):
+    """
+    Copie les tableaux NumPy d'un tableau préparé en mémoire partagée
+
+    Args:
+        tableau: Tableau préparé par preparer_tableau
+
+    Returns:
+        tuple: (descripteur picklable léger, segments à libérer par l'appelant)
+    """
+    descripteur = {}
+    segments = []
+    for cle, valeur in tableau.items():
+        if isinstance(valeur, np.ndarray):
+            segment = shared_memory.SharedMemory(create=True, size=max(valeur.nbytes, 1))
+            np.ndarray(valeur.shape, dtype=valeur.dtype, buffer=segment.buf)[...] = valeur
+            descripteur[cle] = (_SEGMENT, segment.name, valeur.shape, valeur.dtype.str)
+            segments.append(segment)
+        else:
+            descripteur[cle] = valeur
+    return descripteur, segments
+
+def attacher_tableau(descripteur):
+    """
+    Reconstruit un tableau préparé à partir de la mémoire partagée, sans copie
+
+    Returns:
+        tuple: (tableau en lecture seule, segments à garder ouverts)
+    """
+    tableau = {}
+    segments = []
+    for cle, valeur in descripteur.items():
+        if isinstance(valeur, tuple) and len(valeur) == 4 and valeur[0] == _SEGMENT:
+            _, nom, forme, dtype = valeur
+            segment = shared_memory.SharedMemory(name=nom)
+            vue = np.ndarray(forme, dtype=np.dtype(dtype), buffer=segment.buf)
+            vue.flags.writeable = False
+            tableau[cle] = vue
+            segments.append(segment)
+        else:
+            tableau[cle] = valeur
+    return tableau, segments
+
+def liberer_segments(segments):
+    """Ferme et supprime les segments de mémoire partagée créés par publier_tableau"""
+    for segment in segments:
+        try:
+            segment.close()
+            segment.unlink()
+        except FileNotFoundError:
+            pass
+
+def _fermer_contexte(contexte):
+    """Détache un worker des tableaux d'un job qu'il ne sert plus"""
+    tableaux, segments = contexte
+    # Les vues NumPy doivent disparaître avant la fermeture des segments
+    tableaux.clear()
+    for segment in segments:
+        try:
+            segment.close()
+        except BufferError as e:
+            print(f"⚠️ Segment de mémoire partagée encore utilisé: {e}")
+
+def _tableaux_du_job(descripteur_lending, descripteur_recovery):
+    """
+    Tableaux (lending, recovery) d'un job dans un worker, attachés à la première tâche
+
+    Les CONTEXTES_PAR_WORKER jobs les plus récents restent attachés; les plus
+    anciens, dont les segments ont en général été libérés, sont fermés.
+    """
+    cle = tuple(
+        valeur[1]
+        for descripteur in (descripteur_lending, descripteur_recovery)
+        for valeur in descripteur.values()
+        if isinstance(valeur, tuple) and len(valeur) == 4 and valeur[0] == _SEGMENT
+    )
+    contexte = _contextes_worker.pop(cle, None)
+    if contexte is None:
+        tableau_lending, segments_lending = attacher_tableau(descripteur_lending)
+        tableau_recovery, segments_recovery = attacher_tableau(descripteur_recovery)
+        contexte = ({'lending': tableau_lending, 'recovery': tableau_recovery}, segments_lending + segments_recovery)
+        while len(_contextes_worker) >= CONTEXTES_PAR_WORKER:
+            _fermer_contexte(_contextes_worker.pop(next(iter(_contextes_worker))))
+    _contextes_worker[cle] = contexte
+    tableaux = contexte[0]
+    return tableaux['lending'], tableaux['recovery']
+
+def _executer_tache(tache):
+    """
+    Calcule les provisions d'une tâche dans un worker
+
+    tache: (descripteur lending, descripteur recovery, méthode, graine, croquis_k,
+    indice_flux, debut, fin)
+    """
+    descripteur_lending, descripteur_recovery, method, seed, croquis_k, indice_flux, debut, fin = tache
+    tableau_lending, tableau_recovery = _tableaux_du_job(descripteur_lending, descripteur_recovery)
+    provisions = simuler_flux(tableau_lending, tableau_recovery, method, seed, indice_flux, debut, fin)
+    return _resumer(provisions, croquis_k, indice_flux)
+
+def _resumer(provisions, croquis_k, indice_flux):
+    """Résume les provisions d'une tâche dans un croquis si demandé"""
+    if croquis_k is None:
+        return provisions
+    return CroquisQuantiles(croquis_k, seed=indice_flux).ajouter(provisions)
+
+def nombre_workers(max_workers=None, n_taches=1):
+    """
+    Nombre de processus à utiliser
+
+    Défaut: PERFORMANCE_CONFIG['MAX_WORKERS'], borné par le nombre de tâches
+    et le nombre de cœurs disponibles.
+    """
+    if max_workers is None:
+        max_workers = charger_config_performance()["MAX_WORKERS"]
+    return max(1, min(int(max_workers), n_taches, os.cpu_count() or 1))
+
+def obtenir_pool(workers):
+    """
+    Pool de processus partagé, créé à la première utilisation
+
+    Le démarrage des processus (spawn, import de NumPy) n'est payé qu'une fois
+    par processus Django ou worker de jobs. Le pool n'est recréé que si un job
+    demande plus de processus qu'il n'en a; l'ancien termine alors ses tâches
+    en cours avant de s'arrêter.
+    """
+    global _pool, _taille_pool
+    with _verrou_pool:
+        if _pool is None or _taille_pool < workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            print(f"⚙️ Démarrage d'un pool de {workers} processus")
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _taille_pool = workers
+        return _pool
+
+def fermer_pool():
+    """Arrête le pool partagé (à la sortie du processus, ou après une panne d'un worker)"""
+    global _pool, _taille_pool
+    with _verrou_pool:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+        _taille_pool = 0
+
+atexit.register(fermer_pool)
+
+def iterer_provisions(tableau_lending, tableau_recovery, method, seed, debut, fin, max_workers=None,
+                      croquis_k=None):
+    """
+    Calcule les provisions des réplications [debut, fin), éventuellement en parallèle
+
+    Args:
+        tableau_lending: Tableau lending préparé par preparer_tableau
+        tableau_recovery: Tableau recovery préparé par preparer_tableau
+        method: Méthode de rééchantillonnage ("montecarlo" ou "bootstrap")
+        seed: Graine du job
+        debut: Première réplication
+        fin: Réplication de fin (exclue)
+        max_workers: Nombre max de processus (défaut: PERFORMANCE_CONFIG['MAX_WORKERS'])
+        croquis_k: Si renseigné, chaque tâche renvoie un CroquisQuantiles de taille k
+                   (à fusionner) au lieu du tableau de ses provisions
+
+    Yields:
+        tuple: (indice de la première réplication, provisions ou croquis de la tâche), dans l'ordre
+    """
+    taches = decouper_flux(debut, fin)
+    workers = nombre_workers(max_workers, len(taches))
+
+    if workers == 1:
+        for indice_flux, a, b in taches:
+            provisions = simuler_flux(tableau_lending, tableau_recovery, method, seed, indice_flux, a, b)
+            yield a, _resumer(provisions, croquis_k, indice_flux)
+        return
+
+    print(f"⚙️ {len(taches)} tâches réparties sur {workers} processus")
+    # Le pool est dimensionné pour le maximum configuré: les processus ne sont
+    # lancés qu'à la demande, et un job plus gros ne le recrée pas
+    pool = obtenir_pool(nombre_workers(max_workers, n_taches=os.cpu_count() or 1))
+    descripteur_lending, segments_lending = publier_tableau(tableau_lending)
+    descripteur_recovery, segments_recovery = publier_tableau(tableau_recovery)
+    futures = []
+    try:
+        futures = [
+            pool.submit(_executer_tache,
+                        (descripteur_lending, descripteur_recovery, method, seed, croquis_k, indice_flux, a, b))
+            for indice_flux, a, b in taches
+        ]
+        for (_, a, _), future in zip(taches, futures):
+            yield a, future.result()
+    except BrokenProcessPool:
+        # Worker tué (mémoire, signal): le prochain job repartira d'un pool neuf
+        fermer_pool()
+        raise
+    finally:
+        # Arrêt anticipé (convergence, annulation): les tâches pas encore lancées sont abandonnées
+        for future in futures:
+            future.cancel()
+        liberer_segments(segments_lending + segments_recovery)
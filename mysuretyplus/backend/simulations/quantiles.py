@@ -0,0 +1,223 @@
+"""
+Croquis de quantiles fusionnable (type KLL) pour les provisions simulées
+
+Le croquis résume un flux de provisions en mémoire bornée (~3k valeurs quel
+que soit le nombre de réplications): les réplications peuvent donc être
+agrégées sans conserver chaque provision. Deux croquis se fusionnent, ce qui
+permet à chaque tâche parallèle de résumer ses réplications puis au processus
+principal de combiner les résumés.
+
+Tant qu'aucune compaction n'a eu lieu (moins de k valeurs), le croquis est
+exact et ses quantiles sont identiques à ceux de np.percentile.
+"""
+import numpy as np
+
+# Taille du compacteur: erreur de rang normalisée d'environ 1.65 / K
+K_DEFAUT = 2000
+
+class CroquisQuantiles:
+    """
+    Croquis KLL: le niveau h contient des valeurs de poids 2**h
+
+    Quand un niveau dépasse sa capacité, il est trié et une valeur sur deux
+    (décalage aléatoire) est promue au niveau supérieur.
+    """
+
+    def __init__(self, k=K_DEFAUT, seed=None):
+        self.k = int(k)
+        self.seed = seed
+        self.niveaux = [np.zeros(0)]
+        self.n = 0
+        self.minimum = np.inf
+        self.maximum = -np.inf
+        self._rng = np.random.default_rng(seed)
+
+    def __len__(self):
+        return self.n
+
+    @property
+    def exact(self):
+        """Vrai tant qu'aucune valeur n'a été compactée"""
+        return len(self.niveaux) == 1
+
+    def _capacite(self, niveau):
+        hauteur = len(self.niveaux)
+        return max(2, int(np.ceil(self.k * (2 / 3) ** (hauteur - 1 - niveau))))
+
+    def _compacter(self):
+        """Compacte les niveaux qui dépassent leur capacité"""
+        niveau = 0
+        while niveau < len(self.niveaux):
+            valeurs = self.niveaux[niveau]
+            if len(valeurs) <= self._capacite(niveau):
+                niveau += 1
+                continue
+            if niveau + 1 == len(self.niveaux):
+                self.niveaux.append(np.zeros(0))
+            valeurs = np.sort(valeurs)
+            # Une valeur isolée reste au niveau courant
+            pairs = len(valeurs) - len(valeurs) % 2
+            promues = valeurs[:pairs][self._rng.integers(2)::2]
+            self.niveaux[niveau] = valeurs[pairs:]
+            self.niveaux[niveau + 1] = np.concatenate([self.niveaux[niveau + 1], promues])
+            # Les capacités dépendent de la hauteur: on revérifie depuis le bas
+            niveau = 0
+
+    def ajouter(self, valeurs):
+        """
+        Ajoute des provisions au croquis
+
+        Args:
+            valeurs: Scalaire ou tableau de provisions (les valeurs non finies sont ignorées)
+
+        Returns:
+            CroquisQuantiles: self, pour chaîner les appels
+        """
+        valeurs = np.asarray(valeurs, dtype=float).ravel()
+        valeurs = valeurs[np.isfinite(valeurs)]
+        if len(valeurs) == 0:
+            return self
+        self.n += len(valeurs)
+        self.minimum = min(self.minimum, float(valeurs.min()))
+        self.maximum = max(self.maximum, float(valeurs.max()))
+        self.niveaux[0] = np.concatenate([self.niveaux[0], valeurs])
+        self._compacter()
+        return self
+
+    def fusionner(self, autre):
+        """
+        Fusionne un autre croquis dans celui-ci (ex: résumé d'une tâche parallèle)
+
+        Returns:
+            CroquisQuantiles: self
+        """
+        if autre.n == 0:
+            return self
+        while len(self.niveaux) < len(autre.niveaux):
+            self.niveaux.append(np.zeros(0))
+        for niveau, valeurs in enumerate(autre.niveaux):
+            self.niveaux[niveau] = np.concatenate([self.niveaux[niveau], valeurs])
+        self.n += autre.n
+        self.minimum = min(self.minimum, autre.minimum)
+        self.maximum = max(self.maximum, autre.maximum)
+        self._compacter()
+        return self
+
+    def _valeurs_ponderees(self):
+        """Valeurs triées, poids et rang central de chaque valeur (convention de np.percentile)"""
+        valeurs = np.concatenate(self.niveaux)
+        poids = np.concatenate([np.full(len(v), 2.0 ** h) for h, v in enumerate(self.niveaux)])
+        ordre = np.argsort(valeurs, kind="stable")
+        valeurs, poids = valeurs[ordre], poids[ordre]
+        # Une valeur de poids w couvre les rangs [cumul - w, cumul - 1]
+        centres = np.cumsum(poids) - (poids + 1) / 2
+        # Les extrêmes exacts ancrent l'interpolation aux rangs 0 et n-1
+        valeurs = np.concatenate([[self.minimum], valeurs, [self.maximum]])
+        centres = np.clip(np.concatenate([[0.0], centres, [self.n - 1.0]]), 0, self.n - 1)
+        return valeurs, poids, centres
+
+    def quantile(self, q):
+        """
+        Quantile(s) d'ordre q dans [0, 1], interpolation linéaire comme np.percentile
+
+        Returns:
+            float ou np.ndarray selon q
+        """
+        if self.n == 0:
+            raise ValueError("Croquis vide")
+        q = np.clip(np.asarray(q, dtype=float), 0, 1)
+        if self.exact:
+            return np.quantile(self.niveaux[0], q)
+        valeurs, _, centres = self._valeurs_ponderees()
+        return np.interp(q * (self.n - 1), centres, valeurs)
+
+    def percentile(self, p):
+        """Percentile(s) en pourcentage, comme np.percentile"""
+        return self.quantile(np.asarray(p, dtype=float) / 100)
+
+    def rang(self, x):
+        """
+        Fonction de répartition inverse de quantile(): ordre q tel que quantile(q) ≈ x
+
+        Returns:
+            float ou np.ndarray dans [0, 1]
+        """
+        if self.n == 0:
+            raise ValueError("Croquis vide")
+        if self.n == 1:
+            return np.where(np.asarray(x, dtype=float) >= self.minimum, 1.0, 0.0)
+        if self.exact:
+            valeurs = np.concatenate([[self.minimum], np.sort(self.niveaux[0]), [self.maximum]])
+            centres = np.concatenate([[0.0], np.arange(self.n, dtype=float), [self.n - 1.0]])
+        else:
+            valeurs, _, centres = self._valeurs_ponderees()
+        return np.interp(x, valeurs, centres) / (self.n - 1)
+
+    def tronque(self, bas=1, haut=99):
+        """
+        Croquis restreint aux valeurs entre les percentiles bas et haut
+
+        Équivalent de clean() sur les provisions résumées par le croquis.
+        """
+        resultat = CroquisQuantiles(self.k, self.seed)
+        if self.n == 0:
+            return resultat
+        borne_basse, borne_haute = self.percentile([bas, haut])
+        resultat.niveaux = [v[(v >= borne_basse) & (v <= borne_haute)] for v in self.niveaux]
+        resultat.n = int(sum(len(v) * 2 ** h for h, v in enumerate(resultat.niveaux)))
+        restantes = np.concatenate(resultat.niveaux)
+        if len(restantes):
+            resultat.minimum = float(restantes.min())
+            resultat.maximum = float(restantes.max())
+        return resultat
+
+    def moyenne(self):
+        """Moyenne pondérée des valeurs du croquis"""
+        if self.n == 0:
+            return 0.0
+        valeurs = np.concatenate(self.niveaux)
+        poids = np.concatenate([np.full(len(v), 2.0 ** h) for h, v in enumerate(self.niveaux)])
+        return float(np.average(valeurs, weights=poids))
+
+    def ecart_type(self):
+        """Écart-type pondéré des valeurs du croquis"""
+        if self.n == 0:
+            return 0.0
+        valeurs = np.concatenate(self.niveaux)
+        poids = np.concatenate([np.full(len(v), 2.0 ** h) for h, v in enumerate(self.niveaux)])
+        moyenne = np.average(valeurs, weights=poids)
+        return float(np.sqrt(np.average((valeurs - moyenne) ** 2, weights=poids)))
+
+    def valeurs_representatives(self, m=2000):
+        """
+        Échantillon déterministe de m quantiles régulièrement espacés
+
+        Sert de substitut aux provisions pour les graphiques (courbe de densité).
+        """
+        if self.n == 0:
+            return np.zeros(0)
+        if self.exact:
+            return np.sort(self.niveaux[0])
+        return self.quantile(np.linspace(0, 1, m))
+
+    def to_dict(self):
+        """Représentation sérialisable en JSON"""
+        return {
+            'k': self.k,
+            'seed': self.seed,
+            'n': self.n,
+            'min': self.minimum if self.n else None,
+            'max': self.maximum if self.n else None,
+            'niveaux': [v.tolist() for v in self.niveaux],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Reconstruit un croquis depuis to_dict()"""
+        croquis = cls(data.get('k', K_DEFAUT), data.get('seed'))
+        croquis.niveaux = [np.asarray(v, dtype=float) for v in data.get('niveaux', [[]])] or [np.zeros(0)]
+        croquis.n = int(data.get('n', 0))
+        if croquis.n:
+            croquis.minimum = float(data['min'])
+            croquis.maximum = float(data['max'])
+        return croquis
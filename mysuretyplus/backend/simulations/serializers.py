@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import Simulation
+from .models import Dataset, Simulation
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -13,25 +13,70 @@ class SimulationSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     lending_data = serializers.SerializerMethodField()
     recovery_data = serializers.SerializerMethodField()
+    simulated_provisions = serializers.SerializerMethodField()
+    dataset = serializers.PrimaryKeyRelatedField(queryset=Dataset.objects.all(), required=False, allow_null=True)
     
     class Meta:
         model = Simulation
         fields = [
-            'id', 'user', 'method', 'num_samples', 'alpha', 
+            'id', 'user', 'method', 'num_samples', 'alpha', 'seed',
+            'target_precision', 'samples_run', 'achieved_precision', 'is_partial',
             'created_at', 'completed_at', 'status',
-            'lending_file', 'recovery_file', 'real_provision',
+            'dataset', 'lending_file', 'recovery_file', 'reuse_of', 'comparison', 'real_provision',
             'simulated_provisions', 'percentiles', 'confidence_interval',
             'lending_data', 'recovery_data'
         ]
         read_only_fields = [
             'id', 'user', 'created_at', 'completed_at', 'status',
+            'samples_run', 'achieved_precision', 'is_partial', 'reuse_of', 'comparison',
             'real_provision', 'simulated_provisions', 'percentiles', 
             'confidence_interval', 'lending_data', 'recovery_data'
         ]
     
+    def validate_seed(self, value):
+        """Valider la graine (entier positif sur 63 bits)"""
+        if value is not None and not 0 <= value < 2 ** 63:
+            raise serializers.ValidationError("La graine doit être un entier entre 0 et 2^63 - 1")
+        return value
+    
+    def validate_target_precision(self, value):
+        """Valider la précision relative visée (arrêt anticipé)"""
+        if value is not None and not 0 < value < 1:
+            raise serializers.ValidationError("La précision cible doit être entre 0 et 1 (ex: 0.005 pour 0,5%)")
+        return value
+    
+    def validate_dataset(self, value):
+        """Le jeu de données doit appartenir à l'utilisateur"""
+        request = self.context.get('request')
+        if value is not None and request is not None and value.user_id != request.user.id:
+            raise serializers.ValidationError("Jeu de données non trouvé")
+        return value
+    
+    def validate(self, data):
+        """Création: un jeu de données existant, ou les deux fichiers CSV"""
+        if self.instance is None and data.get('dataset') is None:
+            lending_file = data.get('lending_file')
+            recovery_file = data.get('recovery_file')
+            if not lending_file or not recovery_file:
+                raise serializers.ValidationError(
+                    "Fournir un jeu de données (dataset) ou les fichiers lending et recovery"
+                )
+            if not lending_file.name.endswith('.csv') or not recovery_file.name.endswith('.csv'):
+                raise serializers.ValidationError("Les fichiers lending et recovery doivent être des fichiers CSV")
+        if data.get('method') == 'compare' and data.get('target_precision') is not None:
+            raise serializers.ValidationError("La précision cible n'est pas disponible pour une comparaison")
+        return data
+    
+    def get_simulated_provisions(self, obj):
+        """Retourne les provisions simulées (liste de nombres)"""
+        return obj.get_simulated_provisions_list()
+    
     def get_lending_data(self, obj):
         """Retourne un aperçu des données lending"""
         try:
+            apercu = obj.get_lending_preview_dict()
+            if apercu is not None:
+                return apercu
             df = obj.get_lending_dataframe()
             if df is not None:
                 return {
@@ -46,6 +91,9 @@ class SimulationSerializer(serializers.ModelSerializer):
     def get_recovery_data(self, obj):
         """Retourne un aperçu des données recovery"""
         try:
+            apercu = obj.get_recovery_preview_dict()
+            if apercu is not None:
+                return apercu
             df = obj.get_recovery_dataframe()
             if df is not None:
                 return {
@@ -57,12 +105,84 @@ class SimulationSerializer(serializers.ModelSerializer):
         except:
             return None
 
+class DatasetSerializer(serializers.ModelSerializer):
+    """Sérialiseur des jeux de données (aperçus calculés à l'upload)"""
+    lending_data = serializers.SerializerMethodField()
+    recovery_data = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Dataset
+        fields = ['id', 'content_hash', 'created_at', 'lending_file', 'recovery_file', 'lending_data', 'recovery_data']
+        read_only_fields = fields
+    
+    def get_lending_data(self, obj):
+        return obj.get_lending_preview_dict()
+    
+    def get_recovery_data(self, obj):
+        return obj.get_recovery_preview_dict()
+
+class DatasetCreateSerializer(serializers.Serializer):
+    """Sérialiseur pour l'upload d'un jeu de données"""
+    lending_file = serializers.FileField()
+    recovery_file = serializers.FileField()
+    
+    def validate(self, data):
+        if not data['lending_file'].name.endswith('.csv'):
+            raise serializers.ValidationError("Le fichier lending doit être un fichier CSV")
+        if not data['recovery_file'].name.endswith('.csv'):
+            raise serializers.ValidationError("Le fichier recovery doit être un fichier CSV")
+        return data
+
+class SimulationListSerializer(serializers.ModelSerializer):
+    """
+    Sérialiseur léger pour la liste des simulations
+
+    N'utilise que les aperçus calculés à l'upload: aucune table ni provision
+    n'est décodée.
+    """
+    lending_data = serializers.SerializerMethodField()
+    recovery_data = serializers.SerializerMethodField()
+    percentiles = serializers.SerializerMethodField()
+    confidence_interval = serializers.SerializerMethodField()
+    simulated_provisions_preview = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Simulation
+        fields = [
+            'id', 'method', 'num_samples', 'alpha', 'seed',
+            'target_precision', 'samples_run', 'achieved_precision', 'is_partial',
+            'created_at', 'completed_at', 'status', 'comparison', 'real_provision',
+            'percentiles', 'confidence_interval', 'simulated_provisions_preview',
+            'lending_data', 'recovery_data'
+        ]
+        read_only_fields = fields
+    
+    def get_lending_data(self, obj):
+        """Retourne l'aperçu des données lending calculé à l'upload"""
+        return obj.get_lending_preview_dict()
+    
+    def get_recovery_data(self, obj):
+        """Retourne l'aperçu des données recovery calculé à l'upload"""
+        return obj.get_recovery_preview_dict()
+    
+    def get_percentiles(self, obj):
+        return obj.get_percentiles_dict()
+    
+    def get_confidence_interval(self, obj):
+        return obj.get_confidence_interval_dict()
+    
+    def get_simulated_provisions_preview(self, obj):
+        """Retourne les 10 premières provisions simulées (lues dans le fichier mappé)"""
+        if not obj.provisions_file:
+            return []
+        return obj.get_simulated_provisions_array()[:10].tolist()
+
 class SimulationCreateSerializer(serializers.ModelSerializer):
     """Sérialiseur pour créer des simulations"""
     
     class Meta:
         model = Simulation
-        fields = ['id', 'method', 'num_samples', 'alpha', 'lending_file', 'recovery_file', 'status', 'created_at']
+        fields = ['id', 'method', 'num_samples', 'alpha', 'seed', 'target_precision', 'lending_file', 'recovery_file', 'status', 'created_at']
         read_only_fields = ['id', 'status', 'created_at']
     
     def validate_num_samples(self, value):
@@ -75,8 +195,8 @@ class SimulationCreateSerializer(serializers.ModelSerializer):
     
     def validate_method(self, value):
         """Valider la méthode de simulation"""
-        if value not in ['montecarlo', 'bootstrap']:
-            raise serializers.ValidationError("Méthode invalide. Utilisez 'montecarlo' ou 'bootstrap'")
+        if value not in ['montecarlo', 'bootstrap', 'compare']:
+            raise serializers.ValidationError("Méthode invalide. Utilisez 'montecarlo', 'bootstrap' ou 'compare'")
         return value
     
     def validate_alpha(self, value):
@@ -137,10 +257,95 @@ class RiskCalculationSerializer(serializers.Serializer):
         
         return data
 
+class RiskBatchCalculationSerializer(serializers.Serializer):
+    """Sérialiseur pour les calculs de risque groupés (plusieurs niveaux / provisions)"""
+    risk_levels = serializers.ListField(
+        child=serializers.FloatField(min_value=0.1, max_value=99.9),
+        required=False,
+        max_length=1000,
+        help_text="Niveaux de risque en pourcentage (risk_to_provision)"
+    )
+    target_provisions = serializers.ListField(
+        child=serializers.FloatField(min_value=0),
+        required=False,
+        max_length=1000,
+        help_text="Provisions cibles (provision_to_risk)"
+    )
+    curve = serializers.BooleanField(
+        default=False,
+        help_text="Renvoyer aussi la courbe complète risque / provision"
+    )
+    curve_points = serializers.IntegerField(
+        default=101,
+        min_value=2,
+        max_value=1001,
+        help_text="Nombre de points de la courbe (niveaux de risque de 0 à 100%)"
+    )
+    
+    def validate(self, data):
+        """Au moins un calcul doit être demandé"""
+        if not data.get('risk_levels') and not data.get('target_provisions') and not data.get('curve'):
+            raise serializers.ValidationError(
+                "Fournir risk_levels, target_provisions ou curve=true"
+            )
+        return data
+
+class AlphaSweepSerializer(serializers.Serializer):
+    """Sérialiseur pour le balayage d'alpha: liste explicite ou grille régulière"""
+    alphas = serializers.ListField(
+        child=serializers.FloatField(min_value=0.01, max_value=0.999),
+        required=False,
+        max_length=1000,
+        help_text="Niveaux de confiance (ex: [0.9, 0.95, 0.99])"
+    )
+    alpha_min = serializers.FloatField(default=0.80, min_value=0.01, max_value=0.999)
+    alpha_max = serializers.FloatField(default=0.99, min_value=0.01, max_value=0.999)
+    points = serializers.IntegerField(
+        default=20,
+        min_value=2,
+        max_value=1000,
+        help_text="Nombre de points de la grille (sans alphas)"
+    )
+    
+    def validate(self, data):
+        """La grille doit être croissante"""
+        if not data.get('alphas') and data['alpha_min'] >= data['alpha_max']:
+            raise serializers.ValidationError("alpha_min doit être inférieur à alpha_max")
+        return data
+
+class SimulationExtendSerializer(serializers.Serializer):
+    """Sérialiseur pour ajouter des réplications à une simulation terminée"""
+    num_samples = serializers.IntegerField(
+        max_value=15000,
+        help_text="Nouveau nombre total de réplications (supérieur au nombre actuel)"
+    )
+    
+    def validate_num_samples(self, value):
+        """Le nouveau total doit dépasser le nombre de réplications déjà calculées"""
+        simulation = self.context.get('simulation')
+        if simulation is not None:
+            actuel = len(simulation.get_simulated_provisions_array())
+            if value <= actuel:
+                raise serializers.ValidationError(
+                    f"Le nombre d'échantillons doit être supérieur au nombre actuel ({actuel})"
+                )
+        return value
+
 class SimulationStatusSerializer(serializers.ModelSerializer):
     """Sérialiseur pour le statut des simulations"""
+    progress = serializers.SerializerMethodField()
+    warning = serializers.SerializerMethodField()
+    
     class Meta:
         model = Simulation
-        fields = ['id', 'status', 'created_at', 'completed_at']
+        fields = ['id', 'status', 'is_partial', 'warning', 'cancel_requested', 'created_at', 'completed_at', 'progress']
+    
+    def get_warning(self, obj):
+        """Résultats tronqués par le budget de temps (JOB_TIME_BUDGET_SECONDS), None sinon"""
+        return obj.get_partial_warning()
+    
+    def get_progress(self, obj):
+        """Avancement du job: done, total, percent, elapsed, eta, quantile, poll_after"""
+        return obj.get_progress_dict()
 
 
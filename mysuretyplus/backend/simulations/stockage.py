@@ -0,0 +1,108 @@
+"""
+Stockage binaire en colonnes des tables lending / recovery
+
+Chaque colonne d'un DataFrame est enregistrée comme un tableau NumPy dans une
+archive .npz compressée: pas de noms de colonnes répétés à chaque ligne, des
+entiers stockés en binaire, et une relecture sans analyse de texte.
+Aucun objet Python n'est picklé (allow_pickle=False).
+
+Les jeux de données sont adressés par leur contenu: l'empreinte des deux CSV
+et des options de lecture désigne le dossier datasets/<empreinte>/ où fichiers
+bruts et tables .npz sont enregistrés une seule fois.
+"""
+import hashlib
+import io
+import json
+
+import numpy as np
+import pandas as pd
+
+# Options de lecture des CSV uploadés (elles font partie de l'empreinte)
+OPTIONS_LECTURE_CSV = {'delimiter': ';'}
+
+# Version du format des tables: la changer invalide les empreintes existantes
+VERSION_FORMAT_DATASET = 1
+
+def empreinte_dataset(contenu_lending, contenu_recovery, options=None):
+    """
+    Empreinte SHA-256 d'un couple de fichiers lending / recovery
+
+    Args:
+        contenu_lending: Octets du CSV lending
+        contenu_recovery: Octets du CSV recovery
+        options: Options de lecture (défaut: OPTIONS_LECTURE_CSV)
+
+    Returns:
+        str: Empreinte hexadécimale (64 caractères)
+    """
+    options = OPTIONS_LECTURE_CSV if options is None else options
+    empreinte = hashlib.sha256()
+    entete = {'version': VERSION_FORMAT_DATASET, 'options': options}
+    empreinte.update(json.dumps(entete, sort_keys=True).encode())
+    for contenu in (contenu_lending, contenu_recovery):
+        # Longueur en préfixe: les frontières entre fichiers font partie de l'empreinte
+        empreinte.update(len(contenu).to_bytes(8, 'big'))
+        empreinte.update(contenu)
+    return empreinte.hexdigest()
+
+def dossier_dataset(empreinte):
+    """Dossier (relatif à MEDIA_ROOT) d'un jeu de données adressé par son contenu"""
+    return f"datasets/{empreinte[:2]}/{empreinte}"
+
+def dataframe_vers_npz(df):
+    """
+    Sérialise un DataFrame en archive .npz compressée, colonne par colonne
+
+    Les colonnes texte sont stockées en unicode avec un masque des valeurs manquantes.
+
+    Returns:
+        bytes: Contenu de l'archive
+    """
+    tableaux = {'colonnes': np.array([str(c) for c in df.columns], dtype=str)}
+    for i, colonne in enumerate(df.columns):
+        serie = df[colonne]
+        if serie.dtype.kind in 'biuf':
+            tableaux[f'c{i}'] = serie.to_numpy()
+        else:
+            manquantes = serie.isna().to_numpy()
+            tableaux[f'c{i}'] = np.array(serie.where(~manquantes, '').astype(str).to_numpy(), dtype=str)
+            if manquantes.any():
+                tableaux[f'n{i}'] = manquantes
+    tampon = io.BytesIO()
+    np.savez_compressed(tampon, **tableaux)
+    return tampon.getvalue()
+
+def npz_vers_dataframe(source):
+    """
+    Reconstruit le DataFrame enregistré par dataframe_vers_npz
+
+    Args:
+        source: Chemin ou fichier binaire ouvert
+
+    Returns:
+        pd.DataFrame
+    """
+    with np.load(source, allow_pickle=False) as archive:
+        colonnes = archive['colonnes'].tolist()
+        donnees = {}
+        for i, colonne in enumerate(colonnes):
+            valeurs = archive[f'c{i}']
+            if valeurs.dtype.kind == 'U':
+                valeurs = valeurs.astype(object)
+                if f'n{i}' in archive.files:
+                    valeurs[archive[f'n{i}']] = None
+            donnees[colonne] = valeurs
+    return pd.DataFrame(donnees, columns=colonnes)
+
+def apercu_dataframe(df, n_lignes=5):
+    """
+    Aperçu léger d'une table (forme, colonnes, premières lignes), calculé à l'upload
+
+    Returns:
+        dict: {'shape', 'columns', 'sample_data'} sérialisable en JSON
+    """
+    return {
+        'shape': list(df.shape),
+        'columns': [str(c) for c in df.columns],
+        'sample_data': json.loads(df.head(n_lignes).to_json(orient='records')),
+    }
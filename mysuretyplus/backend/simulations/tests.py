@@ -1,3 +1,933 @@
-from django.test import TestCase
+"""
+Tests des simulations
 
-# Create your tests here.
+Noyaux de calcul (unittest, sans base de données).
+File de jobs et API (TestCase Django): réservation, baux, points de reprise,
+exécution par un worker, déduplication, comparaison, annulation et budget de temps.
+Suivi WebSocket (TransactionTestCase): état initial puis changements poussés.
+"""
+import io
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from datetime import timedelta
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from asgiref.sync import sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from appli_nana.asgi import application
+
+from . import consumers, jobs, parallel, views
+from .calculations import (
+    _vers_dataframe,
+    calculate_risk_metrics,
+    clean,
+    construire_index_provisions,
+    decouper_flux,
+    estimation,
+    fusionner_triees,
+    get_provision_for_risk_level,
+    get_risk_level_for_provision,
+    intervalle_confiance_index,
+    montecarlo_ameliore,
+    precision_quantile,
+    preparer_tableau,
+    provision,
+    provision_pour_risque,
+    provisions_bloc,
+    reproduire_replications,
+    risque_pour_provision,
+    simuler_bloc,
+    simuler_provisions,
+    simuler_provisions_par_blocs,
+    taille_bloc,
+)
+from .evenements import avertir_sans_redis, publier_etat
+from .models import Simulation
+from .parallel import attacher_tableau, iterer_provisions, liberer_segments, nombre_workers, publier_tableau
+from .quantiles import CroquisQuantiles
+from .stockage import dataframe_vers_npz, npz_vers_dataframe
+
+
+def table_exemple(colonne_date, denominations, maximum, n_jours=8, n_intervalles=4, graine=0):
+    """Table lending/recovery au format des CSV uploadés (n_intervalles lignes par date)"""
+    rng = np.random.default_rng(graine)
+    lignes = [
+        [f"{jour + 1:02d}/01/2020", intervalle, *rng.integers(0, maximum, len(denominations))]
+        for jour in range(n_jours)
+        for intervalle in range(n_intervalles)
+    ]
+    return pd.DataFrame(lignes, columns=[colonne_date, 'INTERVAL', *[str(d) for d in denominations]])
+
+def tables_exemple():
+    """Couple (lending, recovery) de petite taille"""
+    lending = table_exemple('ref_date', [50, 100, 200, 500], 40, graine=1)
+    recovery = table_exemple('SDATE', [50, 100, 200, 500, 1000], 30, graine=2)
+    return lending, recovery
+
+def provision_pandas(df_lending, df_recovery):
+    """Provision calculée ligne par ligne, comme le faisait le code pandas d'origine"""
+    def sommes(df):
+        colonnes = [col for col in df.columns if col not in ('ref_date', 'SDATE', 'INTERVAL')]
+        return [
+            sum(float(colonne) * float(valeur) for colonne, valeur in ligne.items())
+            for _, ligne in df[colonnes].iterrows()
+        ]
+    sommes_lending, sommes_recovery = sommes(df_lending), sommes(df_recovery)
+    n = min(len(sommes_lending), len(sommes_recovery))
+    cumul, resultats = 0, []
+    for i in range(n):
+        cumul += sommes_lending[i] - sommes_recovery[i]
+        resultats.append(cumul)
+    return max(resultats)
+
+def tirages_par_jour(tirages, tableau):
+    """Tirages (réplications × lignes × dénominations) regroupés par jour: (jours, réplications × intervalles, dénominations)"""
+    tirages = np.asarray(tirages, dtype=float)
+    if tableau['ordre'] is not None:
+        tirages = tirages[:, tableau['ordre']]
+    n_jours, n_intervalles, n_colonnes = tableau['valeurs'].shape
+    tirages = tirages.reshape(len(tirages), n_jours, n_intervalles, n_colonnes)
+    return tirages.transpose(1, 0, 2, 3).reshape(n_jours, -1, n_colonnes)
+
+def assert_meme_loi_poisson(test, tirages_a, tirages_b, lambdas, ecarts=5):
+    """Moyenne et variance par jour et par dénomination compatibles entre deux moteurs"""
+    m = tirages_a.shape[1]
+    # Écarts types de la différence des moyennes et des variances empiriques (loi de Poisson)
+    tolerance_moyenne = ecarts * np.sqrt(2 * lambdas / m) + 1e-9
+    tolerance_variance = ecarts * np.sqrt(2 * (lambdas + 2 * lambdas ** 2) / m) + 1e-9
+    test.assertTrue((np.abs(tirages_a.mean(axis=1) - tirages_b.mean(axis=1)) <= tolerance_moyenne).all())
+    test.assertTrue((np.abs(tirages_a.var(axis=1) - tirages_b.var(axis=1)) <= tolerance_variance).all())
+
+
+class MoteurMonteCarloTests(unittest.TestCase):
+    """Le moteur par blocs (simuler_bloc) tire selon la même loi que montecarlo_ameliore"""
+
+    def setUp(self):
+        self.lending = table_exemple('ref_date', [50, 100, 200, 500], 40, n_jours=4, graine=1)
+        self.tableau = preparer_tableau(self.lending)
+
+    def test_structure_conservee(self):
+        bloc = simuler_bloc(self.tableau, 1, np.random.default_rng(0), 'montecarlo')
+        simule = _vers_dataframe(self.lending, self.tableau, bloc[0])
+        self.assertEqual(list(simule.columns), list(self.lending.columns))
+        pd.testing.assert_series_equal(simule['ref_date'], self.lending['ref_date'])
+        pd.testing.assert_series_equal(simule['INTERVAL'], self.lending['INTERVAL'])
+
+    def test_meme_loi_que_montecarlo_ameliore(self):
+        colonnes = self.tableau['colonnes']
+        rng = np.random.default_rng(0)
+        vectorises = simuler_bloc(self.tableau, 200, rng, 'montecarlo')
+        historiques = [montecarlo_ameliore(self.lending, rng)[colonnes].to_numpy() for _ in range(200)]
+
+        assert_meme_loi_poisson(
+            self,
+            tirages_par_jour(vectorises, self.tableau),
+            tirages_par_jour(historiques, self.tableau),
+            self.tableau['lambdas'],
+        )
+
+
+class ProvisionVectoriseeTests(unittest.TestCase):
+    """Le moteur numpy calcule les mêmes provisions que le calcul pandas ligne par ligne"""
+
+    def setUp(self):
+        self.lending, self.recovery = tables_exemple()
+        self.tableau_lending = preparer_tableau(self.lending)
+        self.tableau_recovery = preparer_tableau(self.recovery)
+
+    def test_provision_reelle(self):
+        self.assertAlmostEqual(provision(self.lending, self.recovery),
+                               provision_pandas(self.lending, self.recovery))
+
+    def test_provisions_d_un_bloc(self):
+        rng = np.random.default_rng(5)
+        for method in ('montecarlo', 'bootstrap'):
+            bloc_lending = simuler_bloc(self.tableau_lending, 5, rng, method)
+            bloc_recovery = simuler_bloc(self.tableau_recovery, 5, rng, method)
+            provisions = provisions_bloc(bloc_lending, bloc_recovery,
+                                         self.tableau_lending['poids'], self.tableau_recovery['poids'])
+            attendues = [
+                provision_pandas(_vers_dataframe(self.lending, self.tableau_lending, bloc_lending[k]),
+                                 _vers_dataframe(self.recovery, self.tableau_recovery, bloc_recovery[k]))
+                for k in range(5)
+            ]
+            np.testing.assert_allclose(provisions, attendues)
+
+    def test_taille_des_blocs(self):
+        octets_par_replication = (self.tableau_lending['valeurs'].size + self.tableau_recovery['valeurs'].size) * 16
+        self.assertEqual(taille_bloc(self.tableau_lending, self.tableau_recovery,
+                                     budget_octets=10 * octets_par_replication), 10)
+        self.assertEqual(taille_bloc(self.tableau_lending, self.tableau_recovery, budget_octets=1), 1)
+        blocs = list(simuler_provisions_par_blocs(self.tableau_lending, self.tableau_recovery, 25,
+                                                  rng=np.random.default_rng(0), taille=10))
+        self.assertEqual([len(bloc) for bloc in blocs], [10, 10, 5])
+
+    def test_bootstrap_par_jours_entiers(self):
+        valeurs = self.tableau_lending['valeurs']
+        n_jours, n_intervalles, n_colonnes = valeurs.shape
+        bloc = simuler_bloc(self.tableau_lending, 5, np.random.default_rng(2), 'bootstrap')
+        ordre = self.tableau_lending['ordre']
+        if ordre is not None:
+            bloc = bloc[:, ordre]
+        jours = bloc.reshape(5, n_jours, n_intervalles, n_colonnes)
+        # Chaque jour simulé est la copie d'un jour historique complet
+        for replication in jours:
+            for jour in replication:
+                self.assertTrue(any((jour == original).all() for original in valeurs))
+
+
+class FluxAleatoiresTests(unittest.TestCase):
+    """Les résultats ne dépendent que de la graine"""
+
+    def setUp(self):
+        self.lending, self.recovery = tables_exemple()
+        self.tableaux = (preparer_tableau(self.lending), preparer_tableau(self.recovery))
+
+    def provisions(self, method, debut, fin, max_workers):
+        return [
+            valeur
+            for _, provisions in iterer_provisions(*self.tableaux, method, 11, debut, fin, max_workers)
+            for valeur in provisions.tolist()
+        ]
+
+    def test_decoupage_en_flux(self):
+        self.assertEqual(decouper_flux(0, 600), [(0, 0, 250), (1, 250, 500), (2, 500, 600)])
+        self.assertEqual(decouper_flux(380, 600), [(1, 380, 500), (2, 500, 600)])
+
+    def test_nombre_de_workers_borne(self):
+        with mock.patch('simulations.parallel.os.cpu_count', return_value=2):
+            self.assertEqual(nombre_workers(8, n_taches=3), 2)
+            self.assertEqual(nombre_workers(8, n_taches=1), 1)
+
+    def test_meme_graine_quel_que_soit_le_nombre_de_workers(self):
+        for method in ('montecarlo', 'bootstrap'):
+            sequentiel = self.provisions(method, 0, 600, max_workers=1)
+            # Forcer le pool de processus même sur une machine à un cœur
+            with mock.patch('simulations.parallel.os.cpu_count', return_value=4):
+                parallele = self.provisions(method, 0, 600, max_workers=4)
+            self.assertEqual(len(sequentiel), 600)
+            self.assertEqual(sequentiel, parallele)
+
+    def test_pool_reutilise_entre_les_jobs(self):
+        parallel.fermer_pool()
+        with mock.patch('simulations.parallel.os.cpu_count', return_value=2), \
+                mock.patch.object(parallel, 'ProcessPoolExecutor', wraps=parallel.ProcessPoolExecutor) as creer_pool:
+            premier = self.provisions('montecarlo', 0, 500, max_workers=2)
+            # Job arrêté après son premier bloc: le pool reste utilisable
+            interrompu = iterer_provisions(*self.tableaux, 'bootstrap', 11, 0, 750, 2)
+            next(interrompu)
+            interrompu.close()
+            second = self.provisions('bootstrap', 0, 500, max_workers=2)
+        self.assertEqual(creer_pool.call_count, 1)
+        self.assertEqual(premier, self.provisions('montecarlo', 0, 500, max_workers=1))
+        self.assertEqual(second, self.provisions('bootstrap', 0, 500, max_workers=1))
+
+    def test_prolongation_identique(self):
+        complet = simuler_provisions(self.lending, self.recovery, 'montecarlo', 11, 0, 600, max_workers=1)
+        delta = simuler_provisions(self.lending, self.recovery, 'montecarlo', 11, 380, 600, max_workers=1)
+        self.assertEqual(complet, self.provisions('montecarlo', 0, 600, max_workers=1))
+        self.assertEqual(complet[380:], delta)
+
+    def test_replications_reproduites_depuis_la_graine(self):
+        # 300 réplications: deux flux, comme un job interrompu en cours de second flux
+        attendues = self.provisions('montecarlo', 0, 300, max_workers=1)
+        simulated_lending, simulated_recovery = reproduire_replications(
+            self.lending, self.recovery, 'montecarlo', seed=11, n=300)
+        reproduites = [provision(l, r) for l, r in zip(simulated_lending, simulated_recovery)]
+        np.testing.assert_allclose(reproduites, attendues)
+
+    def test_tableaux_en_memoire_partagee(self):
+        descripteur, segments = publier_tableau(self.tableaux[0])
+        try:
+            tableau, vues = attacher_tableau(descripteur)
+            for cle, valeur in self.tableaux[0].items():
+                if isinstance(valeur, np.ndarray):
+                    np.testing.assert_array_equal(tableau[cle], valeur)
+                    self.assertFalse(tableau[cle].flags.writeable)
+                else:
+                    self.assertEqual(tableau[cle], valeur)
+            for segment in vues:
+                segment.close()
+        finally:
+            liberer_segments(segments)
+
+
+class EstimationTests(unittest.TestCase):
+    """Arrêt anticipé, progression, reprise et mode sketch de estimation() (moteur numpy)"""
+
+    def setUp(self):
+        self.lending, self.recovery = tables_exemple()
+        # estimation() écrit provisions_<méthode>.csv dans le répertoire courant
+        self.repertoire = os.getcwd()
+        self.temporaire = tempfile.mkdtemp()
+        os.chdir(self.temporaire)
+
+    def tearDown(self):
+        os.chdir(self.repertoire)
+        shutil.rmtree(self.temporaire, ignore_errors=True)
+
+    def estimer(self, N=600, **kwargs):
+        return estimation(self.lending, self.recovery, N=N, method='montecarlo', seed=3,
+                          max_workers=1, **kwargs)
+
+    def test_arret_a_la_precision_visee(self):
+        resultat = self.estimer(N=2000, target_precision=0.5)
+        # Quantile 97,5 %: pas d'arrêt avant 20 / 0.025 = 800 réplications, puis à la fin du flux suivant
+        self.assertEqual(resultat['samples_run'], 1000)
+        self.assertEqual(len(resultat['provisions']), 1001)
+        self.assertLessEqual(precision_quantile(resultat['provisions'][1:], 0.95)['relative_precision'], 0.5)
+
+    def test_budget_complet_sans_convergence(self):
+        resultat = self.estimer(target_precision=1e-9)
+        self.assertEqual(resultat['samples_run'], 600)
+
+    def test_progression_par_bloc(self):
+        appels = []
+        self.estimer(progress_callback=lambda faites, total, quantile=None: appels.append((faites, total, quantile)))
+        self.assertEqual([(faites, total) for faites, total, _ in appels], [(250, 600), (500, 600), (600, 600)])
+        self.assertTrue(all(quantile is not None for _, _, quantile in appels))
+
+    def test_suivi_trie_incremental(self):
+        rng = np.random.default_rng(0)
+        blocs = [rng.normal(1000, 150, taille) for taille in (250, 250, 100)]
+        triees = np.zeros(0)
+        for bloc in blocs:
+            triees = fusionner_triees(triees, bloc)
+        toutes = np.concatenate(blocs)
+        np.testing.assert_array_equal(triees, np.sort(toutes))
+        self.assertEqual(precision_quantile(triees, 0.95, triees=True), precision_quantile(toutes, 0.95))
+        # Quantile suivi par bloc: celui de np.percentile sur les provisions déjà simulées
+        appels = []
+        resultat = self.estimer(progress_callback=lambda faites, total, quantile=None: appels.append(quantile))
+        simulees = resultat['provisions'][1:]
+        for quantile, faites in zip(appels, (250, 500, 600)):
+            self.assertAlmostEqual(quantile, np.percentile(simulees[:faites], 97.5), places=6)
+
+    def estimer_interrompue(self, resume_provisions=None):
+        """Estimation arrêtée après son premier bloc; renvoie le dernier point de reprise"""
+        points = []
+        resultat = self.estimer(
+            resume_provisions=resume_provisions,
+            stop_check=lambda: 'cancelled',
+            checkpoint_callback=lambda simulees: points.append(list(simulees))
+        )
+        self.assertEqual(resultat['stopped'], 'cancelled')
+        return points[-1]
+
+    def test_reprise_equivalente_a_un_calcul_complet(self):
+        complet = self.estimer()['provisions']
+
+        point = self.estimer_interrompue()
+        self.assertEqual(len(point), 250)
+        # Reprise, nouvelle interruption, puis reprise depuis le nouveau point
+        point = self.estimer_interrompue(resume_provisions=point)
+        self.assertEqual(len(point), 500)
+        repris = self.estimer(resume_provisions=point)
+
+        self.assertEqual(repris['samples_run'], 600)
+        self.assertEqual(repris['provisions'], complet)
+
+    def test_mode_sketch_du_moteur(self):
+        complet = self.estimer()
+        resultat = self.estimer(sketch=True)
+        # Seule la provision réelle est conservée en liste
+        self.assertEqual(len(resultat['provisions']), 1)
+        self.assertEqual(resultat['sketch'].n, 600)
+        # Sous k valeurs, le croquis est exact
+        attendues = calculate_risk_metrics(complet['provisions'], 0.95)
+        obtenues = calculate_risk_metrics(resultat['sketch'], 0.95)
+        for cle, valeur in attendues['percentiles'].items():
+            self.assertAlmostEqual(obtenues['percentiles'][cle], valeur)
+
+
+class CroquisQuantilesTests(unittest.TestCase):
+
+    def test_exact_avant_compaction(self):
+        valeurs = np.random.default_rng(0).normal(size=500)
+        croquis = CroquisQuantiles(k=1000).ajouter(valeurs)
+        self.assertTrue(croquis.exact)
+        np.testing.assert_allclose(croquis.percentile([1, 50, 99.5]), np.percentile(valeurs, [1, 50, 99.5]))
+
+    def test_erreur_de_rang(self):
+        valeurs = np.random.default_rng(1).lognormal(size=200_000)
+        croquis = CroquisQuantiles(k=200, seed=0)
+        # Comme les tâches parallèles: un croquis par tâche, fusionnés ensuite
+        for i, morceau in enumerate(np.array_split(valeurs, 40)):
+            croquis.fusionner(CroquisQuantiles(k=200, seed=i).ajouter(morceau))
+        self.assertEqual(croquis.n, len(valeurs))
+        self.assertFalse(croquis.exact)
+
+        points = np.percentile(valeurs, np.arange(1, 100))
+        rangs_exacts = np.searchsorted(np.sort(valeurs), points) / (len(valeurs) - 1)
+        erreur = np.max(np.abs(croquis.rang(points) - rangs_exacts))
+        # Erreur de rang attendue d'environ 1.65 / k
+        self.assertLess(erreur, 2.5 * 1.65 / 200)
+
+
+class CalculsDeRisqueTests(unittest.TestCase):
+    """L'index trié donne les résultats du parcours linéaire d'origine"""
+
+    def setUp(self):
+        rng = np.random.default_rng(2)
+        self.provisions = [1000.0] + rng.normal(1000, 150, 2000).tolist()
+        self.index = construire_index_provisions(self.provisions)
+
+    def test_provision_pour_risque(self):
+        niveaux = np.arange(1, 100)
+        attendues = [get_provision_for_risk_level(self.provisions, niveau) for niveau in niveaux]
+        np.testing.assert_allclose(provision_pour_risque(self.index, niveaux), attendues)
+
+    def test_risque_pour_provision(self):
+        nettoyees = clean(self.provisions[1:])
+        # Aux percentiles entiers, les deux calculs coïncident exactement
+        cibles = np.percentile(nettoyees, np.arange(1, 100))
+        attendus = [get_risk_level_for_provision(self.provisions, cible) for cible in cibles]
+        np.testing.assert_allclose(risque_pour_provision(self.index, cibles), attendus, atol=1e-9)
+        # Entre deux percentiles, le niveau interpolé reste à moins d'un point du plus proche
+        cibles = np.random.default_rng(3).uniform(cibles[0], cibles[-1], 200)
+        attendus = [get_risk_level_for_provision(self.provisions, cible) for cible in cibles]
+        self.assertLessEqual(np.max(np.abs(risque_pour_provision(self.index, cibles) - attendus)), 1.0)
+
+    def test_intervalle_de_confiance_par_alpha(self):
+        alphas = [0.8, 0.9, 0.95, 0.99]
+        bornes_basses, bornes_hautes = intervalle_confiance_index(self.index, alphas)
+        for alpha, basse, haute in zip(alphas, bornes_basses, bornes_hautes):
+            intervalle = calculate_risk_metrics(self.provisions, alpha)['confidence_interval']
+            self.assertEqual((basse, haute), (intervalle['lower'], intervalle['upper']))
+
+
+class StockageTests(unittest.TestCase):
+
+    def test_aller_retour_npz(self):
+        lending, _ = tables_exemple()
+        lending.loc[3, 'ref_date'] = None
+        relue = npz_vers_dataframe(io.BytesIO(dataframe_vers_npz(lending)))
+        pd.testing.assert_frame_equal(relue, lending)
+
+
+class MediaTemporaireMixin:
+    """Fichiers des simulations dans un répertoire temporaire"""
+
+    def setUp(self):
+        super().setUp()
+        self.media = tempfile.mkdtemp()
+        reglages = override_settings(MEDIA_ROOT=self.media)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        self.addCleanup(shutil.rmtree, self.media, True)
+
+
+class SimulationTermineeApiTests(MediaTemporaireMixin, TestCase):
+    """Lecture des résultats et calculs de risque d'une simulation terminée"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('risque', 'risque@test.fr', 'pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        rng = np.random.default_rng(4)
+        self.provisions = [1000.0] + rng.normal(1000, 150, 500).tolist()
+        self.simulation = Simulation(user=self.user, method='montecarlo', num_samples=500, status='completed', seed=5)
+        lending, recovery = tables_exemple()
+        self.simulation.set_lending_dataframe(lending)
+        self.simulation.set_recovery_dataframe(recovery)
+        self.simulation.set_simulated_provisions_list(self.provisions)
+        self.simulation.save()
+
+    def test_calcul_groupe(self):
+        reponse = self.client.post(
+            f'/api/simulations/{self.simulation.id}/calculate_risk/batch/',
+            {'risk_levels': [1, 5, 50], 'target_provisions': [900, 1100], 'curve': True, 'curve_points': 11},
+            format='json'
+        )
+        self.assertEqual(reponse.status_code, 200, reponse.content)
+        resultat = reponse.json()
+        np.testing.assert_allclose(resultat['risk_to_provision']['provision_value'],
+                                   [get_provision_for_risk_level(self.provisions, niveau) for niveau in (1, 5, 50)])
+        self.assertEqual(len(resultat['provision_to_risk']['risk_level']), 2)
+        self.assertEqual(len(resultat['curve']['risk_level']), 11)
+        # L'index est construit à la première demande puis conservé dans un .npy mappé
+        index = Simulation.objects.get(id=self.simulation.id).get_sorted_provisions_array()
+        self.assertIsInstance(index, np.memmap)
+        np.testing.assert_array_equal(index, construire_index_provisions(self.provisions))
+
+    def test_balayage_alpha(self):
+        reponse = self.client.post(f'/api/simulations/{self.simulation.id}/alpha_sweep/',
+                                   {'alphas': [0.9, 0.99]}, format='json')
+        self.assertEqual(reponse.status_code, 200, reponse.content)
+        balayage = reponse.json()
+        self.assertEqual(balayage['alpha'], [0.9, 0.99])
+        for alpha, basse, haute in zip(balayage['alpha'], balayage['lower'], balayage['upper']):
+            intervalle = calculate_risk_metrics(self.provisions, alpha)['confidence_interval']
+            self.assertEqual((basse, haute), (intervalle['lower'], intervalle['upper']))
+
+        resultats = self.client.get(f'/api/simulations/{self.simulation.id}/results/', {'alpha': 0.99}).json()
+        self.assertEqual(resultats['confidence_interval']['upper'], balayage['upper'][1])
+
+    def test_calcul_groupe_sans_demande(self):
+        reponse = self.client.post(f'/api/simulations/{self.simulation.id}/calculate_risk/batch/', {}, format='json')
+        self.assertEqual(reponse.status_code, 400)
+
+    def test_resultats_derives_calcules_une_seule_fois(self):
+        with mock.patch.object(views, 'construire_cache_resultats', wraps=jobs.construire_cache_resultats) as construire:
+            premiere = self.client.get(f'/api/simulations/{self.simulation.id}/results/')
+            seconde = self.client.get(f'/api/simulations/{self.simulation.id}/results/')
+        self.assertEqual(construire.call_count, 1)
+        self.assertEqual(premiere.status_code, 200, premiere.content)
+        self.assertEqual(premiere.json()['simulated_cumulative'], seconde.json()['simulated_cumulative'])
+        self.assertEqual(premiere.json()['density_curve'], seconde.json()['density_curve'])
+
+    def test_tables_relues_depuis_les_colonnes(self):
+        simulation = Simulation.objects.get(id=self.simulation.id)
+        self.assertIsNone(simulation.lending_data)
+        self.assertTrue(simulation.lending_columns.name.endswith('.npz'))
+        pd.testing.assert_frame_equal(simulation.get_recovery_dataframe(), tables_exemple()[1])
+
+    def test_provisions_mappees_en_memoire(self):
+        simulation = Simulation.objects.get(id=self.simulation.id)
+        self.assertIsNone(simulation.simulated_provisions)
+        provisions = simulation.get_simulated_provisions_array()
+        self.assertIsInstance(provisions, np.memmap)
+        self.assertFalse(provisions.flags.writeable)
+        np.testing.assert_array_equal(provisions, self.provisions)
+
+    def test_liste_paginee_sans_decoder_les_tables(self):
+        for _ in range(2):
+            Simulation.objects.create(user=self.user, method='bootstrap', num_samples=100)
+        with mock.patch.object(Simulation, 'get_lending_dataframe') as lire_lending, \
+                mock.patch.object(Simulation, 'get_simulated_provisions_list') as lire_provisions:
+            page = self.client.get('/api/simulations/', {'page_size': 2}).json()
+            suite = self.client.get(page['next']).json()
+        lire_lending.assert_not_called()
+        lire_provisions.assert_not_called()
+        self.assertEqual(len(page['results']), 2)
+        self.assertEqual([s['id'] for s in suite['results']], [self.simulation.id])
+        self.assertIsNone(suite['next'])
+        terminee = suite['results'][0]
+        self.assertEqual(terminee['simulated_provisions_preview'], self.provisions[:10])
+        self.assertEqual(terminee['lending_data']['columns'], list(tables_exemple()[0].columns))
+
+
+class FileDeJobsTests(MediaTemporaireMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('file', 'file@test.fr', 'pw')
+
+    def creer(self, **champs):
+        return Simulation.objects.create(user=self.user, method='montecarlo', num_samples=100, **champs)
+
+    def test_reserver_job_une_seule_fois(self):
+        simulation = self.creer(status='pending')
+        reservee = jobs.reserver_job('worker-1', 60)
+        self.assertEqual(reservee.id, simulation.id)
+        self.assertEqual((reservee.status, reservee.worker_id, reservee.attempts), ('running', 'worker-1', 1))
+        self.assertIsNone(jobs.reserver_job('worker-2', 60))
+
+    def test_remettre_en_file_expires_respecte_max_tentatives(self):
+        expire = timezone.now() - timedelta(seconds=5)
+        relance = self.creer(status='running', worker_id='w', lease_expires=expire, attempts=1)
+        epuisee = self.creer(status='running', worker_id='w', lease_expires=expire,
+                             attempts=jobs.MAX_TENTATIVES)
+        extension = self.creer(status='running', worker_id='w', lease_expires=expire,
+                               attempts=jobs.MAX_TENTATIVES, job_type='extend')
+        en_cours = self.creer(status='running', worker_id='w', attempts=1,
+                              lease_expires=timezone.now() + timedelta(seconds=60))
+
+        self.assertEqual(jobs.remettre_en_file_expires(), 1)
+        statuts = dict(Simulation.objects.values_list('id', 'status'))
+        self.assertEqual(statuts[relance.id], 'pending')
+        self.assertEqual(statuts[epuisee.id], 'failed')
+        # Extension abandonnée: la simulation garde ses résultats précédents
+        self.assertEqual(statuts[extension.id], 'completed')
+        self.assertEqual(statuts[en_cours.id], 'running')
+
+    def test_bail_perdu(self):
+        self.creer(status='pending')
+        simulation = jobs.reserver_job('worker-1', 60)
+        # Bail expiré puis job repris par un autre worker
+        Simulation.objects.filter(id=simulation.id).update(worker_id='worker-2')
+        controle = jobs.ControleArret(simulation.id, budget=0, worker_id='worker-1')
+        self.assertEqual(controle(), 'lease_lost')
+
+        simulation.status = 'failed'
+        self.assertFalse(jobs.enregistrer_job(simulation))
+        self.assertEqual(Simulation.objects.get(id=simulation.id).status, 'running')
+
+    def test_battement_survit_a_une_erreur(self):
+        self.creer(status='pending')
+        simulation = jobs.reserver_job('worker-1', 60)
+        renouvellements = []
+
+        def renouveler(*args):
+            renouvellements.append(args)
+            if len(renouvellements) == 1:
+                raise Exception("base verrouillée")
+            return True
+
+        with mock.patch.object(jobs, 'renouveler_bail', side_effect=renouveler), \
+                mock.patch.object(jobs, 'executer_simulation', side_effect=lambda _: time.sleep(0.5)):
+            jobs.executer_job(simulation, 'worker-1', 0.3)
+        self.assertGreaterEqual(len(renouvellements), 2)
+
+    def test_point_de_reprise(self):
+        simulation = self.creer(status='running', seed=5)
+        jobs.ecrire_point_reprise(simulation, [1.0, 2.0, 3.0], ecoule=12.5)
+        point = jobs.lire_point_reprise(simulation)
+        np.testing.assert_array_equal(point['provisions'], [1.0, 2.0, 3.0])
+        self.assertEqual(point['ecoule'], 12.5)
+
+        # Autre graine ou autre type de job: le point de reprise ne s'applique pas
+        simulation.seed = 6
+        self.assertIsNone(jobs.lire_point_reprise(simulation))
+        simulation.seed, simulation.job_type = 5, 'extend'
+        self.assertIsNone(jobs.lire_point_reprise(simulation))
+
+        jobs.supprimer_point_reprise(simulation.id)
+        self.assertFalse(os.path.exists(jobs.chemin_point_reprise(simulation.id)))
+
+    def test_orphelins_remis_en_file(self):
+        futur = timezone.now() + timedelta(seconds=600)
+        sans_bail = self.creer(status='running', attempts=1)
+        # Worker arrêté: pid d'un processus terminé
+        termine = subprocess.Popen([sys.executable, '-c', ''])
+        termine.wait()
+        disparu = self.creer(status='running', attempts=1, lease_expires=futur,
+                             worker_id=f"{socket.gethostname()}:{termine.pid}:0")
+        vivant = self.creer(status='running', attempts=1, lease_expires=futur,
+                            worker_id=f"{socket.gethostname()}:{os.getpid()}:0")
+
+        self.assertEqual(jobs.recuperer_orphelins(), 2)
+        statuts = dict(Simulation.objects.values_list('id', 'status'))
+        self.assertEqual(statuts[sans_bail.id], 'pending')
+        self.assertEqual(statuts[disparu.id], 'pending')
+        self.assertEqual(statuts[vivant.id], 'running')
+
+
+class SimulationApiTests(MediaTemporaireMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('api', 'api@test.fr', 'pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        lending, recovery = tables_exemple()
+        self.csv = {
+            'lending': lending.to_csv(sep=';', index=False).encode(),
+            'recovery': recovery.to_csv(sep=';', index=False).encode(),
+        }
+
+    def creer(self, **champs):
+        donnees = {
+            'method': 'montecarlo', 'num_samples': 300, 'alpha': 0.95, 'seed': 7,
+            'lending_file': SimpleUploadedFile('lending.csv', self.csv['lending']),
+            'recovery_file': SimpleUploadedFile('recovery.csv', self.csv['recovery']),
+        }
+        donnees.update(champs)
+        reponse = self.client.post('/api/simulations/', donnees, format='multipart')
+        self.assertEqual(reponse.status_code, 201, reponse.content)
+        return reponse.json()
+
+    def executer_file(self):
+        """Exécute les jobs en attente dans ce thread, comme un worker"""
+        while True:
+            simulation = jobs.reserver_job('worker-test', 3600)
+            if simulation is None:
+                return
+            jobs.executer_job(simulation, 'worker-test', 3600)
+
+    def statut(self, simulation_id):
+        return self.client.get(f'/api/simulations/{simulation_id}/status/').json()
+
+    def test_simulation_executee_par_un_worker(self):
+        simulation = self.creer()
+        self.assertEqual(simulation['status'], 'pending')
+        self.executer_file()
+
+        statut = self.statut(simulation['id'])
+        self.assertEqual(statut['status'], 'completed')
+        self.assertEqual((statut['progress']['done'], statut['progress']['total']), (300, 300))
+        self.assertIsNone(statut['warning'])
+        self.assertEqual(statut['progress']['percent'], 100.0)
+        resultats = self.client.get(f"/api/simulations/{simulation['id']}/results/").json()
+        self.assertEqual(len(resultats['simulated_provisions']), 300)
+
+    def test_resultat_reutilise(self):
+        premiere = self.creer()
+        self.executer_file()
+
+        seconde = self.creer(alpha=0.9)
+        self.assertEqual(seconde['status'], 'completed')
+        source = Simulation.objects.get(id=premiere['id'])
+        copie = Simulation.objects.get(id=seconde['id'])
+        self.assertEqual(copie.get_simulated_provisions_list(), source.get_simulated_provisions_list())
+        # Tables stockées une seule fois pour les deux simulations
+        self.assertEqual(copie.dataset_id, source.dataset_id)
+        # Alpha différent: intervalle recalculé depuis les réplications copiées
+        intervalle = copie.get_confidence_interval_dict()
+        self.assertEqual(intervalle['alpha'], 0.9)
+        self.assertLess(intervalle['upper'] - intervalle['lower'],
+                        source.get_confidence_interval_dict()['upper'] - source.get_confidence_interval_dict()['lower'])
+
+    def test_resultat_reutilise_recalcule_pour_alpha(self):
+        premiere = self.creer()
+        self.executer_file()
+
+        seconde = self.creer(alpha=0.99)
+        self.assertEqual(seconde['status'], 'completed')
+        source = Simulation.objects.get(id=premiere['id'])
+        copie = Simulation.objects.get(id=seconde['id'])
+        # Mêmes sorties que le job lui-même pour alpha = 0.99
+        provisions = copie.get_simulated_provisions_list()
+        metriques = calculate_risk_metrics(provisions, 0.99)
+        self.assertEqual(copie.get_confidence_interval_dict(), metriques['confidence_interval'])
+        self.assertEqual(copie.achieved_precision, precision_quantile(provisions, 0.99)['relative_precision'])
+        # Fichiers propres à la copie
+        self.assertNotEqual(copie.sorted_provisions_file.name, source.sorted_provisions_file.name)
+        np.testing.assert_array_equal(copie.get_sorted_provisions_array(), source.get_sorted_provisions_array())
+        # Sorties indépendantes d'alpha
+        self.assertEqual(copie.get_percentiles_dict(), metriques['percentiles'])
+        self.assertEqual(copie.get_percentiles_dict(), source.get_percentiles_dict())
+        self.assertEqual(copie.get_results_cache_dict(), source.get_results_cache_dict())
+
+    def test_pas_de_reutilisation_entre_utilisateurs(self):
+        premiere = self.creer()
+        autre = User.objects.create_user('autre', 'autre@test.fr', 'pw')
+        client_proprietaire = self.client
+        self.client = APIClient()
+        self.client.force_authenticate(autre)
+
+        # Mêmes fichiers, même graine: ni rattachement au job en cours...
+        en_cours = self.creer()
+        self.assertIsNone(Simulation.objects.get(id=en_cours['id']).reuse_of_id)
+        Simulation.objects.filter(id=en_cours['id']).delete()
+        self.executer_file()
+        # ...ni copie du résultat terminé d'un autre utilisateur
+        terminee = self.creer()
+        self.assertEqual(terminee['status'], 'pending')
+        simulation = Simulation.objects.get(id=terminee['id'])
+        self.assertIsNone(simulation.reuse_of_id)
+        self.assertNotEqual(simulation.dataset_id,
+                            Simulation.objects.get(id=premiere['id']).dataset_id)
+        self.client = client_proprietaire
+
+    def test_rattachement_a_un_job_en_cours(self):
+        premiere = self.creer()
+        seconde = self.creer()
+        self.assertEqual(Simulation.objects.get(id=seconde['id']).reuse_of_id, premiere['id'])
+        self.executer_file()
+
+        self.assertEqual(self.statut(seconde['id'])['status'], 'completed')
+        self.assertEqual(Simulation.objects.get(id=seconde['id']).get_simulated_provisions_list(),
+                         Simulation.objects.get(id=premiere['id']).get_simulated_provisions_list())
+
+    def test_jeu_de_donnees_partage(self):
+        fichiers = lambda: {
+            'lending_file': SimpleUploadedFile('lending.csv', self.csv['lending']),
+            'recovery_file': SimpleUploadedFile('recovery.csv', self.csv['recovery']),
+        }
+        reponse = self.client.post('/api/datasets/', fichiers(), format='multipart')
+        self.assertEqual(reponse.status_code, 201, reponse.content)
+        dataset = reponse.json()
+        # Mêmes fichiers: le jeu existant est renvoyé
+        reponse = self.client.post('/api/datasets/', fichiers(), format='multipart')
+        self.assertEqual((reponse.status_code, reponse.json()['id']), (200, dataset['id']))
+
+        simulation = self.creer(dataset=dataset['id'], lending_file='', recovery_file='')
+        self.assertEqual(Simulation.objects.get(id=simulation['id']).dataset_id, dataset['id'])
+        pd.testing.assert_frame_equal(Simulation.objects.get(id=simulation['id']).get_recovery_dataframe(),
+                                      tables_exemple()[1])
+
+        # Le jeu de données d'un autre utilisateur est refusé
+        autre = APIClient()
+        autre.force_authenticate(User.objects.create_user('autre', 'autre@test.fr', 'pw'))
+        reponse = autre.post('/api/simulations/', {'method': 'montecarlo', 'num_samples': 300,
+                                                   'dataset': dataset['id']}, format='multipart')
+        self.assertEqual(reponse.status_code, 400)
+
+    def test_prolongation_par_un_worker(self):
+        simulation = self.creer()
+        self.executer_file()
+        reponse = self.client.post(f"/api/simulations/{simulation['id']}/extend/", {'num_samples': 600}, format='json')
+        self.assertEqual(reponse.status_code, 202, reponse.content)
+        self.executer_file()
+
+        prolongee = Simulation.objects.get(id=simulation['id'])
+        self.assertEqual(prolongee.status, 'completed')
+        lending, recovery = tables_exemple()
+        attendues = simuler_provisions(lending, recovery, 'montecarlo', 7, 0, 600, max_workers=1)
+        np.testing.assert_allclose(prolongee.get_simulated_provisions_array(), attendues)
+
+    def test_comparaison_identique_aux_simulations_seules(self):
+        comparaison = self.creer(method='compare')
+        self.executer_file()
+
+        self.assertEqual(self.statut(comparaison['id'])['status'], 'completed')
+        lending, recovery = tables_exemple()
+        enfants = Simulation.objects.get(id=comparaison['id']).method_runs.all()
+        self.assertEqual(sorted(enfant.method for enfant in enfants), ['bootstrap', 'montecarlo'])
+        for enfant in enfants:
+            self.assertEqual(enfant.status, 'completed')
+            attendues = simuler_provisions(lending, recovery, enfant.method, 7, 0, 300, max_workers=1)
+            np.testing.assert_allclose(enfant.get_simulated_provisions_array(), attendues)
+
+    def test_reprise_d_une_comparaison(self):
+        comparaison = self.creer(method='compare', num_samples=600)
+        lending, recovery = tables_exemple()
+        attendues = {}
+        for enfant in Simulation.objects.get(id=comparaison['id']).method_runs.all():
+            attendues[enfant.method] = simuler_provisions(lending, recovery, enfant.method, 7, 0, 600, max_workers=1)
+            enfant.job_type = 'run'
+            jobs.ecrire_point_reprise(enfant, attendues[enfant.method][:250])
+
+        config = jobs.charger_config_performance()
+        with mock.patch.object(jobs, 'charger_config_performance', return_value={**config, 'CHECKPOINT_SECONDS': 0}), \
+                mock.patch.object(jobs, 'ecrire_point_reprise', wraps=jobs.ecrire_point_reprise) as ecrire:
+            self.executer_file()
+            ecrits = [(appel.args[0].method, np.array(appel.args[1])) for appel in ecrire.call_args_list]
+
+        # Chaque point de reprise écrit après la reprise commence par les réplications reprises
+        self.assertTrue(ecrits)
+        for method, provisions in ecrits:
+            self.assertGreater(len(provisions), 250)
+            np.testing.assert_allclose(provisions, attendues[method][:len(provisions)])
+        for enfant in Simulation.objects.get(id=comparaison['id']).method_runs.all():
+            np.testing.assert_allclose(enfant.get_simulated_provisions_array(), attendues[enfant.method])
+
+    def test_annulation_en_attente(self):
+        simulation = self.creer()
+        reponse = self.client.post(f"/api/simulations/{simulation['id']}/cancel/")
+        self.assertEqual(reponse.status_code, 202)
+        self.assertEqual(self.statut(simulation['id'])['status'], 'cancelled')
+        self.assertIsNone(jobs.reserver_job('worker-test', 60))
+        # Plus rien à annuler
+        self.assertEqual(self.client.post(f"/api/simulations/{simulation['id']}/cancel/").status_code, 400)
+
+    def test_annulation_en_cours(self):
+        simulation = self.creer(num_samples=1000)
+        reservee = jobs.reserver_job('worker-test', 3600)
+        reponse = self.client.post(f"/api/simulations/{simulation['id']}/cancel/")
+        self.assertEqual(reponse.status_code, 202)
+        self.assertTrue(reponse.json()['cancel_requested'])
+
+        # Le worker s'arrête au premier bloc de réplications
+        jobs.executer_job(reservee, 'worker-test', 3600)
+        self.assertEqual(self.statut(simulation['id'])['status'], 'cancelled')
+        self.assertFalse(os.path.exists(jobs.chemin_point_reprise(simulation['id'])))
+
+    def test_reprise_depuis_un_point_de_reprise(self):
+        simulation = self.creer(num_samples=600)
+        lending, recovery = tables_exemple()
+        attendues = simuler_provisions(lending, recovery, 'montecarlo', 7, 0, 600, max_workers=1)
+        # Worker arrêté après le premier flux: seules les réplications suivantes sont calculées
+        jobs.ecrire_point_reprise(Simulation.objects.get(id=simulation['id']), attendues[:250], ecoule=3.0)
+        with mock.patch.object(jobs, 'estimation', wraps=jobs.estimation) as estimer:
+            self.executer_file()
+        self.assertEqual(len(estimer.call_args.kwargs['resume_provisions']), 250)
+
+        reprise = Simulation.objects.get(id=simulation['id'])
+        self.assertEqual(reprise.status, 'completed')
+        np.testing.assert_allclose(reprise.get_simulated_provisions_array(), attendues)
+        self.assertFalse(os.path.exists(jobs.chemin_point_reprise(simulation['id'])))
+
+    def test_resultats_partiels_signales(self):
+        simulation = self.creer(num_samples=1000)
+        config = jobs.charger_config_performance()
+        # Budget propre aux jobs (6 heures par défaut), distinct du TIMEOUT
+        self.assertEqual(jobs.ControleArret(simulation['id']).budget, 21600)
+        with mock.patch.object(jobs, 'charger_config_performance', return_value={**config, 'TIMEOUT': 1e-9}):
+            self.assertEqual(jobs.ControleArret(simulation['id']).budget, 21600)
+        with mock.patch.object(jobs, 'charger_config_performance', return_value={**config, 'JOB_TIME_BUDGET_SECONDS': 1e-9}):
+            self.executer_file()
+
+        statut = self.statut(simulation['id'])
+        self.assertEqual(statut['status'], 'completed')
+        self.assertTrue(statut['is_partial'])
+        # Budget épuisé dès le premier bloc: un flux de réplications conservé
+        self.assertEqual(Simulation.objects.get(id=simulation['id']).samples_run, 250)
+        self.assertIn('250', statut['warning'])
+        resultats = self.client.get(f"/api/simulations/{simulation['id']}/results/").json()
+        self.assertEqual(resultats['warning'], statut['warning'])
+
+
+class SuiviWebSocketTests(TransactionTestCase):
+    """ws/simulations/<id>/: état courant à la connexion, puis changements publiés par les workers"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('ws', 'ws@test.fr', 'pw')
+        self.token = Token.objects.create(user=self.user)
+        self.simulation = Simulation.objects.create(user=self.user, method='montecarlo',
+                                                    num_samples=100, status='running')
+
+    def communicateur(self, cle, simulation_id=None):
+        simulation_id = simulation_id or self.simulation.id
+        return WebsocketCommunicator(application, f'/ws/simulations/{simulation_id}/?token={cle}')
+
+    def avancer(self, faites, publier=True):
+        """Comme un worker: écrit la progression puis publie l'état"""
+        Simulation.objects.filter(id=self.simulation.id).update(
+            progress=json.dumps({'done': faites, 'total': 100}))
+        if publier:
+            publier_etat(self.simulation.id)
+
+    async def test_connexion_refusee(self):
+        connecte, code = await self.communicateur('invalide').connect()
+        self.assertFalse(connecte)
+        self.assertEqual(code, 4401)
+
+        autre = await sync_to_async(User.objects.create_user)('autre', 'autre@test.fr', 'pw')
+        simulation = await sync_to_async(Simulation.objects.create)(user=autre, method='montecarlo')
+        connecte, code = await self.communicateur(self.token.key, simulation.id).connect()
+        self.assertFalse(connecte)
+        self.assertEqual(code, 4404)
+
+    async def test_etat_puis_changements_pousses(self):
+        communicateur = self.communicateur(self.token.key)
+        connecte, _ = await communicateur.connect()
+        self.assertTrue(connecte)
+        etat = await communicateur.receive_json_from()
+        self.assertEqual((etat['id'], etat['status'], etat['progress']), (self.simulation.id, 'running', None))
+
+        await sync_to_async(self.avancer)(50)
+        etat = await communicateur.receive_json_from(timeout=5)
+        self.assertEqual(etat['progress']['done'], 50)
+
+        # Un état inchangé n'est pas renvoyé
+        await sync_to_async(publier_etat)(self.simulation.id)
+        self.assertTrue(await communicateur.receive_nothing(timeout=0.3))
+        await communicateur.disconnect()
+
+    async def test_relecture_de_secours(self):
+        # Couche en mémoire: l'avancement d'un worker (autre processus) n'arrive pas par le groupe
+        communicateur = self.communicateur(self.token.key)
+        await communicateur.connect()
+        await communicateur.receive_json_from()
+
+        await sync_to_async(self.avancer)(30, publier=False)
+        etat = await communicateur.receive_json_from(timeout=consumers.INTERVALLE_SURVEILLANCE + 1)
+        self.assertEqual(etat['progress']['done'], 30)
+        await communicateur.disconnect()
+
+    def test_avertissement_sans_redis(self):
+        with override_settings(REDIS_URL=None), mock.patch('builtins.print') as afficher:
+            avertir_sans_redis()
+        self.assertIn('REDIS_URL', afficher.call_args.args[0])
+        with override_settings(REDIS_URL='redis://localhost:6379/0'), mock.patch('builtins.print') as afficher:
+            avertir_sans_redis()
+        afficher.assert_not_called()
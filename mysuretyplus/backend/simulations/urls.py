@@ -1,20 +1,32 @@
 from django.urls import path
 from .views import (
+    DatasetListCreateView,
+    DatasetDetailView,
     SimulationListCreateView,
     SimulationDetailView,
     SimulationStatusView,
     SimulationResultsView,
+    SimulationExtendView,
+    SimulationCancelView,
     RiskCalculationView,
+    RiskBatchCalculationView,
+    AlphaSweepView,
     APIRootView
 )
 
 urlpatterns = [
     path('', APIRootView.as_view(), name='api-root'),
+    path('datasets/', DatasetListCreateView.as_view(), name='dataset-list-create'),
+    path('datasets/<int:pk>/', DatasetDetailView.as_view(), name='dataset-detail'),
     path('simulations/', SimulationListCreateView.as_view(), name='simulation-list-create'),
     path('simulations/<int:pk>/', SimulationDetailView.as_view(), name='simulation-detail'),
     path('simulations/<int:pk>/status/', SimulationStatusView.as_view(), name='simulation-status'),
     path('simulations/<int:pk>/results/', SimulationResultsView.as_view(), name='simulation-results'),
+    path('simulations/<int:pk>/extend/', SimulationExtendView.as_view(), name='simulation-extend'),
+    path('simulations/<int:pk>/cancel/', SimulationCancelView.as_view(), name='simulation-cancel'),
     path('simulations/<int:simulation_id>/calculate_risk/', RiskCalculationView.as_view(), name='risk-calculation'),
+    path('simulations/<int:simulation_id>/calculate_risk/batch/', RiskBatchCalculationView.as_view(), name='risk-calculation-batch'),
+    path('simulations/<int:simulation_id>/alpha_sweep/', AlphaSweepView.as_view(), name='alpha-sweep'),
 ]
 
 
@@ -1,62 +1,107 @@
-import threading
-import time
 import json
+import numpy as np
 from django.shortcuts import render
 from rest_framework import status, generics
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework.pagination import CursorPagination
+from rest_framework.exceptions import ValidationError
 from django.http import JsonResponse
 
-from .models import Simulation
+from .models import Dataset, Simulation
+from .evenements import COLONNES_STATUT
+from .jobs import (
+    annuler_simulation,
+    construire_cache_resultats,
+    creer_comparaison,
+    dedupliquer_ou_mettre_en_file,
+    mettre_en_file
+)
 from .serializers import (
     SimulationSerializer, 
+    SimulationListSerializer,
     SimulationCreateSerializer, 
     RiskCalculationSerializer,
-    SimulationStatusSerializer
+    RiskBatchCalculationSerializer,
+    SimulationExtendSerializer,
+    SimulationStatusSerializer,
+    AlphaSweepSerializer,
+    DatasetSerializer,
+    DatasetCreateSerializer
 )
 from .calculations import (
-    estimation, 
-    calculate_risk_metrics, 
-    get_provision_for_risk_level, 
-    get_risk_level_for_provision,
-    calculate_real_cumulative,
-    calculate_simulated_cumulative_trajectories,
-    calculate_density_curve,
-    generate_trajectory_plot,
-    generate_temporal_patterns_plot
+    construire_index_provisions,
+    intervalle_confiance_index,
+    metriques_alpha,
+    provision_pour_risque,
+    risque_pour_provision
 )
 
+# Colonnes volumineuses, chargées seulement si nécessaire (liste, calculs de risque)
+COLONNES_VOLUMINEUSES = [
+    'lending_data', 'recovery_data', 'simulated_provisions', 'real_cumulative',
+    'results_cache'
+]
+
+class SimulationCursorPagination(CursorPagination):
+    """Pagination par curseur de la liste des simulations (plus récentes d'abord)"""
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = '-created_at'
+
 class SimulationListCreateView(generics.ListCreateAPIView):
     queryset = Simulation.objects.all()
     serializer_class = SimulationSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = SimulationCursorPagination
+
+    def get_serializer_class(self):
+        # Liste: sérialiseur léger; création: sérialiseur complet
+        if self.request.method == 'GET':
+            return SimulationListSerializer
+        return SimulationSerializer
 
     def get_queryset(self):
-        return Simulation.objects.filter(user=self.request.user).order_by('-created_at')
+        return (
+            Simulation.objects.filter(user=self.request.user)
+            .select_related('dataset')
+            .defer(*COLONNES_VOLUMINEUSES)
+            .order_by('-created_at')
+        )
 
     def perform_create(self, serializer):
         print(f"🔍 SimulationListCreateView - Création d'une nouvelle simulation")
-        simulation = serializer.save(user=self.request.user)
-        print(f"✅ Simulation créée avec ID: {simulation.id}")
+        dataset = serializer.validated_data.pop('dataset', None)
+        lending_file = serializer.validated_data.pop('lending_file', None)
+        recovery_file = serializer.validated_data.pop('recovery_file', None)
         
-        # Traiter les fichiers uploadés
-        try:
-            print(f"📁 Traitement des fichiers uploadés pour la simulation {simulation.id}")
-            simulation.process_uploaded_files()
-            simulation.save()
-            print(f"✅ Fichiers traités pour la simulation {simulation.id}")
-            
-            # Lancer la simulation en arrière-plan
-            print(f"🚀 Lancement de la simulation {simulation.id} en arrière-plan")
-            self._run_simulation_background(simulation)
-            
-        except Exception as e:
-            print(f"❌ Erreur lors du traitement des fichiers pour la simulation {simulation.id}: {e}")
-            simulation.status = 'failed'
-            simulation.save()
-            raise e
+        # Fichiers uploadés: jeu de données analysé une seule fois (réutilisé s'il existe déjà)
+        if dataset is None:
+            try:
+                print(f"📁 Traitement des fichiers uploadés")
+                dataset, _ = Dataset.get_or_create_from_files(self.request.user, lending_file, recovery_file)
+            except Exception as e:
+                print(f"❌ Erreur lors du traitement des fichiers: {e}")
+                raise ValidationError({'error': f"Fichiers illisibles: {e}"})
+        
+        # La simulation référence les fichiers du jeu de données: rien n'est copié
+        simulation = serializer.save(
+            user=self.request.user,
+            dataset=dataset,
+            lending_file=dataset.lending_file.name,
+            recovery_file=dataset.recovery_file.name,
+        )
+        print(f"✅ Simulation créée avec ID: {simulation.id} (jeu de données {dataset.id})")
+        
+        if simulation.method == 'compare':
+            # Un seul job pour les deux méthodes: les clients ne suivent que cette simulation
+            creer_comparaison(simulation)
+            return
+        # Réutiliser une simulation identique, sinon mettre en file pour un worker
+        dedupliquer_ou_mettre_en_file(simulation)
     
     def create(self, request, *args, **kwargs):
         """Override create pour retourner la simulation créée"""
@@ -71,87 +116,42 @@ class SimulationListCreateView(generics.ListCreateAPIView):
         print(f"🔍 SimulationListCreateView - Retour de la simulation {simulation.id}")
         return Response(response_serializer.data, status=status.HTTP_201_CREATED)
 
-    def _run_simulation_background(self, simulation):
-        """Lance la simulation en arrière-plan avec une meilleure gestion des erreurs"""
-        def run_simulation():
-            try:
-                print(f"🔍 Début de la simulation {simulation.id}")
-                simulation.status = 'running'
-                simulation.save()
-                
-                # Récupérer les DataFrames depuis le modèle
-                lending_df = simulation.get_lending_dataframe()
-                recovery_df = simulation.get_recovery_dataframe()
-                
-                print(f"📊 DataFrames récupérés - Lending: {lending_df.shape if lending_df is not None else 'None'}, Recovery: {recovery_df.shape if recovery_df is not None else 'None'}")
-                
-                if lending_df is None or recovery_df is None:
-                    raise Exception("Impossible de charger les données")
-                
-                # Lancer l'estimation avec la nouvelle logique
-                print(f"🚀 Lancement de l'estimation - Méthode: {simulation.method}, Échantillons: {simulation.num_samples}")
-                estimation_result = estimation(
-                    lending_df=lending_df,
-                    recovery_df=recovery_df,
-                    alpha=simulation.alpha,
-                    N=simulation.num_samples,
-                    method=simulation.method
-                )
-                
-                if not estimation_result or 'provisions' not in estimation_result:
-                    raise Exception("Aucun résultat de simulation")
-                
-                provisions_list = estimation_result['provisions']
-                print(f"✅ Estimation terminée - {len(provisions_list)} provisions calculées")
-                
-                # Calculer la provision réelle (premier élément)
-                real_provision = provisions_list[0]
-                simulated_provisions = provisions_list[1:]  # Exclure la provision réelle
-                
-                print(f"💰 Provision réelle: {real_provision}")
-                print(f"📈 Provisions simulées: {len(simulated_provisions)} valeurs")
-                
-                # Calculer les métriques de risque
-                risk_metrics = calculate_risk_metrics(simulated_provisions, simulation.alpha)
-                print(f"📊 Métriques de risque calculées")
-                
-                # Calculer la trajectoire cumulative réelle
-                real_cumulative = calculate_real_cumulative(lending_df, recovery_df)
-                print(f"📈 Trajectoire réelle calculée - {len(real_cumulative)} points")
-                
-                # Générer la courbe de densité selon le code utilisateur
-                density_result = calculate_density_curve(simulated_provisions, simulation.method)
-                print(f"📊 Courbe de densité générée: {density_result['success'] if density_result else 'Erreur'}")
-                
-                # Sauvegarder les résultats
-                simulation.real_provision = real_provision
-                simulation.set_simulated_provisions_list(simulated_provisions)
-                simulation.set_percentiles_dict(risk_metrics['percentiles'])
-                simulation.set_confidence_interval_dict(risk_metrics['confidence_interval'])
-                simulation.set_real_cumulative_list(real_cumulative)
-                simulation.status = 'completed'
-                simulation.save()
-                
-                print(f"✅ Simulation {simulation.id} terminée avec succès!")
-                
-            except Exception as e:
-                print(f"❌ Erreur dans la simulation {simulation.id}: {e}")
-                import traceback
-                traceback.print_exc()
-                simulation.status = 'failed'
-                simulation.save()
-        
-        # Lancer dans un thread séparé avec une meilleure gestion
-        thread = threading.Thread(target=run_simulation, name=f"Simulation-{simulation.id}")
-        thread.daemon = True
-        thread.start()
-        
-        # Attendre un peu pour vérifier que le thread démarre correctement
-        time.sleep(0.1)
-        if not thread.is_alive():
-            print(f"⚠️ Le thread de simulation {simulation.id} n'a pas démarré correctement")
-            simulation.status = 'failed'
-            simulation.save()
+class DatasetListCreateView(generics.ListCreateAPIView):
+    """Jeux de données de l'utilisateur; POST: upload d'un couple de CSV"""
+    permission_classes = [IsAuthenticated]
+    pagination_class = SimulationCursorPagination
+
+    def get_serializer_class(self):
+        if self.request.method == 'GET':
+            return DatasetSerializer
+        return DatasetCreateSerializer
+
+    def get_queryset(self):
+        return Dataset.objects.filter(user=self.request.user).order_by('-created_at')
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            dataset, cree = Dataset.get_or_create_from_files(
+                request.user,
+                serializer.validated_data['lending_file'],
+                serializer.validated_data['recovery_file']
+            )
+        except Exception as e:
+            print(f"❌ Erreur lors du traitement des fichiers: {e}")
+            return Response({'error': f"Fichiers illisibles: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            DatasetSerializer(dataset, context={'request': request}).data,
+            status=status.HTTP_201_CREATED if cree else status.HTTP_200_OK
+        )
+
+class DatasetDetailView(generics.RetrieveAPIView):
+    serializer_class = DatasetSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return Dataset.objects.filter(user=self.request.user)
 
 class SimulationDetailView(generics.RetrieveAPIView):
     queryset = Simulation.objects.all()
@@ -167,7 +167,8 @@ class SimulationStatusView(generics.RetrieveAPIView):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Simulation.objects.filter(user=self.request.user)
+        # Interrogé en boucle par les clients: ne charger que les colonnes du statut
+        return Simulation.objects.filter(user=self.request.user).only(*COLONNES_STATUT)
 
 class SimulationResultsView(generics.RetrieveAPIView):
     queryset = Simulation.objects.all()
@@ -194,94 +195,46 @@ class SimulationResultsView(generics.RetrieveAPIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Récupérer les données pour l'affichage
-        lending_df = simulation.get_lending_dataframe()
-        recovery_df = simulation.get_recovery_dataframe()
-        real_cumulative = simulation.get_real_cumulative_list()
-        
-        # Préparer les données pour les graphiques
-        simulated_provisions = simulation.get_simulated_provisions_list()
-        percentiles = simulation.get_percentiles_dict()
-        confidence_interval = simulation.get_confidence_interval_dict()
-        
-        print(f"📊 Données récupérées:")
-        print(f"   Trajectoire réelle: {len(real_cumulative)} points")
-        print(f"   Provisions simulées: {len(simulated_provisions)} valeurs")
-        print(f"   Percentiles: {len(percentiles)} clés")
-        print(f"   Intervalle de confiance: {len(confidence_interval)} clés")
-        
-        # Générer les vraies trajectoires simulées avec la même structure que les données originales
-        simulated_data = calculate_simulated_cumulative_trajectories(
-            lending_df=lending_df,
-            recovery_df=recovery_df,
-            method=simulation.method,
-            num_trajectories=min(10, len(simulated_provisions))  # Limiter à 10 pour l'affichage
-        )
+        if simulation.method == 'compare':
+            return Response(resultats_comparaison(simulation))
         
-        simulated_cumulative_data = simulated_data.get('trajectories', [])
-        x_axis_values = simulated_data.get('x_axis', [])
-        
-        print(f"🎯 Vraies trajectoires simulées générées: {len(simulated_cumulative_data)}")
-        print(f"📊 Valeurs de l'axe X: {len(x_axis_values)} points")
-        if simulated_cumulative_data:
-            print(f"   Longueur de la première trajectoire: {len(simulated_cumulative_data[0])}")
-            print(f"   Longueur de la trajectoire réelle: {len(real_cumulative)}")
-        
-        # Générer le graphique des trajectoires
-        print(f"🎨 Génération du graphique des trajectoires...")
-        trajectory_result = generate_trajectory_plot(
-            lending_df=lending_df,
-            recovery_df=recovery_df,
-            method=simulation.method,
-            num_trajectories=min(20, len(simulated_provisions))
-        )
-        print(f"📊 Graphique des trajectoires généré: {trajectory_result['success'] if trajectory_result else 'Erreur'}")
-        
-        # Générer la courbe de densité
-        print(f"🎨 Génération de la courbe de densité...")
-        density_result = calculate_density_curve(simulated_provisions, simulation.method)
-        print(f"📊 Courbe de densité générée: {density_result['success'] if density_result else 'Erreur'}")
-        
-        # Générer les patterns temporels
-        print(f"🎨 Génération des patterns temporels...")
-        patterns_result = generate_temporal_patterns_plot(
-            lending_df=lending_df,
-            recovery_df=recovery_df,
-            simulated_lending_list=[],  # Sera généré dans la fonction
-            simulated_recovery_list=[],  # Sera généré dans la fonction
-            method=simulation.method,
-            num_samples=min(20, simulation.num_samples)
-        )
-        print(f"📊 Patterns temporels générés: {patterns_result['success'] if patterns_result else 'Erreur'}")
+        # Alpha demandé (?alpha=0.99): intervalle recalculé depuis les réplications stockées
+        alpha = simulation.alpha
+        if request.query_params.get('alpha') is not None:
+            try:
+                alpha = float(request.query_params['alpha'])
+            except ValueError:
+                alpha = None
+            if alpha is None or not 0 < alpha < 1:
+                return Response({'error': 'alpha doit être entre 0 et 1'}, status=status.HTTP_400_BAD_REQUEST)
+        # Alpha de la simulation: intervalle calculé par le job
+        intervalle = simulation.get_confidence_interval_dict() if alpha == simulation.alpha else None
+        index = None if intervalle else charger_index_provisions(simulation)
+        sorties_alpha = metriques_alpha(index, alpha, intervalle)
+        
+        # Résultats dérivés calculés une fois à la fin du job (simple lecture)
+        cache = simulation.get_results_cache_dict()
+        if cache is None:
+            # Simulation antérieure au cache: calcul unique puis enregistrement
+            print(f"🔄 Cache absent, calcul des résultats dérivés de la simulation {simulation.id}")
+            cache = construire_cache_resultats(simulation)
+            simulation.set_results_cache_dict(cache)
+            simulation.save(update_fields=['results_cache'])
         
         response_data = {
             'id': simulation.id,
             'method': simulation.method,
             'num_samples': simulation.num_samples,
-            'alpha': simulation.alpha,
+            'samples_run': simulation.samples_run,
+            'is_partial': simulation.is_partial,  # Budget de temps épuisé avant num_samples
+            'warning': simulation.get_partial_warning(),
+            'alpha': alpha,
             'real_provision': simulation.real_provision,
-            'real_cumulative': real_cumulative,
-            'simulated_provisions': simulated_provisions,  # Garder toutes les provisions
-            'simulated_cumulative': simulated_cumulative_data,
-            'x_axis_values': x_axis_values,  # Valeurs spécifiques pour l'axe X des graphiques
-            'percentiles': percentiles,
-            'confidence_interval': confidence_interval,
-            'trajectory_plot': {
-                'image_base64': trajectory_result.get('image_base64', '') if trajectory_result else '',
-                'success': trajectory_result.get('success', False) if trajectory_result else False,
-                'stats': trajectory_result.get('stats', {}) if trajectory_result else {}
-            },
-            'density_curve': {
-                'image_base64': density_result.get('image_base64', '') if density_result else '',
-                'success': density_result.get('success', False) if density_result else False
-            },
-            'patterns_plot': {
-                'image_base64': patterns_result.get('image_base64', '') if patterns_result else '',
-                'success': patterns_result.get('success', False) if patterns_result else False,
-                'method': patterns_result.get('method', simulation.method) if patterns_result else simulation.method,
-                'num_samples': patterns_result.get('num_samples', min(20, simulation.num_samples)) if patterns_result else min(20, simulation.num_samples),
-                'simulations_shown': patterns_result.get('simulations_shown', 0) if patterns_result else 0
-            },
+            'real_cumulative': simulation.get_real_cumulative_list(),
+            'simulated_provisions': simulation.get_simulated_provisions_list(),  # Garder toutes les provisions
+            'percentiles': simulation.get_percentiles_dict(),
+            **sorties_alpha,
+            **cache,
             'status': simulation.status,
             'created_at': simulation.created_at,
             'completed_at': simulation.completed_at
@@ -289,14 +242,110 @@ class SimulationResultsView(generics.RetrieveAPIView):
         
         print(f"✅ Données envoyées au frontend:")
         print(f"   ID: {response_data['id']}")
-        print(f"   Méthode: {response_data['method']}")
         print(f"   Provisions simulées: {len(response_data['simulated_provisions'])}")
-        print(f"   Courbe de densité: {'Oui' if response_data['density_curve']['image_base64'] else 'Non'}")
-        print(f"   Taille image base64: {len(response_data['density_curve']['image_base64']) if response_data['density_curve']['image_base64'] else 0} caractères")
         print(f"   Trajectoires simulées: {len(response_data['simulated_cumulative'])}")
         
         return Response(response_data)
 
+def resultats_comparaison(simulation):
+    """
+    Résultat joint d'un job de comparaison: métriques côte à côte des deux méthodes
+
+    Les trajectoires et graphiques de chaque méthode sont ceux de sa simulation
+    (methods.<méthode>.simulation_id, /api/simulations/{id}/results/).
+    """
+    return {
+        'id': simulation.id,
+        'method': simulation.method,
+        'num_samples': simulation.num_samples,
+        'samples_run': simulation.samples_run,
+        'is_partial': simulation.is_partial,
+        'warning': simulation.get_partial_warning(),
+        'alpha': simulation.alpha,
+        'seed': simulation.seed,
+        'real_provision': simulation.real_provision,
+        'real_cumulative': simulation.get_real_cumulative_list(),
+        **(simulation.get_results_cache_dict() or {}),
+        'status': simulation.status,
+        'created_at': simulation.created_at,
+        'completed_at': simulation.completed_at
+    }
+
+class SimulationExtendView(APIView):
+    """Prolonge une simulation terminée en continuant ses flux aléatoires"""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        print(f"🔍 SimulationExtendView - Extension de la simulation {pk}")
+        try:
+            simulation = Simulation.objects.get(id=pk, user=request.user)
+        except Simulation.DoesNotExist:
+            return Response({'error': 'Simulation non trouvée'}, status=status.HTTP_404_NOT_FOUND)
+        
+        if simulation.status != 'completed':
+            return Response(
+                {'error': 'Seule une simulation terminée peut être étendue'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if simulation.method == 'compare':
+            return Response(
+                {'error': 'Une comparaison ne peut pas être étendue: étendre la simulation de chaque méthode'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if simulation.seed is None:
+            return Response(
+                {'error': 'Simulation sans graine: ses réplications ne peuvent pas être prolongées'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        serializer = SimulationExtendSerializer(data=request.data, context={'simulation': simulation})
+        if not serializer.is_valid():
+            print(f"❌ Erreurs de validation: {serializer.errors}")
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        num_samples = serializer.validated_data['num_samples']
+        mettre_en_file(simulation, 'extend', num_samples)
+        return Response(
+            {'id': simulation.id, 'status': simulation.status, 'num_samples': num_samples},
+            status=status.HTTP_202_ACCEPTED
+        )
+
+class SimulationCancelView(APIView):
+    """Annule une simulation en attente ou en cours"""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        print(f"🔍 SimulationCancelView - Annulation de la simulation {pk}")
+        try:
+            simulation = Simulation.objects.only('id', 'user', 'status', 'job_type', 'reuse_of', 'comparison').get(id=pk, user=request.user)
+        except Simulation.DoesNotExist:
+            return Response({'error': 'Simulation non trouvée'}, status=status.HTTP_404_NOT_FOUND)
+        
+        if not annuler_simulation(simulation):
+            return Response(
+                {'error': 'Seule une simulation en attente ou en cours peut être annulée'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        # En cours: le worker s'arrête au prochain bloc de réplications
+        return Response(
+            {'id': simulation.id, 'status': simulation.status, 'cancel_requested': simulation.cancel_requested},
+            status=status.HTTP_202_ACCEPTED
+        )
+
+def charger_index_provisions(simulation):
+    """
+    Index des provisions triées d'une simulation terminée
+
+    Les simulations antérieures à l'index sont indexées à la première demande.
+    """
+    provisions = simulation.get_sorted_provisions_array()
+    if provisions is None:
+        print(f"🔄 Construction de l'index des provisions de la simulation {simulation.id}")
+        provisions = construire_index_provisions(simulation.get_simulated_provisions_array())
+        simulation.set_sorted_provisions_array(provisions)
+        simulation.save(update_fields=['sorted_provisions_file'])
+    return provisions
+
 class RiskCalculationView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -311,7 +360,7 @@ class RiskCalculationView(APIView):
             
             # Récupérer la simulation spécifique
             try:
-                simulation = Simulation.objects.get(
+                simulation = Simulation.objects.defer(*COLONNES_VOLUMINEUSES).get(
                     id=simulation_id,
                     user=request.user, 
                     status='completed'
@@ -324,11 +373,10 @@ class RiskCalculationView(APIView):
                     status=status.HTTP_404_NOT_FOUND
                 )
             
-            provisions = simulation.get_simulated_provisions_list()
-            print(f"📊 Provisions récupérées: {len(provisions)} valeurs")
-            print(f"   Exemples: {provisions[:5]}")
+            provisions = charger_index_provisions(simulation)
+            print(f"📊 Index des provisions: {len(provisions)} valeurs")
             
-            if not provisions:
+            if len(provisions) == 0:
                 print(f"❌ Aucune provision disponible")
                 return Response(
                     {'error': 'Aucune donnée de simulation disponible'}, 
@@ -338,7 +386,7 @@ class RiskCalculationView(APIView):
             if calculation_type == 'risk_to_provision':
                 risk_level = serializer.validated_data['risk_level']
                 print(f"🎯 Calcul provision pour risque {risk_level}%")
-                provision_value = get_provision_for_risk_level(provisions, risk_level)
+                provision_value = float(provision_pour_risque(provisions, risk_level))
                 print(f"💰 Provision calculée: {provision_value}")
                 
                 result = {
@@ -352,7 +400,7 @@ class RiskCalculationView(APIView):
             elif calculation_type == 'provision_to_risk':
                 target_provision = serializer.validated_data['target_provision']
                 print(f"🎯 Calcul risque pour provision {target_provision}")
-                risk_level = get_risk_level_for_provision(provisions, target_provision)
+                risk_level = float(risque_pour_provision(provisions, target_provision))
                 print(f"⚠️ Risque calculé: {risk_level}%")
                 
                 result = {
@@ -368,14 +416,145 @@ class RiskCalculationView(APIView):
         print(f"❌ Erreurs de validation: {serializer.errors}")
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class RiskBatchCalculationView(APIView):
+    """Calculs de risque groupés: une seule lecture de l'index pour tous les points"""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, simulation_id):
+        print(f"🔍 RiskBatchCalculationView - Calcul groupé pour simulation {simulation_id}")
+        
+        serializer = RiskBatchCalculationSerializer(data=request.data)
+        if not serializer.is_valid():
+            print(f"❌ Erreurs de validation: {serializer.errors}")
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            simulation = Simulation.objects.defer(*COLONNES_VOLUMINEUSES).get(
+                id=simulation_id,
+                user=request.user,
+                status='completed'
+            )
+        except Simulation.DoesNotExist:
+            return Response(
+                {'error': 'Simulation non trouvée ou non terminée'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        provisions = charger_index_provisions(simulation)
+        if len(provisions) == 0:
+            return Response(
+                {'error': 'Aucune donnée de simulation disponible'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Réponse en colonnes: une liste par grandeur, alignées par indice
+        result = {'method': simulation.method, 'n': len(provisions)}
+        
+        risk_levels = serializer.validated_data.get('risk_levels')
+        if risk_levels:
+            result['risk_to_provision'] = {
+                'risk_level': risk_levels,
+                'provision_value': provision_pour_risque(provisions, risk_levels).tolist()
+            }
+        
+        target_provisions = serializer.validated_data.get('target_provisions')
+        if target_provisions:
+            result['provision_to_risk'] = {
+                'target_provision': target_provisions,
+                'risk_level': risque_pour_provision(provisions, target_provisions).tolist()
+            }
+        
+        if serializer.validated_data['curve']:
+            niveaux = np.linspace(0, 100, serializer.validated_data['curve_points'])
+            result['curve'] = {
+                'risk_level': niveaux.tolist(),
+                'provision_value': provision_pour_risque(provisions, niveaux).tolist()
+            }
+        
+        print(f"✅ Calcul groupé envoyé ({len(risk_levels or [])} niveaux, {len(target_provisions or [])} provisions)")
+        return Response(result)
+
+class AlphaSweepView(APIView):
+    """
+    Intervalles de confiance d'une simulation terminée pour une grille d'alphas
+
+    Les provisions ne dépendent pas d'alpha: toutes les bornes sont lues dans
+    l'index trié des réplications stockées, sans nouvelle simulation. Pour une
+    comparaison, chaque méthode a ses colonnes.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, simulation_id):
+        print(f"🔍 AlphaSweepView - Balayage d'alpha pour simulation {simulation_id}")
+        
+        serializer = AlphaSweepSerializer(data=request.data)
+        if not serializer.is_valid():
+            print(f"❌ Erreurs de validation: {serializer.errors}")
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            simulation = Simulation.objects.defer(*COLONNES_VOLUMINEUSES).get(
+                id=simulation_id,
+                user=request.user,
+                status='completed'
+            )
+        except Simulation.DoesNotExist:
+            return Response(
+                {'error': 'Simulation non trouvée ou non terminée'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        donnees = serializer.validated_data
+        alphas = donnees.get('alphas') or np.linspace(
+            donnees['alpha_min'], donnees['alpha_max'], donnees['points']
+        ).tolist()
+        
+        if simulation.method == 'compare':
+            simulations = list(simulation.method_runs.defer(*COLONNES_VOLUMINEUSES).filter(status='completed'))
+        else:
+            simulations = [simulation]
+        
+        # Réponse en colonnes: une liste par grandeur, alignées sur alphas
+        balayages = {}
+        for courante in simulations:
+            provisions = charger_index_provisions(courante)
+            if len(provisions) == 0:
+                continue
+            bornes_basses, bornes_hautes = intervalle_confiance_index(provisions, alphas)
+            balayages[courante.method] = {
+                'simulation_id': courante.id,
+                'n': len(provisions),
+                'lower': bornes_basses.tolist(),
+                'upper': bornes_hautes.tolist()
+            }
+        if not balayages:
+            return Response(
+                {'error': 'Aucune donnée de simulation disponible'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        result = {'method': simulation.method, 'alpha': alphas}
+        if simulation.method == 'compare':
+            result['methods'] = balayages
+        else:
+            result.update(balayages[simulation.method])
+        
+        print(f"✅ Balayage envoyé ({len(alphas)} valeurs d'alpha)")
+        return Response(result)
+
 class APIRootView(APIView):
     def get(self, request):
         return Response({
             'message': 'API d\'évaluation du risque de crédit',
             'endpoints': {
+                'datasets': '/api/datasets/',
                 'simulations': '/api/simulations/',
                 'simulation_status': '/api/simulations/{id}/status/',
                 'simulation_results': '/api/simulations/{id}/results/',
+                'simulation_extend': '/api/simulations/{id}/extend/',
+                'simulation_cancel': '/api/simulations/{id}/cancel/',
+                'risk_calculation_batch': '/api/simulations/{id}/calculate_risk/batch/',
+                'alpha_sweep': '/api/simulations/{id}/alpha_sweep/',
                 'risk_calculation': '/api/risk-calculation/',
             }
         })
@@ -58,6 +58,11 @@ PERFORMANCE_CONFIG = {
     "CHUNK_SIZE": 1000,
     "TIMEOUT": 300,  # 5 minutes
     "MAX_WORKERS": 4,
+    "MEMORY_BUDGET_MB": 256,  # Mémoire max par bloc de réplications
+    "JOB_CONCURRENCY": 2,  # Simulations exécutées en parallèle par run_simulation_workers
+    "JOB_LEASE_SECONDS": 60,  # Bail d'un worker sur un job (renouvelé pendant le calcul)
+    "CHECKPOINT_SECONDS": 30,  # Intervalle entre deux points de reprise d'un job sur disque
+    "JOB_TIME_BUDGET_SECONDS": 21600,  # Temps de calcul max d'un job (6 heures), 0 pour illimité
 }
 
 # Configuration de sécurité
@@ -170,17 +170,29 @@ const Dashboard = () => {
           setError('La simulation a échoué');
           setLoading(false);
           setProgress(0);
-        } else if (status === 'running') {
-          // Progression stable sans Math.random()
-          setProgress(prev => {
-            const increment = 5; // Incrément fixe
-            const newProgress = Math.min(prev + increment, 85);
-            return newProgress;
-          });
-          setSimulationStep('Calcul en cours...');
-          // Continuer à surveiller seulement si toujours en cours
+        } else if (status === 'cancelled') {
+          isMonitoring = false; // Arrêter le monitoring
+          setError('La simulation a été annulée');
+          setLoading(false);
+          setProgress(0);
+        } else if (status === 'running' || status === 'pending') {
+          // Progression réelle transmise par le serveur après chaque bloc de réplications
+          const jobProgress = response.data.progress;
+          if (status === 'pending') {
+            setSimulationStep('En attente d\'un worker...');
+          } else if (jobProgress) {
+            setProgress(Math.min(jobProgress.percent, 99));
+            setSimulationStep(
+              `Calcul en cours... ${jobProgress.done}/${jobProgress.total} réplications` +
+              (jobProgress.eta != null ? ` (reste ~${Math.ceil(jobProgress.eta)} s)` : '')
+            );
+          } else {
+            setSimulationStep('Calcul en cours...');
+          }
+          // Le serveur suggère le délai avant la prochaine interrogation
+          const delay = (jobProgress?.poll_after || 5) * 1000;
           if (isMonitoring) {
-            setTimeout(checkStatus, 5000); // Augmenter l'intervalle à 5 secondes
+            setTimeout(checkStatus, delay);
           }
         }
       } catch (error) {
@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useRef, useState } from 'react';
 import { Card, Row, Col, Button, Progress, Alert, Space, Typography, Divider, message } from 'antd';
 import { PlayCircleOutlined, BarChartOutlined, ReloadOutlined } from '@ant-design/icons';
 import styled from 'styled-components';
@@ -6,6 +6,54 @@ import axios from 'axios';
 
 const { Title, Text } = Typography;
 
+// Suit une simulation par WebSocket (ws/simulations/<id>/), avec repli sur
+// l'interrogation de /status/ si la connexion échoue ou se ferme avant la fin
+const suivreSimulation = (simulationId, token, onUpdate) => {
+  let termine = false;
+  let repli = false;
+
+  const traiter = (etat) => {
+    if (termine) return;
+    if (['completed', 'failed', 'cancelled'].includes(etat.status)) {
+      termine = true;
+    }
+    onUpdate(etat);
+  };
+
+  const interroger = async () => {
+    try {
+      const statusResponse = await axios.get(`/api/simulations/${simulationId}/status/`, {
+        headers: { 'Authorization': `Token ${token}` }
+      });
+      traiter(statusResponse.data);
+      if (!termine) {
+        setTimeout(interroger, (statusResponse.data.progress?.poll_after || 3) * 1000);
+      }
+    } catch (error) {
+      traiter({ status: 'failed', error });
+    }
+  };
+
+  const basculerSurInterrogation = () => {
+    if (termine || repli) return;
+    repli = true;
+    interroger();
+  };
+
+  if (!window.WebSocket) {
+    basculerSurInterrogation();
+    return;
+  }
+  const base = (axios.defaults.baseURL || window.location.origin).replace(/^http/, 'ws');
+  const socket = new WebSocket(`${base}/ws/simulations/${simulationId}/?token=${token}`);
+  socket.onmessage = (event) => {
+    traiter(JSON.parse(event.data));
+    if (termine) socket.close();
+  };
+  socket.onerror = basculerSurInterrogation;
+  socket.onclose = basculerSurInterrogation;
+};
+
 const ComparisonContainer = styled.div`
   .method-card {
     transition: all 0.3s ease;
@@ -69,6 +117,28 @@ const MethodComparison = ({ lendingFile, recoveryFile }) => {
   const [monteCarloResults, setMonteCarloResults] = useState(null);
   const [bootstrapResults, setBootstrapResults] = useState(null);
   const [comparisonResults, setComparisonResults] = useState(null);
+  // Jeu de données partagé par les deux méthodes: les fichiers ne sont envoyés qu'une fois
+  const datasetRef = useRef({ lendingFile: null, recoveryFile: null, promesse: null });
+
+  const obtenirDataset = (token) => {
+    const courant = datasetRef.current;
+    if (courant.promesse && courant.lendingFile === lendingFile && courant.recoveryFile === recoveryFile) {
+      return courant.promesse;
+    }
+    const formData = new FormData();
+    formData.append('lending_file', lendingFile);
+    formData.append('recovery_file', recoveryFile);
+    const promesse = axios.post('/api/datasets/', formData, {
+      headers: {
+        'Authorization': `Token ${token}`,
+        'Content-Type': 'multipart/form-data'
+      }
+    }).then((response) => response.data.id);
+    // En cas d'échec, le prochain lancement retentera l'upload
+    promesse.catch(() => { datasetRef.current.promesse = null; });
+    datasetRef.current = { lendingFile, recoveryFile, promesse };
+    return promesse;
+  };
 
   const runMonteCarlo = async () => {
     if (!lendingFile || !recoveryFile) {
@@ -81,9 +151,9 @@ const MethodComparison = ({ lendingFile, recoveryFile }) => {
     
     try {
       const token = localStorage.getItem('token');
+      const datasetId = await obtenirDataset(token);
       const formData = new FormData();
-      formData.append('lending_file', lendingFile);
-      formData.append('recovery_file', recoveryFile);
+      formData.append('dataset', datasetId);
       formData.append('num_samples', 1000);
       formData.append('method', 'montecarlo');
       formData.append('alpha', 0.95);
@@ -99,17 +169,16 @@ const MethodComparison = ({ lendingFile, recoveryFile }) => {
 
       const simulationId = response.data.id;
       
-      // Surveiller la progression
-      const checkProgress = async () => {
-        try {
-          const statusResponse = await axios.get(`/api/simulations/${simulationId}/status/`, {
-            headers: { 'Authorization': `Token ${token}` }
-          });
-          
-          if (statusResponse.data.status === 'completed') {
-            setMonteCarloProgress(100);
-            setMonteCarloStatus('completed');
-            
+      // Surveiller la progression (poussée par le serveur)
+      suivreSimulation(simulationId, token, async (etat) => {
+        if (etat.status === 'completed') {
+          // Budget de temps épuisé: résultats calculés sur une partie des réplications
+          if (etat.warning) {
+            message.warning(etat.warning);
+          }
+          setMonteCarloProgress(100);
+          setMonteCarloStatus('completed');
+          try {
             const resultsResponse = await axios.get(`/api/simulations/${simulationId}/results/`, {
               headers: { 'Authorization': `Token ${token}` }
             });
@@ -125,20 +194,23 @@ const MethodComparison = ({ lendingFile, recoveryFile }) => {
               execution_time: executionTime,
               simulation_id: simulationId
             });
-          } else if (statusResponse.data.status === 'running') {
-            setMonteCarloProgress(prev => Math.min(prev + 10, 90));
-            setTimeout(checkProgress, 1000);
-          } else if (statusResponse.data.status === 'failed') {
+          } catch (error) {
             setMonteCarloStatus('error');
-            message.error('Erreur lors de la simulation Monte Carlo');
+            message.error('Erreur lors de la récupération des résultats');
+          }
+        } else if (etat.status === 'running' || etat.status === 'pending') {
+          if (etat.progress) {
+            setMonteCarloProgress(Math.min(Math.round(etat.progress.percent), 99));
           }
-        } catch (error) {
+        } else if (etat.status === 'failed') {
           setMonteCarloStatus('error');
-          message.error('Erreur lors de la vérification du statut');
+          message.error(etat.error ? 'Erreur lors de la vérification du statut' : 'Erreur lors de la simulation Monte Carlo');
+        } else if (etat.status === 'cancelled') {
+          setMonteCarloStatus('idle');
+          setMonteCarloProgress(0);
+          message.info('Simulation Monte Carlo annulée');
         }
-      };
-      
-      setTimeout(checkProgress, 1000);
+      });
       
     } catch (error) {
       setMonteCarloStatus('error');
@@ -157,9 +229,9 @@ const MethodComparison = ({ lendingFile, recoveryFile }) => {
     
     try {
       const token = localStorage.getItem('token');
+      const datasetId = await obtenirDataset(token);
       const formData = new FormData();
-      formData.append('lending_file', lendingFile);
-      formData.append('recovery_file', recoveryFile);
+      formData.append('dataset', datasetId);
       formData.append('num_samples', 1000);
       formData.append('method', 'bootstrap');
       formData.append('alpha', 0.95);
@@ -175,17 +247,16 @@ const MethodComparison = ({ lendingFile, recoveryFile }) => {
 
       const simulationId = response.data.id;
       
-      // Surveiller la progression
-      const checkProgress = async () => {
-        try {
-          const statusResponse = await axios.get(`/api/simulations/${simulationId}/status/`, {
-            headers: { 'Authorization': `Token ${token}` }
-          });
-          
-          if (statusResponse.data.status === 'completed') {
-            setBootstrapProgress(100);
-            setBootstrapStatus('completed');
-            
+      // Surveiller la progression (poussée par le serveur)
+      suivreSimulation(simulationId, token, async (etat) => {
+        if (etat.status === 'completed') {
+          // Budget de temps épuisé: résultats calculés sur une partie des réplications
+          if (etat.warning) {
+            message.warning(etat.warning);
+          }
+          setBootstrapProgress(100);
+          setBootstrapStatus('completed');
+          try {
             const resultsResponse = await axios.get(`/api/simulations/${simulationId}/results/`, {
               headers: { 'Authorization': `Token ${token}` }
             });
@@ -201,20 +272,23 @@ const MethodComparison = ({ lendingFile, recoveryFile }) => {
               execution_time: executionTime,
               simulation_id: simulationId
             });
-          } else if (statusResponse.data.status === 'running') {
-            setBootstrapProgress(prev => Math.min(prev + 8, 90));
-            setTimeout(checkProgress, 1000);
-          } else if (statusResponse.data.status === 'failed') {
+          } catch (error) {
             setBootstrapStatus('error');
-            message.error('Erreur lors de la simulation Bootstrap');
+            message.error('Erreur lors de la récupération des résultats');
+          }
+        } else if (etat.status === 'running' || etat.status === 'pending') {
+          if (etat.progress) {
+            setBootstrapProgress(Math.min(Math.round(etat.progress.percent), 99));
           }
-        } catch (error) {
+        } else if (etat.status === 'failed') {
           setBootstrapStatus('error');
-          message.error('Erreur lors de la vérification du statut');
+          message.error(etat.error ? 'Erreur lors de la vérification du statut' : 'Erreur lors de la simulation Bootstrap');
+        } else if (etat.status === 'cancelled') {
+          setBootstrapStatus('idle');
+          setBootstrapProgress(0);
+          message.info('Simulation Bootstrap annulée');
         }
-      };
-      
-      setTimeout(checkProgress, 1000);
+      });
       
     } catch (error) {
       setBootstrapStatus('error');
@@ -222,33 +296,105 @@ const MethodComparison = ({ lendingFile, recoveryFile }) => {
     }
   };
 
+  // Un seul job de comparaison: tables préparées une fois, une seule simulation à suivre
   const runBothMethods = async () => {
+    if (!lendingFile || !recoveryFile) {
+      message.error('Veuillez d\'abord télécharger les fichiers de données');
+      return;
+    }
+
+    setMonteCarloStatus('running');
+    setBootstrapStatus('running');
+    setMonteCarloProgress(0);
+    setBootstrapProgress(0);
+    setComparisonResults(null);
+
+    const echec = (texte) => {
+      setMonteCarloStatus('error');
+      setBootstrapStatus('error');
+      message.error(texte);
+    };
+
     try {
-      await Promise.all([runMonteCarlo(), runBootstrap()]);
-      
-      // Attendre que les deux soient terminés
-      const checkBothCompleted = () => {
-        if (monteCarloResults && bootstrapResults) {
-          const comparison = {
-            monte_carlo: monteCarloResults,
-            bootstrap: bootstrapResults,
-            differences: {
-              provision_diff: Math.abs(monteCarloResults.provision - bootstrapResults.provision),
-              time_diff: Math.abs(monteCarloResults.execution_time - bootstrapResults.execution_time),
-              precision: monteCarloResults.confidence_interval[1] - monteCarloResults.confidence_interval[0] < 
-                        bootstrapResults.confidence_interval[1] - bootstrapResults.confidence_interval[0] ? 'Monte Carlo' : 'Bootstrap'
-            }
-          };
-          setComparisonResults(comparison);
-        } else {
-          // Vérifier à nouveau dans 2 secondes
-          setTimeout(checkBothCompleted, 2000);
+      const token = localStorage.getItem('token');
+      const datasetId = await obtenirDataset(token);
+      const formData = new FormData();
+      formData.append('dataset', datasetId);
+      formData.append('num_samples', 1000);
+      formData.append('method', 'compare');
+      formData.append('alpha', 0.95);
+
+      const startTime = Date.now();
+
+      const response = await axios.post('/api/simulations/', formData, {
+        headers: {
+          'Authorization': `Token ${token}`,
+          'Content-Type': 'multipart/form-data'
         }
-      };
-      
-      setTimeout(checkBothCompleted, 2000);
+      });
+
+      const comparisonId = response.data.id;
+
+      suivreSimulation(comparisonId, token, async (etat) => {
+        if (etat.status === 'completed') {
+          // Budget de temps épuisé: résultats calculés sur une partie des réplications
+          if (etat.warning) {
+            message.warning(etat.warning);
+          }
+          try {
+            const resultsResponse = await axios.get(`/api/simulations/${comparisonId}/results/`, {
+              headers: { 'Authorization': `Token ${token}` }
+            });
+            const executionTime = (Date.now() - startTime) / 1000;
+            const { methods, real_provision: provision } = resultsResponse.data;
+            const resultat = (nom, cle) => ({
+              method: nom,
+              provision,
+              confidence_interval: [
+                methods[cle].confidence_interval.lower,
+                methods[cle].confidence_interval.upper
+              ],
+              execution_time: executionTime,
+              simulation_id: methods[cle].simulation_id
+            });
+            const monteCarlo = resultat('Monte Carlo', 'montecarlo');
+            const bootstrap = resultat('Bootstrap', 'bootstrap');
+
+            setMonteCarloResults(monteCarlo);
+            setBootstrapResults(bootstrap);
+            setMonteCarloProgress(100);
+            setBootstrapProgress(100);
+            setMonteCarloStatus('completed');
+            setBootstrapStatus('completed');
+            setComparisonResults({
+              monte_carlo: monteCarlo,
+              bootstrap: bootstrap,
+              quantiles: resultsResponse.data.comparison,
+              differences: {
+                provision_diff: Math.abs(monteCarlo.provision - bootstrap.provision),
+                time_diff: 0, // Un seul job pour les deux méthodes
+                precision: monteCarlo.confidence_interval[1] - monteCarlo.confidence_interval[0] <
+                          bootstrap.confidence_interval[1] - bootstrap.confidence_interval[0] ? 'Monte Carlo' : 'Bootstrap'
+              }
+            });
+          } catch (error) {
+            echec('Erreur lors de la récupération des résultats');
+          }
+        } else if (etat.status === 'running' || etat.status === 'pending') {
+          if (etat.progress) {
+            const pourcentage = Math.min(Math.round(etat.progress.percent), 99);
+            setMonteCarloProgress(pourcentage);
+            setBootstrapProgress(pourcentage);
+          }
+        } else if (etat.status === 'failed') {
+          echec(etat.error ? 'Erreur lors de la vérification du statut' : 'Erreur lors de la comparaison');
+        } else if (etat.status === 'cancelled') {
+          resetComparison();
+          message.info('Comparaison annulée');
+        }
+      });
     } catch (error) {
-      message.error('Erreur lors du lancement des deux méthodes');
+      echec('Erreur lors du lancement des deux méthodes');
     }
   };
 
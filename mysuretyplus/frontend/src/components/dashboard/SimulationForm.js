@@ -1,6 +1,6 @@
 import React, { useState, useEffect, useCallback, useRef } from 'react';
 import { Form, InputNumber, Radio, Button, Card, message, Progress, Alert, Space, Tag } from 'antd';
-import { PlayCircleOutlined, ReloadOutlined, CheckCircleOutlined, ClockCircleOutlined } from '@ant-design/icons';
+import { PlayCircleOutlined, ReloadOutlined, CheckCircleOutlined, ClockCircleOutlined, StopOutlined } from '@ant-design/icons';
 import styled from 'styled-components';
 import axios from 'axios';
 
@@ -137,19 +137,25 @@ const SimulationForm = ({ lendingFile, recoveryFile, onSimulationStarted }) => {
         const status = response.data.status;
         setSimulationStatus(status);
 
-        if (status === 'running') {
-          // Progression stable sans Math.random()
-          setProgress(prev => {
-            const increment = 5; // Incrément fixe
-            return Math.min(prev + increment, 90);
-          });
+        if (status === 'running' || status === 'pending') {
+          // Progression réelle transmise par le serveur après chaque bloc de réplications
+          const jobProgress = response.data.progress;
+          if (jobProgress) {
+            setProgress(Math.min(jobProgress.percent, 99));
+          }
+          // Le serveur suggère le délai avant la prochaine interrogation
+          const delay = (jobProgress?.poll_after || 3) * 1000;
           if (isMonitoring) {
-            setTimeout(checkStatus, 3000); // Augmenter l'intervalle à 3 secondes
+            setTimeout(checkStatus, delay);
           }
         } else if (status === 'completed') {
           isMonitoring = false; // Arrêter le monitoring
           setProgress(100);
-          message.success('Simulation terminée avec succès !');
+          if (response.data.warning) {
+            message.warning(response.data.warning);
+          } else {
+            message.success('Simulation terminée avec succès !');
+          }
           // Notifier le parent que la simulation est terminée
           if (onSimulationStartedRef.current) {
             onSimulationStartedRef.current({ ...currentSimulation, status: 'completed' });
@@ -158,6 +164,10 @@ const SimulationForm = ({ lendingFile, recoveryFile, onSimulationStarted }) => {
           isMonitoring = false; // Arrêter le monitoring
           message.error('La simulation a échoué');
           setProgress(0);
+        } else if (status === 'cancelled') {
+          isMonitoring = false; // Arrêter le monitoring
+          message.info('Simulation annulée');
+          setProgress(0);
         }
       } catch (error) {
         if (isMonitoring) {
@@ -174,6 +184,19 @@ const SimulationForm = ({ lendingFile, recoveryFile, onSimulationStarted }) => {
     };
   }, [currentSimulation]);
 
+  const handleCancel = async () => {
+    try {
+      await axios.post(`/api/simulations/${currentSimulation.id}/cancel/`, {}, {
+        headers: {
+          'Authorization': `Token ${localStorage.getItem('token')}`
+        }
+      });
+      message.info('Annulation demandée');
+    } catch (error) {
+      message.error(error.response?.data?.error || 'Erreur lors de l\'annulation');
+    }
+  };
+
   const getStatusDisplay = () => {
     if (!currentSimulation) return null;
 
@@ -201,6 +224,12 @@ const SimulationForm = ({ lendingFile, recoveryFile, onSimulationStarted }) => {
         color: '#ff4d4f',
         text: 'Échoué',
         description: 'La simulation a échoué'
+      },
+      cancelled: {
+        icon: <StopOutlined />,
+        color: '#8c8c8c',
+        text: 'Annulé',
+        description: 'La simulation a été annulée'
       }
     };
 
@@ -240,6 +269,11 @@ const SimulationForm = ({ lendingFile, recoveryFile, onSimulationStarted }) => {
         <div style={{ textAlign: 'center', marginTop: '8px', color: '#666' }}>
           {simulationStatus === 'pending' ? 'En attente...' : 'Calcul en cours...'}
         </div>
+        <div style={{ textAlign: 'center', marginTop: '8px' }}>
+          <Button danger size="small" icon={<StopOutlined />} onClick={handleCancel}>
+            Annuler
+          </Button>
+        </div>
       </div>
     );
   };
@@ -50,6 +50,7 @@ const SimulationHistory = () => {
   const [loading, setLoading] = useState(false);
   const [selectedSimulation, setSelectedSimulation] = useState(null);
   const [previewModalVisible, setPreviewModalVisible] = useState(false);
+  const [nextCursor, setNextCursor] = useState(null);
 
   // Données simulées pour la démonstration
   const mockSimulations = [
@@ -62,7 +63,8 @@ const SimulationHistory = () => {
       created_at: '2024-01-15T10:30:00Z',
       completed_at: '2024-01-15T10:35:00Z',
       real_provision: 8500.50,
-      simulated_provisions: [8200, 8300, 8400, 8500, 8600, 8700, 8800],
+      samples_run: 7,
+      simulated_provisions_preview: [8200, 8300, 8400, 8500, 8600, 8700, 8800],
       percentiles: { '5%': 8200, '25%': 8300, '50%': 8500, '75%': 8700, '95%': 8800 },
       confidence_interval: { lower: 8200, upper: 8800 }
     },
@@ -75,7 +77,8 @@ const SimulationHistory = () => {
       created_at: '2024-01-14T14:20:00Z',
       completed_at: '2024-01-14T14:28:00Z',
       real_provision: 8200.75,
-      simulated_provisions: [8000, 8100, 8200, 8300, 8400],
+      samples_run: 5,
+      simulated_provisions_preview: [8000, 8100, 8200, 8300, 8400],
       percentiles: { '1%': 8000, '5%': 8100, '50%': 8200, '95%': 8300, '99%': 8400 },
       confidence_interval: { lower: 8000, upper: 8400 }
     },
@@ -88,7 +91,8 @@ const SimulationHistory = () => {
       created_at: '2024-01-15T11:00:00Z',
       completed_at: null,
       real_provision: null,
-      simulated_provisions: [],
+      samples_run: null,
+      simulated_provisions_preview: [],
       percentiles: {},
       confidence_interval: {}
     }
@@ -98,16 +102,20 @@ const SimulationHistory = () => {
     loadSimulations();
   }, []);
 
-  const loadSimulations = async () => {
+  // Liste paginée par curseur: cursor = null pour la première page
+  const loadSimulations = async (cursor = null) => {
     setLoading(true);
     try {
       const token = localStorage.getItem('token');
       const response = await axios.get('/api/simulations/', {
         headers: {
           'Authorization': `Token ${token}`
-        }
+        },
+        params: cursor ? { cursor } : {}
       });
-      setSimulations(response.data);
+      const { results, next } = response.data;
+      setSimulations(prev => (cursor ? [...prev, ...results] : results));
+      setNextCursor(next ? new URL(next, window.location.origin).searchParams.get('cursor') : null);
     } catch (error) {
       console.error('Erreur lors du chargement de l\'historique:', error);
       message.error('Erreur lors du chargement de l\'historique');
@@ -124,6 +132,7 @@ const SimulationHistory = () => {
       case 'running': return 'processing';
       case 'failed': return 'error';
       case 'pending': return 'warning';
+      case 'cancelled': return 'default';
       default: return 'default';
     }
   };
@@ -134,6 +143,7 @@ const SimulationHistory = () => {
       case 'running': return 'En cours';
       case 'failed': return 'Échoué';
       case 'pending': return 'En attente';
+      case 'cancelled': return 'Annulé';
       default: return 'Inconnu';
     }
   };
@@ -142,6 +152,7 @@ const SimulationHistory = () => {
     switch (method) {
       case 'montecarlo': return 'Monte Carlo';
       case 'bootstrap': return 'Bootstrap';
+      case 'compare': return 'Monte Carlo + Bootstrap';
       default: return method;
     }
   };
@@ -309,7 +320,7 @@ Provision 5%: ${simulation.percentiles?.['5%'] || 'N/A'} €
 Provision 95%: ${simulation.percentiles?.['95%'] || 'N/A'} €
 Intervalle de Confiance: [${simulation.confidence_interval?.lower || 'N/A'}, ${simulation.confidence_interval?.upper || 'N/A'}]
 
-Données Simulées: ${simulation.simulated_provisions?.length || 0} valeurs
+Données Simulées: ${simulation.samples_run || 0} valeurs
       `;
       
       const blob = new Blob([reportContent], { type: 'text/plain;charset=utf-8;' });
@@ -452,7 +463,7 @@ Données Simulées: ${simulation.simulated_provisions?.length || 0} valeurs
         <div className="export-buttons">
           <Button 
             icon={<ReloadOutlined />} 
-            onClick={loadSimulations}
+            onClick={() => loadSimulations()}
             loading={loading}
           >
             Actualiser
@@ -488,6 +499,13 @@ Données Simulées: ${simulation.simulated_provisions?.length || 0} valeurs
           }}
           scroll={{ x: 1000 }}
         />
+        {nextCursor && (
+          <div style={{ textAlign: 'center', marginTop: 16 }}>
+            <Button onClick={() => loadSimulations(nextCursor)} loading={loading}>
+              Charger plus
+            </Button>
+          </div>
+        )}
       </Card>
 
       {/* Modal d'aperçu des résultats */}
@@ -539,12 +557,12 @@ Données Simulées: ${simulation.simulated_provisions?.length || 0} valeurs
             {selectedSimulation.status === 'completed' && (
               <Card size="small" title="Données Simulées" style={{ marginTop: 16 }}>
                 <Text type="secondary">
-                  {selectedSimulation.simulated_provisions?.length || 0} valeurs simulées
+                  {selectedSimulation.samples_run || 0} valeurs simulées
                 </Text>
                 <div style={{ marginTop: 8 }}>
                   <Text code>
-                    {selectedSimulation.simulated_provisions?.slice(0, 10).join(', ') || 'Aucune donnée'}
-                    {selectedSimulation.simulated_provisions?.length > 10 && '...'}
+                    {selectedSimulation.simulated_provisions_preview?.join(', ') || 'Aucune donnée'}
+                    {selectedSimulation.samples_run > 10 && '...'}
                   </Text>
                 </div>
               </Card>
@@ -1,5 +1,5 @@
 import React, { useState, useEffect, useMemo } from 'react';
-import { Card, Row, Col, Statistic, Button, Space, Tag, Alert, Divider, Typography, message } from 'antd';
+import { Card, Row, Col, Statistic, Button, Space, Tag, Alert, Divider, Typography, Select, message } from 'antd';
 import { 
   ReloadOutlined, 
   BarChartOutlined, 
@@ -13,6 +13,7 @@ import {
   AreaChart, Area, BarChart, Bar
 } from 'recharts';
 import styled from 'styled-components';
+import axios from 'axios';
 
 const { Title, Text, Paragraph } = Typography;
 
@@ -238,6 +239,30 @@ const SimulationResults = ({ results, onReload }) => {
     return `${(value * 100).toFixed(1)}%`;
   };
 
+  // Intervalle de confiance pour un autre alpha: calculé depuis les réplications stockées
+  const [intervalleAlpha, setIntervalleAlpha] = useState(null);
+  const intervalle = intervalleAlpha || { ...results?.confidence_interval, alpha: results?.alpha };
+
+  useEffect(() => {
+    setIntervalleAlpha(null);
+  }, [results?.id]);
+
+  const changerAlpha = async (alpha) => {
+    if (alpha === results.alpha) {
+      setIntervalleAlpha(null);
+      return;
+    }
+    try {
+      const token = localStorage.getItem('token');
+      const response = await axios.post(`/api/simulations/${results.id}/alpha_sweep/`, { alphas: [alpha] }, {
+        headers: { 'Authorization': `Token ${token}` }
+      });
+      setIntervalleAlpha({ alpha, lower: response.data.lower[0], upper: response.data.upper[0] });
+    } catch (error) {
+      message.error('Erreur lors du calcul de l\'intervalle de confiance');
+    }
+  };
+
   // Fonction d'export PDF
   const handleExport = () => {
     try {
@@ -472,6 +497,17 @@ const SimulationResults = ({ results, onReload }) => {
           </Space>
         }
       >
+        {/* Résultats tronqués par le budget de temps du job */}
+        {results.warning && (
+          <Alert
+            message="Résultats partiels"
+            description={results.warning}
+            type="warning"
+            showIcon
+            style={{ marginBottom: '16px' }}
+          />
+        )}
+
         {/* Métriques principales */}
         <Row gutter={[16, 16]} style={{ marginBottom: '24px' }}>
           <Col span={6}>
@@ -726,13 +762,22 @@ const SimulationResults = ({ results, onReload }) => {
               <Title level={5}>Intervalle de Confiance</Title>
               <Row gutter={[8, 8]}>
                 <Col span={12}>
-                  <Text>Niveau: {formatPercentage(results.alpha)}</Text>
+                  <Text>Niveau: </Text>
+                  <Select
+                    size="small"
+                    value={intervalle.alpha}
+                    onChange={changerAlpha}
+                    style={{ width: 90 }}
+                    options={[...new Set([0.8, 0.9, 0.95, 0.975, 0.99, 0.995, results.alpha])]
+                      .sort((a, b) => a - b)
+                      .map((alpha) => ({ value: alpha, label: formatPercentage(alpha) }))}
+                  />
                 </Col>
                 <Col span={12}>
-                  <Text>Borne inférieure: {formatCurrency(results.confidence_interval?.lower || 0)}</Text>
+                  <Text>Borne inférieure: {formatCurrency(intervalle.lower || 0)}</Text>
                 </Col>
                 <Col span={12}>
-                  <Text>Borne supérieure: {formatCurrency(results.confidence_interval?.upper || 0)}</Text>
+                  <Text>Borne supérieure: {formatCurrency(intervalle.upper || 0)}</Text>
                 </Col>
               </Row>
             </Col>